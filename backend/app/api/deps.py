@@ -0,0 +1,53 @@
+# backend/app/api/deps.py
+import secrets
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Request
+
+from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.domain.services.batch_grading_service import BatchGradingService
+from app.domain.services.grading_service import GradingService
+from app.infrastructure.database.database import get_db
+
+
+def get_container(request: Request) -> ServiceContainer:
+    """Get the application-scoped service container"""
+    return request.app.state.container
+
+
+def get_grading_service(
+    db=Depends(get_db),
+    container: ServiceContainer = Depends(get_container)
+) -> GradingService:
+    """Get a GradingService backed by the shared services"""
+    # Building these per request would recreate clients and probes on every call
+    missing = [
+        name for name in ("grading_chain", "embedding_service")
+        if getattr(container, name) is None
+    ]
+    if missing:
+        raise HTTPException(status_code=503, detail=f"Grading services unavailable: {', '.join(missing)}")
+    return GradingService(
+        db,
+        grading_chain=container.grading_chain,
+        embedding_service=container.embedding_service,
+        milvus_client=container.milvus_client,
+        rag_service=container.rag_service
+    )
+
+
+def get_batch_grading_service(
+    db=Depends(get_db),
+    grading_service: GradingService = Depends(get_grading_service)
+) -> BatchGradingService:
+    """Get a BatchGradingService backed by the shared services"""
+    return BatchGradingService(db, grading_service=grading_service)
+
+
+def require_llm_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Allow LLM endpoint management only with the configured admin key"""
+    if not settings.LLM_ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="LLM endpoint management is disabled")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, settings.LLM_ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
@@ -1,23 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, UploadFile, File, Form
-from app.infrastructure.database.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_batch_grading_service
+from app.infrastructure.queue.job_queue import JobQueue, BATCH_GRADING_JOB
 from app.domain.services.batch_grading_service import BatchGradingService
 from app.domain.models.grading import BatchGradingRequest, BatchGradingResponse
-from typing import List
+from app.core.config import settings
+from functools import lru_cache
+from typing import List, Optional
+import asyncio
+import json
 import uuid
 
 router = APIRouter()
 
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """Get the persistent batch grading job queue"""
+    return JobQueue()
+
 @router.post("")
 async def create_batch_grading(
     teacher_file: UploadFile = File(...),
     assignment_id: str = Form(...),
-    db = Depends(get_db)
+    batch_grading_service: BatchGradingService = Depends(get_batch_grading_service)
 ):
     """
     Start a new batch grading process by uploading teacher's answer key.
     """
-    batch_grading_service = BatchGradingService(db)
-    
     # Generate a batch ID
     batch_id = str(uuid.uuid4())
     
@@ -38,40 +47,97 @@ async def create_batch_grading(
 async def add_students_to_batch(
     batch_id: str,
     student_file_ids: List[str],
-    background_tasks: BackgroundTasks,
-    db = Depends(get_db)
+    queue: JobQueue = Depends(get_job_queue)
 ):
     """
     Add student submissions to a batch grading process.
+    The batch is picked up by a worker process (python -m app.worker).
     """
-    batch_grading_service = BatchGradingService(db)
-    
     # Queue the batch grading process
-    background_tasks.add_task(
-        batch_grading_service.process_batch,
-        batch_id=batch_id,
-        student_file_ids=student_file_ids
+    job_id = queue.enqueue(
+        BATCH_GRADING_JOB,
+        {"batch_id": batch_id, "student_file_ids": student_file_ids}
     )
     
     return {
         "success": True,
         "message": f"Processing {len(student_file_ids)} student submissions",
-        "batch_id": batch_id
+        "batch_id": batch_id,
+        "job_id": job_id
     }
 
+@router.get("/queue/stats")
+async def get_queue_stats(queue: JobQueue = Depends(get_job_queue)):
+    """
+    Get batch job queue depth and worker utilization.
+    """
+    return queue.stats()
+
 @router.get("/{batch_id}/results")
 async def get_batch_results(
     batch_id: str,
-    db = Depends(get_db)
+    batch_grading_service: BatchGradingService = Depends(get_batch_grading_service)
 ):
     """
     Get the results of a batch grading process.
     """
-    batch_grading_service = BatchGradingService(db)
     results = await batch_grading_service.get_batch_results(batch_id)
+    status = await batch_grading_service.get_batch_status(batch_id)
     
     return {
         "batch_id": batch_id,
+        "status": status,
         "results": results,
-        "completed": len(results) > 0
-    }
\ No newline at end of file
+        "completed": status == "completed"
+    }
+
+@router.get("/{batch_id}/events")
+async def stream_batch_events(
+    batch_id: str,
+    last_event_id: Optional[str] = Header(None),
+    queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Stream batch grading progress as server-sent events.
+    
+    Emits a "student" event per graded student and running progress counters,
+    and ends after the "completed" or "failed" event, or once the batch job has
+    finished and no events are left. Reconnecting clients send Last-Event-ID to
+    continue where they left off.
+    """
+    if await asyncio.to_thread(queue.batch_state, batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    cursor = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
+    async def event_stream():
+        nonlocal cursor
+        idle = 0.0
+        while True:
+            # Read the job state before the events: a worker publishes its last
+            # event before marking the job done, so none can be missed
+            state = await asyncio.to_thread(queue.batch_state, batch_id)
+            events = await asyncio.to_thread(queue.events_since, batch_id, cursor)
+            for event in events:
+                cursor = event["id"]
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+                if event["event"] in ("completed", "failed"):
+                    return
+            if not events and state in ("done", "failed"):
+                return
+            
+            if events:
+                idle = 0.0
+            else:
+                idle += settings.BATCH_EVENTS_POLL_SECONDS
+                # Keep the connection open through proxies
+                if idle >= 15:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+            
+            await asyncio.sleep(settings.BATCH_EVENTS_POLL_SECONDS)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
@@ -1,9 +1,10 @@
 # backend/app/api/v1/endpoints/files.py
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from typing import Optional
+from typing import List, Optional
 from app.infrastructure.database.database import get_db
-from app.domain.services.file_service import FileService
-from app.utils.pdf_processor import extract_text_from_pdf
+from app.domain.services.file_service import FileService, FileTooLargeError
+from app.domain.services.bulk_upload_service import BulkUploadService
+from app.utils.pdf_processor import extract_document_from_pdf_async
 import os
 import logging
 from app.core.config import settings
@@ -31,19 +32,15 @@ async def upload_file(
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
         
-        # Create upload directory if it doesn't exist
-        upload_path = os.path.join(settings.UPLOAD_DIR, assignment_id)
-        os.makedirs(upload_path, exist_ok=True)
-        logging.info(f"Created upload directory: {upload_path}")
-        
         # Save file locally
         file_service = FileService(db)
-        file_path = await file_service.save_file(file, file_type, assignment_id)
-        logging.info(f"File saved to: {file_path}")
+        stored = await file_service.store_upload(file, file_type, assignment_id)
+        file_path = stored.path
+        logging.info(f"File saved to: {file_path} (sha256 {stored.sha256})")
         
         # Extract text from PDF
         logging.info("Extracting text from PDF...")
-        text_content = extract_text_from_pdf(file_path)
+        extracted = await extract_document_from_pdf_async(file_path, stored.sha256)
         
         # Store file info in database
         logging.info("Creating database record...")
@@ -51,16 +48,57 @@ async def upload_file(
             file_name=file.filename,
             file_path=file_path,
             file_type=file_type,
-            file_size=os.path.getsize(file_path),
+            file_size=stored.size,
             mime_type=file.content_type,
             assignment_id=assignment_id,
-            text_content=text_content
+            text_content=extracted.text
         )
         
         logging.info(f"File upload completed successfully: {file.filename}")
-        return file_record
+        return {**file_record, "page_offsets": extracted.page_offsets}
+    except HTTPException:
+        raise
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         import traceback
         traceback_str = traceback.format_exc()
         logging.error(f"Error uploading file: {str(e)}\n{traceback_str}")
-        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+
+@router.post("/bulk")
+async def upload_files_bulk(
+    files: List[UploadFile] = File(...),
+    file_type: str = Form(...),
+    assignment_id: str = Form(...),
+    db = Depends(get_db)
+):
+    """
+    Upload many files at once, as separate PDFs and/or ZIP archives of PDFs.
+    Returns a manifest with the outcome of every file.
+    """
+    try:
+        logging.info(f"Starting bulk upload: {len(files)} files, type: {file_type}, assignment: {assignment_id}")
+        
+        # Validate file type
+        if file_type not in ["teacher", "student"]:
+            raise HTTPException(status_code=400, detail="Invalid file type. Must be 'teacher' or 'student'")
+        
+        bulk_upload_service = BulkUploadService(db)
+        manifest = await bulk_upload_service.upload(files, file_type, assignment_id)
+        
+        return {
+            "success": True,
+            "assignment_id": assignment_id,
+            "stored": sum(1 for entry in manifest if entry["status"] == "stored"),
+            "failed": sum(1 for entry in manifest if entry["status"] == "error"),
+            "skipped": sum(1 for entry in manifest if entry["status"] == "skipped"),
+            "files": manifest
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        traceback_str = traceback.format_exc()
+        logging.error(f"Error in bulk upload: {str(e)}\n{traceback_str}")
+        raise HTTPException(status_code=500, detail=f"Error uploading files: {str(e)}")
@@ -1,23 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from app.infrastructure.database.database import get_db
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_container, get_grading_service
+from app.core.container import ServiceContainer
 from app.domain.services.grading_service import GradingService
 from app.domain.models.grading import GradingRequest, GradingResponse
 from typing import Optional
+import json
+import logging
 
 router = APIRouter()
 
+@router.get("/cache/stats")
+async def get_grading_cache_stats(container: ServiceContainer = Depends(get_container)):
+    """
+    Get grading result cache hit and miss counters.
+    """
+    if container.grading_cache is None:
+        raise HTTPException(status_code=503, detail="Grading cache is not enabled")
+    return container.grading_cache.stats()
+
+@router.delete("/cache")
+async def invalidate_grading_cache(container: ServiceContainer = Depends(get_container)):
+    """
+    Drop all cached grading results.
+    """
+    if container.grading_cache is None:
+        raise HTTPException(status_code=503, detail="Grading cache is not enabled")
+    container.grading_cache.invalidate()
+    return {"success": True, "message": "Grading cache invalidated"}
+
+@router.get("/output/stats")
+async def get_grading_output_stats(container: ServiceContainer = Depends(get_container)):
+    """
+    Get LLM output parsing counters: syntax repairs, incomplete outputs,
+    partial repair calls and the resulting failure rates.
+    """
+    if container.grading_chain is None:
+        raise HTTPException(status_code=503, detail="Grading chain is not available")
+    return container.grading_chain.stats()
+
 @router.post("/{assignment_id}")
 async def grade_submission(
     assignment_id: str,
     grading_request: GradingRequest,
-    background_tasks: BackgroundTasks,
-    db = Depends(get_db)
+    grading_service: GradingService = Depends(get_grading_service),
+    container: ServiceContainer = Depends(get_container)
 ):
     """
     Grade a student submission for a specific assignment.
     """
-    grading_service = GradingService(db)
-    
     try:
         # Get teacher's answer key
         teacher_file = await grading_service.get_teacher_file(assignment_id)
@@ -32,24 +63,21 @@ async def grade_submission(
         if not student_file:
             raise HTTPException(status_code=404, detail="Student submission not found")
         
-        # Perform grading (this can be time-consuming, so do it in background)
-        result = await grading_service.grade_submission(
-            teacher_file["text_content"],
-            student_file["text_content"],
-            assignment_id,
-            grading_request.student_id
-        )
-        
-        # Store grading result in database
-        background_tasks.add_task(
-            grading_service.store_grading_result,
-            assignment_id=assignment_id,
-            student_id=grading_request.student_id,
-            score=result["score"],
-            feedback=result["feedback"],
-            strengths=result.get("strengths", []),
-            improvements=result.get("areas_for_improvement", []),
-            missed_concepts=result.get("missed_concepts", [])
+        # Perform grading and store the result. Identical requests that arrive while
+        # one is in flight (double clicks, retries) share its LLM call and stored row
+        teacher_text = teacher_file["text_content"]
+        student_text = student_file["text_content"]
+        result = await container.grading_flights.do(
+            grading_service.flight_key(
+                assignment_id, grading_request.student_id, teacher_text, student_text, grading_request.mode
+            ),
+            lambda: grading_service.grade_and_store(
+                teacher_text,
+                student_text,
+                assignment_id,
+                grading_request.student_id,
+                mode=grading_request.mode
+            )
         )
         
         return GradingResponse(
@@ -59,8 +87,84 @@ async def grade_submission(
             feedback=result["feedback"],
             strengths=result.get("strengths", []),
             areas_for_improvement=result.get("areas_for_improvement", []),
-            missed_concepts=result.get("missed_concepts", [])
+            missed_concepts=result.get("missed_concepts", []),
+            prompt_tokens_saved=result.get("prompt_tokens_saved")
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Grading error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Grading error: {str(e)}")
+
+@router.post("/{assignment_id}/stream")
+async def stream_grade_submission(
+    assignment_id: str,
+    grading_request: GradingRequest,
+    grading_service: GradingService = Depends(get_grading_service)
+):
+    """
+    Grade a student submission and stream the result as server-sent events.
+    
+    Emits "token" events with raw LLM output, a "field" event as soon as each of
+    score, feedback, strengths, areas_for_improvement and missed_concepts is
+    complete, and a final "result" event with the whole grading result. If the
+    stream ends without a result an "error" event is sent and nothing is stored.
+    """
+    teacher_file = await grading_service.get_teacher_file(assignment_id)
+    if not teacher_file:
+        raise HTTPException(status_code=404, detail="Teacher answer key not found")
+    
+    student_file = await grading_service.get_student_file(assignment_id, grading_request.student_id)
+    if not student_file:
+        raise HTTPException(status_code=404, detail="Student submission not found")
+    
+    async def event_stream():
+        result = None
+        try:
+            async for event, data in grading_service.stream_grading(
+                teacher_file["text_content"],
+                student_file["text_content"],
+                assignment_id,
+                grading_request.student_id,
+                mode=grading_request.mode
+            ):
+                if event == "result":
+                    result = data
+                    data = GradingResponse(
+                        assignment_id=assignment_id,
+                        student_id=grading_request.student_id,
+                        score=result.get("score", 0),
+                        feedback=result.get("feedback", ""),
+                        strengths=result.get("strengths", []),
+                        areas_for_improvement=result.get("areas_for_improvement", []),
+                        missed_concepts=result.get("missed_concepts", []),
+                        prompt_tokens_saved=result.get("prompt_tokens_saved")
+                    ).model_dump()
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            logging.error(f"Error streaming grading result: {str(e)}")
+        
+        # Without a final result there is nothing to store
+        if result is None:
+            yield f"event: error\ndata: {json.dumps({'detail': 'Grading stream ended without a result'})}\n\n"
+            return
+        
+        # Store grading result after the client already has it
+        try:
+            await grading_service.store_grading_result(
+                assignment_id=assignment_id,
+                student_id=grading_request.student_id,
+                score=result.get("score", 0),
+                feedback=result.get("feedback", ""),
+                strengths=result.get("strengths", []),
+                improvements=result.get("areas_for_improvement", []),
+                missed_concepts=result.get("missed_concepts", [])
+            )
+        except Exception as e:
+            logging.error(f"Error storing streamed grading result: {str(e)}")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, Depends
+from app.api.deps import get_container
+from app.core.container import ServiceContainer
 from app.infrastructure.database.database import get_db
 
 router = APIRouter()
@@ -20,4 +22,11 @@ async def db_health_check(db = Depends(get_db)):
         db.execute("SELECT 1")
         return {"status": "ok", "message": "Database connection is healthy"}
     except Exception as e:
-        return {"status": "error", "message": f"Database error: {str(e)}"}
\ No newline at end of file
+        return {"status": "error", "message": f"Database error: {str(e)}"}
+
+@router.get("/services")
+async def services_health_check(container: ServiceContainer = Depends(get_container)):
+    """
+    Shared service container status and startup/teardown timings.
+    """
+    return container.status()
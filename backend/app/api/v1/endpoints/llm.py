@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.api.deps import require_llm_admin
+from app.api.v1.endpoints.batch_grading import get_job_queue
+from app.infrastructure.queue.job_queue import JobQueue
+from app.domain.models.llm import LLMEndpointRequest
+from app.infrastructure.llm.endpoint_router import get_endpoint_router
+from app.infrastructure.llm.http_pool import get_http_pool
+
+router = APIRouter()
+
+@router.get("/endpoints")
+async def list_llm_endpoints():
+    """
+    List LMStudio endpoints with their outstanding requests, health and latency.
+    """
+    return get_endpoint_router().stats()
+
+@router.post("/endpoints", dependencies=[Depends(require_llm_admin)])
+async def add_llm_endpoint(request: LLMEndpointRequest, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Add an OpenAI-compatible endpoint; it receives new requests immediately.
+    The change is recorded in the job queue, batch workers pick it up on
+    their next job. Requires the X-Admin-Key header matching LLM_ADMIN_API_KEY.
+    """
+    endpoint = get_endpoint_router().add(request.url)
+    queue.set_llm_endpoint(request.url, draining=False)
+    return {"success": True, "endpoint": endpoint.status()}
+
+@router.post("/endpoints/drain", dependencies=[Depends(require_llm_admin)])
+async def drain_llm_endpoint(request: LLMEndpointRequest, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Stop sending new requests to an endpoint. It is removed once its
+    outstanding requests finish; batch workers drain it on their next job.
+    Requires the X-Admin-Key header.
+    """
+    if not get_endpoint_router().drain(request.url):
+        raise HTTPException(status_code=404, detail="LLM endpoint not found")
+    queue.set_llm_endpoint(request.url, draining=True)
+    return {"success": True, "message": f"Draining {request.url}"}
+
+@router.get("/pool/stats")
+async def get_http_pool_stats():
+    """
+    Shared HTTP connection pool limits, request counters and open connections,
+    for sizing the pool against batch concurrency.
+    """
+    return get_http_pool().stats()
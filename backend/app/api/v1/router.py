@@ -1,9 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import health, files, grading, batch_grading
+from app.api.v1.endpoints import health, files, grading, batch_grading, llm
 
 api_router = APIRouter()
 
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(files.router, prefix="/files", tags=["files"])
 api_router.include_router(grading.router, prefix="/grading", tags=["grading"])
-api_router.include_router(batch_grading.router, prefix="/batch-grading", tags=["batch-grading"])
\ No newline at end of file
+api_router.include_router(batch_grading.router, prefix="/batch-grading", tags=["batch-grading"])
+api_router.include_router(llm.router, prefix="/llm", tags=["llm"])
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 class Settings(BaseSettings):
     # API configuration
@@ -16,18 +16,114 @@ class Settings(BaseSettings):
     # LMStudio
     LMSTUDIO_URL: str = "http://localhost:1234/v1"
     LMSTUDIO_MODEL: str = "llama-3.2-3b-instruct"
+    # หลาย endpoint คั่นด้วย comma (ถ้าไม่ระบุใช้ LMSTUDIO_URL)
+    LMSTUDIO_URLS: Optional[str] = None
+    LLM_ENDPOINT_FAILURE_THRESHOLD: int = 3
+    LLM_ENDPOINT_COOLDOWN_SECONDS: float = 30.0
+    # key สำหรับ route ที่เพิ่ม/drain endpoint ขณะทำงาน (ไม่ตั้ง = ปิด route เหล่านั้น ใช้ LMSTUDIO_URLS อย่างเดียว)
+    LLM_ADMIN_API_KEY: Optional[str] = None
+    
+    # Shared HTTP connection pool for LLM and embedding calls (per process)
+    HTTP_POOL_MAX_CONNECTIONS: int = 64
+    HTTP_POOL_MAX_KEEPALIVE: int = 32
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_READ_TIMEOUT: float = 300.0
+    HTTP_MAX_RETRIES: int = 2
+    
+    # LLM backend: "lmstudio" (OpenAI-compatible server) or "llamacpp" (in-process, CPU only)
+    LLM_BACKEND: str = "lmstudio"
+    LOCAL_MODEL_PATH: Optional[str] = None
+    LOCAL_MODEL_CONTEXT: int = 8192
+    LOCAL_MODEL_THREADS: Optional[int] = None
+    LOCAL_MODEL_MAX_TOKENS: int = 1024
+    LOCAL_PROMPT_STATE_CACHE_SIZE: int = 4
+    
+    # Constrain LLM output to the grading JSON schema (response_format / grammar)
+    LLM_STRUCTURED_OUTPUT: bool = True
+    GRADING_REPAIR_ATTEMPTS: int = 1
+    
+    # Grading result cache
+    GRADING_CACHE_ENABLED: bool = True
+    GRADING_CACHE_SIZE: int = 1024
+    GRADING_CACHE_PATH: str = "data/grading_cache.sqlite3"
+    
+    # Grading mode: "full" sends the whole teacher key, "retrieval" only the relevant chunks
+    GRADING_MODE: str = "full"
+    RETRIEVAL_PROMPT_TOKEN_BUDGET: int = 3000
+    RETRIEVAL_TOP_K: int = 3
+    RETRIEVAL_SECTION_SIZE: int = 1000
     
     # Embedding model
     EMBEDDING_MODEL: str ="text-embedding-bge-m3"
     EMBEDDING_DIMENSION: int = 1536
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_BATCH_MAX_TOKENS: int = 8000
+    EMBEDDING_BATCH_WAIT_MS: float = 10.0
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: str = "data/embedding_cache"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 50000
+    EMBEDDING_BREAKER_FAILURES: int = 3
+    EMBEDDING_BREAKER_RESET_SECONDS: float = 30.0
+    EMBEDDING_SLOW_CALL_SECONDS: float = 10.0
+    EMBEDDING_PROBE_INTERVAL_SECONDS: float = 15.0
+    
+    # Vector store: "milvus" หรือ "numpy" (เก็บในไฟล์ภายใน process สำหรับเครื่องเล็ก/CI ที่ไม่มี Milvus)
+    VECTOR_STORE: str = "milvus"
+    NUMPY_STORE_DIR: str = "data/vector_store"
+    NUMPY_STORE_INITIAL_CAPACITY: int = 10000
     
     # Milvus
     MILVUS_HOST: str = "localhost"
     MILVUS_PORT: int = 19530
-    MILVUS_COLLECTION: str = "grading_docs"
+    # collection แบ่งตาม assignment_id (partition key) ค้นหาแต่ละงานจึงไม่ต้อง scan vector ของงานอื่น
+    MILVUS_COLLECTION: str = "grading_chunks"
+    MILVUS_NUM_PARTITIONS: int = 64
+    MILVUS_METRIC_TYPE: str = "COSINE"
+    # ANN index: HNSW (params M, efConstruction / search ef) หรือ IVF_FLAT (nlist / search nprobe)
+    MILVUS_INDEX_TYPE: str = "HNSW"
+    MILVUS_INDEX_PARAMS: Dict[str, Any] = {"M": 16, "efConstruction": 200}
+    MILVUS_SEARCH_PARAMS: Dict[str, Any] = {"ef": 64}
+    MILVUS_CONSISTENCY_LEVEL: str = "Session"
+    
+    # Vector ingestion buffer
+    VECTOR_INGEST_BATCH_ROWS: int = 1000
+    VECTOR_INGEST_MAX_AGE_SECONDS: float = 2.0
+    VECTOR_INGEST_MAX_PENDING_ROWS: int = 10000
     
     # File storage
     UPLOAD_DIR: str = "uploads"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024
+    BULK_UPLOAD_MAX_FILES: int = 500
+    
+    # PDF extraction
+    PDF_WORKERS: int = 2
+    PDF_PAGES_PER_JOB: int = 25
+    # timeout ต่อช่วงหน้า (PDF_PAGES_PER_JOB หน้า) ไม่ใช่ต่อเอกสาร
+    PDF_EXTRACTION_TIMEOUT_SECONDS: float = 120.0
+    PDF_WORKER_MEMORY_LIMIT_MB: int = 1024
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_DIR: str = "data/extracted_text"
+    
+    # Batch grading
+    BATCH_CONCURRENCY: int = 4
+    BATCH_MIN_CONCURRENCY: int = 1
+    BATCH_MAX_CONCURRENCY: int = 16
+    BATCH_TARGET_LATENCY_SECONDS: float = 30.0
+    BATCH_FETCH_CHUNK_SIZE: int = 200
+    BATCH_RESULTS_FLUSH_ROWS: int = 50
+    BATCH_RESULTS_FLUSH_SECONDS: float = 2.0
+    
+    # Batch job queue
+    JOB_QUEUE_PATH: str = "data/jobs.sqlite3"
+    BATCH_WORKERS: int = 2
+    JOB_LEASE_SECONDS: float = 120.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_POLL_SECONDS: float = 1.0
+    BATCH_EVENTS_POLL_SECONDS: float = 0.5
+    # เก็บ progress event ของ batch ที่จบแล้วไว้นานเท่านี้ (ให้ client ที่ reconnect ได้ event ครบ)
+    BATCH_EVENTS_RETENTION_SECONDS: float = 3600.0
     
     class Config:
         env_file = ".env"
@@ -40,5 +136,12 @@ class Settings(BaseSettings):
             # ถ้าเป็น string เดียวอาจมีหลาย origins คั่นด้วย comma
             return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
         return self.CORS_ORIGINS
+    
+    @property
+    def lmstudio_urls(self) -> List[str]:
+        """ รายการ LMStudio endpoint ทั้งหมด """
+        if self.LMSTUDIO_URLS:
+            return [url.strip() for url in self.LMSTUDIO_URLS.split(",") if url.strip()]
+        return [self.LMSTUDIO_URL]
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,150 @@
+# backend/app/core/container.py
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Union
+
+from app.core.config import settings
+from app.domain.services.rag_service import RAGService
+from app.infrastructure.llm.chains import GradingChain
+from app.infrastructure.llm.grading_cache import GradingCache
+from app.infrastructure.llm.http_pool import close_http_pool
+from app.infrastructure.rag.embedding_router import EmbeddingRouter
+from app.infrastructure.rag.ingestion_buffer import VectorIngestionBuffer
+from app.infrastructure.rag.milvus_client import MilvusClient
+from app.infrastructure.rag.numpy_store import NumpyVectorStore
+from app.infrastructure.rag.vector_store import create_vector_store
+from app.utils.concurrency import SingleFlight
+from app.utils.pdf_processor import shutdown_pdf_extraction_pool
+
+
+class ServiceContainer:
+    """
+    เก็บ service ที่สร้างยาก (LLM client, embedding client, Milvus connection)
+    ให้สร้างครั้งเดียวตอนเริ่มระบบ และใช้ร่วมกันทุก request
+    """
+
+    def __init__(self):
+        self.grading_cache: Optional[GradingCache] = None
+        self.grading_chain: Optional[GradingChain] = None
+        self.embedding_service: Optional[EmbeddingRouter] = None
+        # MilvusClient หรือ NumpyVectorStore ตาม VECTOR_STORE
+        self.milvus_client: Optional[Union[MilvusClient, NumpyVectorStore]] = None
+        self.vector_ingestion: Optional[VectorIngestionBuffer] = None
+        self.rag_service: Optional[RAGService] = None
+        self.grading_flights = SingleFlight()
+
+        # เวลาที่ใช้สร้าง/ปิดแต่ละ service (วินาที)
+        self.timings: Dict[str, float] = {}
+        self.started = False
+
+    @contextmanager
+    def _timed(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    async def startup(self, milvus_client: Optional[Union[MilvusClient, NumpyVectorStore]] = None):
+        """สร้าง service ทั้งหมด"""
+        with self._timed("startup"):
+            if settings.GRADING_CACHE_ENABLED:
+                with self._timed("grading_cache"):
+                    self.grading_cache = GradingCache()
+
+            with self._timed("grading_chain"):
+                self.grading_chain = self._build("grading chain", lambda: GradingChain(cache=self.grading_cache))
+
+            with self._timed("embedding_service"):
+                self.embedding_service = self._build("embedding service", EmbeddingRouter)
+                if self.embedding_service is not None:
+                    self.embedding_service.start_health_probe()
+
+            with self._timed("milvus_client"):
+                self.milvus_client = milvus_client or self._build(f"{settings.VECTOR_STORE} vector store", create_vector_store)
+            
+            # RAGService จำเอกสารที่ index แล้ว จึงใช้ตัวเดียวร่วมกันทุก request
+            if self.milvus_client is not None:
+                self.vector_ingestion = VectorIngestionBuffer(
+                    self.milvus_client,
+                    max_rows=settings.VECTOR_INGEST_BATCH_ROWS,
+                    max_age=settings.VECTOR_INGEST_MAX_AGE_SECONDS,
+                    max_pending_rows=settings.VECTOR_INGEST_MAX_PENDING_ROWS
+                )
+            if self.milvus_client is not None and self.embedding_service is not None:
+                self.rag_service = RAGService(
+                    embedding_service=self.embedding_service,
+                    milvus_client=self.milvus_client,
+                    ingestion_buffer=self.vector_ingestion
+                )
+
+        self.started = True
+        logging.info(f"Service container started: {self._format_timings()}")
+
+    async def shutdown(self):
+        """ปิด connection ของ service ทั้งหมด"""
+        with self._timed("shutdown"):
+            if self.embedding_service is not None:
+                await self.embedding_service.stop_health_probe()
+
+            # Buffered vectors must be written before the connection closes
+            if self.vector_ingestion is not None:
+                try:
+                    await self.vector_ingestion.drain()
+                except Exception as e:
+                    logging.error(f"Error draining vector ingestion buffer: {str(e)}")
+            
+            if self.milvus_client is not None:
+                try:
+                    self.milvus_client.close()
+                except Exception as e:
+                    logging.error(f"Error closing vector store: {str(e)}")
+
+            shutdown_pdf_extraction_pool()
+            await close_http_pool()
+
+            self.grading_chain = None
+            self.rag_service = None
+            self.vector_ingestion = None
+            self.embedding_service = None
+            self.milvus_client = None
+            self.grading_cache = None
+
+        self.started = False
+        logging.info(f"Service container stopped in {self.timings['shutdown']:.3f}s")
+
+    def _build(self, name: str, factory):
+        """
+        สร้าง service หนึ่งตัว ถ้าสร้างไม่ได้จะบันทึก error และคืนค่า None
+        เพื่อไม่ให้ระบบทั้งหมดเริ่มต้นไม่ได้
+        """
+        try:
+            return factory()
+        except Exception as e:
+            logging.error(f"Could not create {name}: {str(e)}")
+            return None
+
+    def _format_timings(self) -> str:
+        return ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.timings.items())
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "started": self.started,
+            "grading_chain_available": self.grading_chain is not None,
+            "llm_backend": settings.LLM_BACKEND,
+            "llm_endpoints": (
+                self.grading_chain.router.stats()
+                if self.grading_chain and self.grading_chain.router else None
+            ),
+            "local_model": (
+                self.grading_chain.local_model.stats()
+                if self.grading_chain and self.grading_chain.local_model else None
+            ),
+            "embedding": self.embedding_service.status() if self.embedding_service else None,
+            "milvus_available": self.milvus_client is not None,
+            "vector_store": settings.VECTOR_STORE,
+            "vector_ingestion": self.vector_ingestion.stats() if self.vector_ingestion else None,
+            "grading_flights": self.grading_flights.stats(),
+            "timings": self.timings,
+        }
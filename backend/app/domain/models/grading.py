@@ -1,8 +1,9 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class GradingRequest(BaseModel):
     student_id: str
+    mode: Optional[Literal["full", "retrieval"]] = None
 
 class GradingResponse(BaseModel):
     assignment_id: str
@@ -12,6 +13,7 @@ class GradingResponse(BaseModel):
     strengths: List[str] = []
     areas_for_improvement: List[str] = []
     missed_concepts: List[str] = []
+    prompt_tokens_saved: Optional[int] = None
 
 class GradingSimilarity(BaseModel):
     teacher_text: str
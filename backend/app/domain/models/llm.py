@@ -0,0 +1,4 @@
+from pydantic import BaseModel
+
+class LLMEndpointRequest(BaseModel):
+    url: str
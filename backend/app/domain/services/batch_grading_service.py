@@ -1,14 +1,19 @@
 from app.domain.services.file_service import FileService
 from app.domain.services.grading_service import GradingService
+from app.infrastructure.database.bulk_writer import BufferedTableWriter
+from app.utils.concurrency import AdaptiveConcurrencyLimiter
+from app.utils.pdf_processor import extract_text_from_pdf_async
+from app.core.config import settings
 from fastapi import UploadFile
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Callable, Tuple
 import asyncio
+import logging
 
 class BatchGradingService:
-    def __init__(self, db):
+    def __init__(self, db, grading_service: Optional[GradingService] = None):
         self.db = db
         self.file_service = FileService(db)
-        self.grading_service = GradingService(db)
+        self.grading_service = grading_service or GradingService(db)
     
     async def process_teacher_file(
         self,
@@ -20,22 +25,22 @@ class BatchGradingService:
         Process and store the teacher's answer key.
         """
         # Save the file
-        file_path = await self.file_service.save_file(
+        stored = await self.file_service.store_upload(
             teacher_file,
             "teacher",
             assignment_id
         )
+        file_path = stored.path
         
         # Extract text content
-        from app.utils.pdf_processor import extract_text_from_pdf
-        text_content = extract_text_from_pdf(file_path)
+        text_content = await extract_text_from_pdf_async(file_path, stored.sha256)
         
         # Create file record
         file_record = await self.file_service.create_file_record(
             file_name=teacher_file.filename,
             file_path=file_path,
             file_type="teacher",
-            file_size=0,  # Will be updated after saving
+            file_size=stored.size,
             mime_type=teacher_file.content_type,
             assignment_id=assignment_id,
             text_content=text_content
@@ -54,9 +59,22 @@ class BatchGradingService:
         
         return file_record
     
-    async def process_batch(self, batch_id: str, student_file_ids: List[str]):
+    async def process_batch(
+        self,
+        batch_id: str,
+        student_file_ids: List[str],
+        skip_student_file_ids: Optional[Set[str]] = None,
+        checkpoint: Optional[Callable[[List[Tuple[str, str]]], None]] = None,
+        progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ):
         """
         Process a batch of student submissions.
+        
+        Students in skip_student_file_ids were already graded by an earlier run
+        and are skipped; students that errored are not in it and are graded
+        again. checkpoint is called with (student_file_id, status)
+        pairs once their results are written to batch_results. progress is
+        called with an event name and payload as each student finishes.
         """
         # Get batch info
         batch_info = self.db.table("batch_grading")\
@@ -84,19 +102,118 @@ class BatchGradingService:
         if not teacher_file:
             raise ValueError("Teacher file not found")
         
-        # Process each student submission
-        for student_file_id in student_file_ids:
-            # Get student file
-            student_file = self.db.table("files")\
-                .select("*")\
-                .eq("id", student_file_id)\
+        total = len(student_file_ids)
+        if skip_student_file_ids:
+            student_file_ids = [
+                student_file_id for student_file_id in student_file_ids
+                if student_file_id not in skip_student_file_ids
+            ]
+            logging.info(
+                f"Batch {batch_id}: resuming, {len(skip_student_file_ids)} students already graded"
+            )
+        if checkpoint:
+            # Students that errored in an earlier run are graded again, drop their old error rows
+            self.db.table("batch_results")\
+                .delete()\
+                .eq("batch_id", batch_id)\
+                .eq("status", "error")\
+                .execute()
+        
+        # Fetch student files with one filtered query (chunked to keep the URL short),
+        # selecting only the columns grading needs
+        student_files = {}
+        fetch_queries = 0
+        for i in range(0, len(student_file_ids), settings.BATCH_FETCH_CHUNK_SIZE):
+            chunk_ids = student_file_ids[i:i + settings.BATCH_FETCH_CHUNK_SIZE]
+            rows = self.db.table("files")\
+                .select("id, student_id, text_content")\
+                .in_("id", chunk_ids)\
                 .execute()\
-                .data[0]
-                
-            if not student_file:
-                continue
-            
-            try:
+                .data
+            fetch_queries += 1
+            for row in rows:
+                student_files[row["id"]] = row
+        
+        tracker = BatchProgress(total, total - len(student_file_ids), progress)
+        tracker.publish("started")
+        
+        # Grade student submissions concurrently, bounded by an adaptive limit
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=settings.BATCH_CONCURRENCY,
+            min_limit=settings.BATCH_MIN_CONCURRENCY,
+            max_limit=settings.BATCH_MAX_CONCURRENCY,
+            target_latency=settings.BATCH_TARGET_LATENCY_SECONDS
+        )
+        writer = BufferedTableWriter(
+            self.db,
+            "batch_results",
+            max_rows=settings.BATCH_RESULTS_FLUSH_ROWS,
+            flush_interval=settings.BATCH_RESULTS_FLUSH_SECONDS,
+            on_flush=(
+                (lambda rows: checkpoint([(row["student_file_id"], row["status"]) for row in rows]))
+                if checkpoint else None
+            )
+        )
+        
+        try:
+            await asyncio.gather(*[
+                self._process_student(
+                    batch_id,
+                    batch_info,
+                    teacher_file,
+                    student_file_id,
+                    student_files.get(student_file_id),
+                    limiter,
+                    writer,
+                    tracker
+                )
+                for student_file_id in student_file_ids
+            ])
+        finally:
+            await writer.close()
+        
+        # One select and one insert per student before, versus the bulk queries now
+        round_trips_saved = (
+            len(student_file_ids) + len(student_files) - fetch_queries - writer.insert_calls
+        )
+        logging.info(
+            f"Batch {batch_id} grading stats: {limiter.stats()}, "
+            f"round trips saved: {round_trips_saved}, "
+            f"prompt tokens saved: {tracker.prompt_tokens_saved}"
+        )
+        
+        # Update batch status
+        self.db.table("batch_grading")\
+            .update({
+                "status": "completed",
+                "completed_at": "now()"
+            })\
+            .eq("id", batch_id)\
+            .execute()
+        
+        tracker.publish("completed", {"prompt_tokens_saved": tracker.prompt_tokens_saved})
+    
+    async def _process_student(
+        self,
+        batch_id: str,
+        batch_info: Dict[str, Any],
+        teacher_file: Dict[str, Any],
+        student_file_id: str,
+        student_file: Optional[Dict[str, Any]],
+        limiter: AdaptiveConcurrencyLimiter,
+        writer: BufferedTableWriter,
+        tracker: "BatchProgress"
+    ):
+        """
+        Grade one student submission and buffer its result.
+        Errors are recorded per student and never abort the batch.
+        """
+        if not student_file:
+            tracker.student_done(student_file_id, None, "missing")
+            return
+        
+        try:
+            async with limiter.slot() as slot:
                 # Grade the submission
                 result = await self.grading_service.grade_submission(
                     teacher_text=teacher_file["text_content"],
@@ -105,40 +222,60 @@ class BatchGradingService:
                     student_id=student_file["student_id"]
                 )
                 
-                # Store the result
-                result_data = {
-                    "batch_id": batch_id,
-                    "student_file_id": student_file_id,
-                    "student_id": student_file["student_id"],
-                    "score": result["score"],
-                    "feedback": result["feedback"],
-                    "strengths": result.get("strengths", []),
-                    "areas_for_improvement": result.get("areas_for_improvement", []),
-                    "missed_concepts": result.get("missed_concepts", []),
-                    "status": "completed",
-                    "graded_at": "now()"
-                }
-                
-                self.db.table("batch_results").insert(result_data).execute()
-                
-            except Exception as e:
-                print(f"Error processing student {student_file_id}: {str(e)}")
-                # Record the error
-                error_data = {
-                    "batch_id": batch_id,
-                    "student_file_id": student_file_id,
-                    "student_id": student_file.get("student_id"),
-                    "status": "error",
-                    "error_message": str(e)
-                }
-                
-                self.db.table("batch_results").insert(error_data).execute()
+                # The grading chain returns a fallback result instead of raising,
+                # count it as a backend failure for the limiter
+                if "error" in result:
+                    slot.mark_failed()
+            
+            tracker.prompt_tokens_saved += result.get("prompt_tokens_saved") or 0
+            
+            # Store the result
+            row = {
+                "batch_id": batch_id,
+                "student_file_id": student_file_id,
+                "student_id": student_file["student_id"],
+                "score": result["score"],
+                "feedback": result["feedback"],
+                "strengths": result.get("strengths", []),
+                "areas_for_improvement": result.get("areas_for_improvement", []),
+                "missed_concepts": result.get("missed_concepts", []),
+                "status": "completed",
+                "graded_at": "now()"
+            }
+            if "error" in result:
+                # The chain's fallback result is not a grade: store it as an error so it
+                # is not checkpointed and a resumed job grades this student again
+                row.update({"status": "error", "error_message": result["error"]})
+            status, score = row["status"], result["score"]
+            
+        except Exception as e:
+            logging.error(f"Error processing student {student_file_id}: {str(e)}")
+            # Record the error
+            row = {
+                "batch_id": batch_id,
+                "student_file_id": student_file_id,
+                "student_id": student_file.get("student_id"),
+                "status": "error",
+                "error_message": str(e)
+            }
+            status, score = "error", None
         
-        # Update batch status
-        self.db.table("batch_grading")\
-            .update({"status": "completed", "completed_at": "now()"})\
+        # Outside the per-student try: a failed bulk insert is retried by the
+        # writer and surfaces once from writer.close(), not as this student's error
+        await writer.add(row)
+        tracker.student_done(student_file_id, student_file.get("student_id"), status, score)
+    
+    async def get_batch_status(self, batch_id: str):
+        """
+        Get the status of a batch grading process.
+        """
+        rows = self.db.table("batch_grading")\
+            .select("status")\
             .eq("id", batch_id)\
-            .execute()
+            .execute()\
+            .data
+            
+        return rows[0]["status"] if rows else None
     
     async def get_batch_results(self, batch_id: str):
         """
@@ -150,4 +287,58 @@ class BatchGradingService:
             .execute()\
             .data
             
-        return results
\ No newline at end of file
+        return results
+
+class BatchProgress:
+    """
+    Running progress counters for a batch, reported through a callback.
+    """
+    def __init__(
+        self,
+        total: int,
+        skipped: int,
+        publish: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.failed = 0
+        self.prompt_tokens_saved = 0
+        self._publish = publish
+    
+    def counters(self) -> Dict[str, int]:
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "remaining": self.total - self.skipped - self.completed - self.failed
+        }
+    
+    def student_done(
+        self,
+        student_file_id: str,
+        student_id: Optional[str],
+        status: str,
+        score: Optional[int] = None
+    ):
+        if status == "completed":
+            self.completed += 1
+        else:
+            self.failed += 1
+        
+        self.publish("student", {
+            "student_file_id": student_file_id,
+            "student_id": student_id,
+            "status": status,
+            "score": score
+        })
+    
+    def publish(self, event: str, data: Optional[Dict[str, Any]] = None):
+        if not self._publish:
+            return
+        try:
+            self._publish(event, {**(data or {}), "progress": self.counters()})
+        except Exception as e:
+            # Progress reporting must never break grading
+            logging.error(f"Error publishing batch progress: {str(e)}")
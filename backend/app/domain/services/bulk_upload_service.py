@@ -0,0 +1,128 @@
+from app.domain.services.file_service import FileService, StoredFile
+from app.utils.pdf_processor import extract_document_from_pdf_async
+from app.core.config import settings
+from fastapi import UploadFile
+from typing import List, Dict, Any
+import asyncio
+import logging
+import os
+import zipfile
+
+class BulkUploadService:
+    """
+    Store many PDF submissions at once, given as separate files or ZIP archives.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.file_service = FileService(db)
+
+    async def upload(
+        self,
+        uploads: List[UploadFile],
+        file_type: str,
+        assignment_id: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Stream every PDF to disk, extract text in parallel and create all
+        files rows with one bulk insert. Returns a per-file manifest.
+        """
+        manifest: List[Dict[str, Any]] = []
+        stored: List[tuple] = []
+
+        for upload in uploads:
+            name = upload.filename or ""
+            if name.lower().endswith(".zip"):
+                await self._store_archive(upload, manifest, stored)
+            elif name.lower().endswith(".pdf"):
+                await self._store_one(
+                    name,
+                    upload.content_type or "application/pdf",
+                    lambda upload=upload: self.file_service.store_upload(upload, file_type, assignment_id),
+                    manifest,
+                    stored
+                )
+            else:
+                manifest.append({"file_name": name, "status": "skipped", "error": "Only PDF and ZIP files are allowed"})
+
+        # Extract text for all stored files in parallel on the PDF process pool
+        documents = await asyncio.gather(*[
+            extract_document_from_pdf_async(stored_file.path, stored_file.sha256)
+            for _, _, stored_file in stored
+        ])
+
+        rows = [
+            self.file_service.build_file_data(
+                file_name=entry["file_name"],
+                file_path=stored_file.path,
+                file_type=file_type,
+                file_size=stored_file.size,
+                mime_type=mime_type,
+                assignment_id=assignment_id,
+                text_content=document.text
+            )
+            for (entry, mime_type, stored_file), document in zip(stored, documents)
+        ]
+
+        records = await self.file_service.create_file_records(rows)
+        for (entry, _, _), record, document in zip(stored, records, documents):
+            entry["id"] = record.get("id")
+            entry["student_id"] = record.get("student_id")
+            entry["page_offsets"] = document.page_offsets
+
+        logging.info(f"Bulk upload stored {len(stored)} files for assignment {assignment_id}")
+        return manifest
+
+    async def _store_one(self, name, mime_type, store, manifest, stored):
+        """Store one PDF and add its manifest entry, isolating per-file errors"""
+        if len(stored) >= settings.BULK_UPLOAD_MAX_FILES:
+            manifest.append({
+                "file_name": name,
+                "status": "skipped",
+                "error": f"Bulk upload is limited to {settings.BULK_UPLOAD_MAX_FILES} files"
+            })
+            return
+
+        try:
+            stored_file: StoredFile = await store()
+        except Exception as e:
+            logging.error(f"Error storing {name}: {str(e)}")
+            manifest.append({"file_name": name, "status": "error", "error": str(e)})
+            return
+
+        entry = {
+            "file_name": name,
+            "status": "stored",
+            "file_path": stored_file.path,
+            "sha256": stored_file.sha256,
+            "size": stored_file.size,
+            "deduplicated": stored_file.deduplicated
+        }
+        manifest.append(entry)
+        stored.append((entry, mime_type, stored_file))
+
+    async def _store_archive(self, upload: UploadFile, manifest, stored):
+        """Stream every PDF inside a ZIP archive to disk"""
+        try:
+            # UploadFile is already spooled to a temporary file, so it can be read in place
+            archive = await asyncio.to_thread(zipfile.ZipFile, upload.file)
+        except zipfile.BadZipFile as e:
+            manifest.append({"file_name": upload.filename, "status": "error", "error": f"Invalid ZIP archive: {e}"})
+            return
+
+        with archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or info.filename.startswith("__MACOSX/") or not name:
+                    continue
+                if not name.lower().endswith(".pdf"):
+                    manifest.append({"file_name": name, "status": "skipped", "error": "Only PDF files are allowed"})
+                    continue
+
+                async def store(info=info, name=name):
+                    member = await asyncio.to_thread(archive.open, info)
+                    try:
+                        return await self.file_service.store_stream(member, name)
+                    finally:
+                        await asyncio.to_thread(member.close)
+
+                await self._store_one(name, "application/pdf", store, manifest, stored)
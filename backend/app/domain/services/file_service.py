@@ -1,8 +1,21 @@
 # backend/app/domain/services/file_service.py
+import asyncio
+import hashlib
 import os
 import uuid
 from datetime import datetime
 import logging
+from typing import Any, Dict, List, NamedTuple
+from app.core.config import settings
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_SIZE"""
+
+class StoredFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+    deduplicated: bool
 
 class FileService:
     def __init__(self, db):
@@ -10,48 +23,115 @@ class FileService:
         
     async def save_file(self, file, file_type, assignment_id):
         """Save uploaded file to disk"""
-        # Create unique filename
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
+        stored = await self.store_upload(file, file_type, assignment_id)
+        return stored.path
+    
+    async def store_upload(self, file, file_type, assignment_id) -> StoredFile:
+        """
+        Stream an upload to disk in chunks, hashing it on the way.
+        
+        Files are stored once per content under UPLOAD_DIR/objects/<sha256>,
+        so re-uploading identical content reuses the existing file.
+        """
+        return await self._store_chunks(file.read, file.filename)
+    
+    async def store_stream(self, fileobj, filename: str) -> StoredFile:
+        """
+        Same as store_upload for a blocking file object (e.g. a ZIP member),
+        read off the event loop.
+        """
+        return await self._store_chunks(
+            lambda size: asyncio.to_thread(fileobj.read, size),
+            filename
+        )
+    
+    async def _store_chunks(self, read_chunk, filename: str) -> StoredFile:
+        tmp_dir = os.path.join(settings.UPLOAD_DIR, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4()}.part")
         
-        # Create directory path
-        upload_path = os.path.join("uploads", assignment_id, file_type)
-        os.makedirs(upload_path, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await read_chunk(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise FileTooLargeError(
+                        f"File exceeds the maximum upload size of {settings.MAX_UPLOAD_SIZE} bytes"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.remove, tmp_path)
+            raise
+        await asyncio.to_thread(f.close)
         
-        # Create file path
-        file_path = os.path.join(upload_path, unique_filename)
+        sha256 = digest.hexdigest()
+        extension = os.path.splitext(filename or "")[1].lower()
+        object_dir = os.path.join(settings.UPLOAD_DIR, "objects", sha256[:2])
+        os.makedirs(object_dir, exist_ok=True)
+        file_path = os.path.join(object_dir, f"{sha256}{extension}")
         
-        # Write file to disk
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
-            
-        return file_path
+        if os.path.exists(file_path):
+            # Identical content is already stored, keep a single copy
+            await asyncio.to_thread(os.remove, tmp_path)
+            logging.info(f"Upload {filename} matches stored file {file_path}")
+            return StoredFile(file_path, sha256, size, True)
+        
+        await asyncio.to_thread(os.replace, tmp_path, file_path)
+        return StoredFile(file_path, sha256, size, False)
+    
+    def build_file_data(self, file_name, file_path, file_type, file_size,
+                        mime_type, assignment_id, text_content):
+        """Build a files row for an uploaded file"""
+        # Extract student_id from filename if it's a student submission
+        student_id = None
+        if file_type == "student":
+            student_id = file_name.split('_')[0] if '_' in file_name else "unknown"
+        
+        return {
+            "file_name": file_name,
+            "file_path": file_path,
+            "file_type": file_type,
+            "file_size": file_size,
+            "mime_type": mime_type,
+            "assignment_id": assignment_id,
+            "student_id": student_id,
+            "text_content": text_content,
+            "created_at": datetime.now().isoformat()
+        }
     
     async def create_file_record(self, file_name, file_path, file_type, file_size, 
                              mime_type, assignment_id, text_content):
         """Create a record of the uploaded file in Supabase"""
         try:
-            # Extract student_id from filename if it's a student submission
-            student_id = None
-            if file_type == "student":
-                student_id = file_name.split('_')[0] if '_' in file_name else "unknown"
-            
             # Create file record in database using Supabase
-            file_data = {
-                "file_name": file_name,
-                "file_path": file_path,
-                "file_type": file_type,
-                "file_size": file_size,
-                "mime_type": mime_type,
-                "assignment_id": assignment_id,
-                "student_id": student_id,
-                "text_content": text_content,
-                "created_at": datetime.now().isoformat()
-            }
+            file_data = self.build_file_data(
+                file_name, file_path, file_type, file_size,
+                mime_type, assignment_id, text_content
+            )
             
             result = await self.db.execute("INSERT INTO files", file_data)
             return result.data[0] if result.data else {}
             
         except Exception as e:
             logging.error(f"Database error: {str(e)}")
-            raise Exception(f"Failed to create file record: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Failed to create file record: {str(e)}")
+    
+    async def create_file_records(self, file_rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create many file records with a single bulk insert"""
+        if not file_rows:
+            return []
+        try:
+            result = await asyncio.to_thread(
+                lambda: self.db.table("files").insert(file_rows).execute()
+            )
+            return result.data or []
+        except Exception as e:
+            logging.error(f"Database error: {str(e)}")
+            raise Exception(f"Failed to create file records: {str(e)}")
@@ -1,14 +1,35 @@
 from app.infrastructure.llm.chains import GradingChain
-from app.infrastructure.rag.embeddings import EmbeddingService
+from app.infrastructure.rag.embedding_router import EmbeddingRouter
 from app.infrastructure.rag.milvus_client import MilvusClient
-from typing import List, Dict, Any
+from app.domain.services.rag_service import RAGService
+from app.domain.services.retrieval_prompt import RetrievalPromptBuilder
+from app.core.config import settings
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import hashlib
+import logging
 
 class GradingService:
-    def __init__(self, db):
+    def __init__(
+        self,
+        db,
+        grading_chain: Optional[GradingChain] = None,
+        embedding_service: Optional[EmbeddingRouter] = None,
+        milvus_client: Optional[MilvusClient] = None,
+        rag_service: Optional[RAGService] = None
+    ):
+        """
+        Shared services come from the application's ServiceContainer;
+        they are only built here when used outside the API (e.g. scripts).
+        """
         self.db = db
-        self.grading_chain = GradingChain()
-        self.embedding_service = EmbeddingService()
-        self.milvus_client = MilvusClient()
+        self.grading_chain = grading_chain or GradingChain()
+        self.embedding_service = embedding_service or EmbeddingRouter()
+        self.milvus_client = milvus_client
+        
+        # Retrieval mode needs a vector store, without one grading always uses the full prompt
+        if rag_service is None and milvus_client is not None:
+            rag_service = RAGService(embedding_service=self.embedding_service, milvus_client=milvus_client)
+        self.prompt_builder = RetrievalPromptBuilder(rag_service) if rag_service else None
     
     async def get_teacher_file(self, assignment_id: str):
         """
@@ -40,19 +61,114 @@ class GradingService:
         teacher_text: str, 
         student_text: str, 
         assignment_id: str,
-        student_id: str
+        student_id: str,
+        mode: Optional[str] = None
     ):
         """
         Grade a student submission using LLM.
+        In retrieval mode only the relevant parts of the teacher key are sent
+        and the result includes prompt_tokens_saved.
         """
+        mode = mode or settings.GRADING_MODE
+        prompt_tokens_saved = None
+        if mode == "retrieval":
+            teacher_text, prompt_tokens_saved = await self._trim_teacher_text(
+                assignment_id, teacher_text, student_text
+            )
+        
         # Use the grading chain to evaluate the submission
         grading_result = await self.grading_chain.grade_submission(
             teacher_text=teacher_text,
             student_text=student_text
         )
         
+        if prompt_tokens_saved is not None:
+            grading_result = {**grading_result, "prompt_tokens_saved": prompt_tokens_saved}
+        
         return grading_result
     
+    async def stream_grading(
+        self,
+        teacher_text: str,
+        student_text: str,
+        assignment_id: str,
+        student_id: str,
+        mode: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of grade_submission, see GradingChain.stream_submission.
+        """
+        mode = mode or settings.GRADING_MODE
+        prompt_tokens_saved = None
+        if mode == "retrieval":
+            teacher_text, prompt_tokens_saved = await self._trim_teacher_text(
+                assignment_id, teacher_text, student_text
+            )
+        
+        async for event, data in self.grading_chain.stream_submission(teacher_text, student_text):
+            if event == "result" and prompt_tokens_saved is not None:
+                data = {**data, "prompt_tokens_saved": prompt_tokens_saved}
+            yield event, data
+    
+    async def _trim_teacher_text(self, assignment_id: str, teacher_text: str, student_text: str):
+        """
+        Keep only the teacher key chunks relevant to the submission.
+        Falls back to the full key when retrieval is unavailable.
+        """
+        if self.prompt_builder is None:
+            logging.warning("Retrieval grading requested but no vector store is available, using full prompt")
+            return teacher_text, 0
+        
+        try:
+            prompt = await self.prompt_builder.build(assignment_id, teacher_text, student_text)
+        except Exception as e:
+            logging.warning(f"Retrieval prompt failed for assignment {assignment_id}, using full prompt: {str(e)}")
+            return teacher_text, 0
+        
+        logging.info(
+            f"Retrieval prompt for assignment {assignment_id}: "
+            f"{prompt.prompt_tokens}/{prompt.full_prompt_tokens} tokens, saved {prompt.tokens_saved}"
+        )
+        return prompt.teacher_text, prompt.tokens_saved
+    
+    async def grade_and_store(
+        self,
+        teacher_text: str,
+        student_text: str,
+        assignment_id: str,
+        student_id: str,
+        mode: Optional[str] = None
+    ):
+        """
+        Grade a submission and store its result once.
+        """
+        result = await self.grade_submission(teacher_text, student_text, assignment_id, student_id, mode=mode)
+        
+        try:
+            await self.store_grading_result(
+                assignment_id=assignment_id,
+                student_id=student_id,
+                score=result["score"],
+                feedback=result["feedback"],
+                strengths=result.get("strengths", []),
+                improvements=result.get("areas_for_improvement", []),
+                missed_concepts=result.get("missed_concepts", [])
+            )
+        except Exception as e:
+            logging.error(f"Error storing grading result for {assignment_id}/{student_id}: {str(e)}")
+        
+        return result
+    
+    @staticmethod
+    def flight_key(assignment_id: str, student_id: str, teacher_text: str, student_text: str, mode: Optional[str] = None):
+        """
+        Key of one grading request: identical keys share one in-flight LLM call.
+        """
+        digest = hashlib.sha256(
+            f"{mode or settings.GRADING_MODE}\0{teacher_text}\0{student_text}".encode("utf-8")
+        ).hexdigest()
+        return f"{assignment_id}:{student_id}:{digest}"
+    
     async def store_grading_result(
         self,
         assignment_id: str,
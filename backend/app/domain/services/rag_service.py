@@ -1,49 +1,90 @@
-from app.infrastructure.rag.embeddings import EmbeddingService
-from app.infrastructure.rag.backup_embeddings import BackupEmbeddingService
+from app.infrastructure.rag.embedding_router import EmbeddingRouter
+from app.infrastructure.rag.embedding_cache import EmbeddingCache, get_embedding_cache
+from app.core.config import settings
 from app.infrastructure.rag.milvus_client import MilvusClient
-from typing import List, Dict, Any
-import json
+from app.infrastructure.rag.vector_store import create_vector_store
+from app.infrastructure.rag.ingestion_buffer import VectorIngestionBuffer
+from typing import List, Dict, Any, Optional
+from functools import partial
+import asyncio
 
 class RAGService:
-    def __init__(self):
-        try:
-            # พยายามใช้ LMStudio embedding service ก่อน
-            self.embedding_service = EmbeddingService()
-            # ทดสอบว่าใช้งานได้
-            test_embedding = self.embedding_service.get_query_embedding("test")
-            if not test_embedding or len(test_embedding) == 0:
-                raise ValueError("LMStudio embedding returned empty result")
-        except Exception as e:
-            print(f"Warning: LMStudio embedding service failed: {e}")
-            # ถ้าไม่สำเร็จ ให้ใช้บริการสำรอง
-            self.embedding_service = BackupEmbeddingService()
+    def __init__(
+        self,
+        embedding_service=None,
+        milvus_client: Optional[MilvusClient] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        ingestion_buffer: Optional[VectorIngestionBuffer] = None
+    ):
+        # เลือก LMStudio หรือ backend สำรองตอนใช้งานจริง ไม่ต้องทดสอบ network ตอนสร้าง object
+        self.embedding_service = embedding_service or EmbeddingRouter()
+        self._milvus_client = milvus_client
+        self.ingestion_buffer = ingestion_buffer
         
-        self.milvus_client = MilvusClient()
+        # เอกสารที่รู้แล้วว่ามีใน Milvus ไม่ต้องตรวจซ้ำทุก request
+        self._indexed_documents = set()
+        self._index_locks: Dict[str, asyncio.Lock] = {}
+        
+        if embedding_cache is None and settings.EMBEDDING_CACHE_ENABLED:
+            embedding_cache = get_embedding_cache()
+        self.embedding_cache = embedding_cache
+    
+    @property
+    def milvus_client(self) -> MilvusClient:
+        if self._milvus_client is None:
+            self._milvus_client = create_vector_store()
+        return self._milvus_client
     
-    async def index_document(self, document_id: str, text: str, metadata: Dict[str, Any] = None):
+    async def index_document(
+        self,
+        document_id: str,
+        text: str,
+        assignment_id: str,
+        file_type: str,
+        metadata: Dict[str, Any] = None,
+        chunk_size: int = 1000,
+        overlap: int = 200,
+        immediate: bool = False
+    ):
         """
-        สร้าง index สำหรับเอกสารในฐานข้อมูล Milvus
+        สร้าง index สำหรับเอกสารใน partition ของงาน (assignment_id) ใน vector store
+        ถ้ามี ingestion buffer แถวจะถูกเขียนรวมกับเอกสารอื่นเป็น batch
+        immediate=True จะเขียนทันทีเพื่อให้ค้นหาเอกสารนี้ได้เลย
         """
         # ตัดแบ่งเอกสารเป็นส่วนๆ (chunks)
-        chunks = self._split_text(text)
-        
-        # สร้าง embeddings สำหรับแต่ละ chunk
-        embeddings = await self.embedding_service.get_embeddings(chunks)
+        chunks = [chunk for chunk in self.split_text(text, chunk_size=chunk_size, overlap=overlap) if chunk.strip()]
+        if not chunks:
+            return {"document_id": document_id, "chunks_count": 0, "indexed": False}
         
-        # เตรียมข้อมูลสำหรับ Milvus
-        collection = self.milvus_client.get_collection()
+        # สร้าง embeddings สำหรับแต่ละ chunk (ใช้ค่าจาก cache สำหรับ chunk ที่ไม่เปลี่ยน)
+        embeddings = await self._embed_chunks(chunks)
         
-        data = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            data.append({
-                "document_id": f"{document_id}_chunk_{i}",
-                "text": chunk,
-                "metadata": json.dumps(metadata) if metadata else json.dumps({}),
-                "embedding": embedding
-            })
+        # assignment_id, document_id, file_type และลำดับ chunk ใช้กรองและเรียงตอนค้นหา
+        metadatas = [
+            {
+                **(metadata or {}),
+                "assignment_id": assignment_id,
+                "document_id": document_id,
+                "file_type": file_type,
+                "chunk_index": i
+            }
+            for i in range(len(chunks))
+        ]
         
-        # บันทึกลงใน Milvus
-        collection.insert(data)
+        # บันทึกลงใน vector store และจำว่า index แล้วหลังแถวถูกเขียนจริงเท่านั้น
+        if self.ingestion_buffer is not None:
+            written = await self.ingestion_buffer.add(chunks, embeddings, metadatas)
+            if immediate:
+                await self.ingestion_buffer.flush()
+                await written
+                self._indexed_documents.add(document_id)
+            else:
+                written.add_done_callback(
+                    lambda future: future.cancelled() or future.exception() or self._indexed_documents.add(document_id)
+                )
+        else:
+            await asyncio.to_thread(self.milvus_client.insert, chunks, embeddings, metadatas)
+            self._indexed_documents.add(document_id)
         
         return {
             "document_id": document_id,
@@ -51,34 +92,114 @@ class RAGService:
             "indexed": True
         }
     
-    async def search_similar(self, query: str, limit: int = 5):
+    async def ensure_indexed(
+        self,
+        document_id: str,
+        text: str,
+        assignment_id: str,
+        file_type: str,
+        metadata: Dict[str, Any] = None,
+        **split_options
+    ):
+        """
+        สร้าง index ให้เอกสารเพียงครั้งเดียว ถ้ามีอยู่ใน vector store แล้วจะไม่ทำซ้ำ
+        """
+        if document_id in self._indexed_documents:
+            return False
+        
+        # request ที่เข้ามาพร้อมกันสำหรับเอกสารเดียวกันต้องรอกัน ไม่ให้ index ซ้ำ
+        lock = self._index_locks.setdefault(document_id, asyncio.Lock())
+        async with lock:
+            if document_id in self._indexed_documents:
+                return False
+            
+            exists = await asyncio.to_thread(
+                partial(self.milvus_client.exists, assignment_id=assignment_id, document_id=document_id)
+            )
+            if exists:
+                self._indexed_documents.add(document_id)
+                return False
+            
+            await self.index_document(
+                document_id, text, assignment_id, file_type, metadata, immediate=True, **split_options
+            )
+            return True
+    
+    async def search_similar(
+        self,
+        query: str,
+        limit: int = 5,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
-        ค้นหาเอกสารที่คล้ายกับคำถาม
+        ค้นหา chunk ที่คล้ายกับคำถาม ระบุ assignment_id เพื่อค้นเฉพาะ partition ของงานนั้น
+        คืน list ของ dict (id, assignment_id, document_id, file_type, chunk_index, text, metadata, score)
         """
         # สร้าง embedding สำหรับคำถาม
         query_embedding = await self.embedding_service.get_query_embedding(query)
         
-        # ค้นหาใน Milvus
-        results = await self.milvus_client.search_similar_documents(
-            query_embedding=query_embedding,
-            limit=limit
+        return await asyncio.to_thread(
+            partial(
+                self.milvus_client.search,
+                query_embedding,
+                limit,
+                assignment_id=assignment_id,
+                file_type=file_type,
+                document_id=document_id
+            )
         )
+    
+    async def search_similar_many(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        ค้นหาหลายคำถามพร้อมกัน: embed ทุกคำถามใน batch เดียว (แบบ query เหมือน search_similar)
+        และค้นหาใน vector store ครั้งเดียว
+        คืนผลของแต่ละคำถามตามลำดับ (รูปแบบเดียวกับ search_similar)
+        """
+        if not queries:
+            return []
+        # คำถามเป็นข้อความของนักเรียนที่ใช้ครั้งเดียว ไม่เก็บใน embedding cache ที่มีไว้สำหรับ chunk ของเฉลย
+        query_embeddings = await self.embedding_service.get_query_embeddings(list(queries))
+        
+        return await asyncio.to_thread(
+            partial(
+                self.milvus_client.search_many,
+                query_embeddings,
+                limit,
+                assignment_id=assignment_id,
+                file_type=file_type,
+                document_id=document_id
+            )
+        )
+    
+    async def _embed_chunks(self, chunks: List[str]) -> List[List[float]]:
+        """
+        สร้าง embeddings เฉพาะ chunk ที่ยังไม่มีใน embedding cache
+        """
+        if not self.embedding_cache or not chunks:
+            return await self.embedding_service.get_embeddings(chunks)
+        
+        cached = self.embedding_cache.get_many(chunks)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
         
-        # แปลงผลลัพธ์ให้อยู่ในรูปแบบที่ใช้งานง่าย
-        formatted_results = []
-        for hits in results:
-            for hit in hits:
-                formatted_results.append({
-                    "id": hit.id,
-                    "document_id": hit.entity.get('document_id'),
-                    "text": hit.entity.get('text'),
-                    "metadata": json.loads(hit.entity.get('metadata')),
-                    "score": hit.distance
-                })
+        embeddings = [vector.tolist() if vector is not None else None for vector in cached]
+        if missing:
+            new_embeddings = await self.embedding_service.get_embeddings([chunks[i] for i in missing])
+            self.embedding_cache.put_many([chunks[i] for i in missing], new_embeddings)
+            for i, embedding in zip(missing, new_embeddings):
+                embeddings[i] = embedding
         
-        return formatted_results
+        return embeddings
     
-    def _split_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    def split_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
         """
         แบ่งข้อความเป็นส่วนๆ (chunks) เพื่อสร้าง embeddings
         """
@@ -0,0 +1,101 @@
+from app.domain.services.rag_service import RAGService
+from app.infrastructure.llm.prompts import GRADING_TEMPLATE
+from app.utils.tokens import estimate_tokens
+from app.core.config import settings
+from typing import Dict, NamedTuple, Tuple
+import hashlib
+
+class TrimmedPrompt(NamedTuple):
+    teacher_text: str
+    full_prompt_tokens: int
+    prompt_tokens: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.full_prompt_tokens - self.prompt_tokens
+
+def teacher_document_id(assignment_id: str, teacher_text: str) -> str:
+    """
+    id ของเฉลยใน vector store ผูกกับเนื้อหา เมื่อเฉลยถูกแก้ไขจึงได้ index ใหม่
+    """
+    digest = hashlib.sha256(teacher_text.encode("utf-8")).hexdigest()[:16]
+    return f"teacher:{assignment_id}:{digest}"
+
+class RetrievalPromptBuilder:
+    """
+    Build grading prompts that only contain the teacher key chunks relevant
+    to the student submission, within a token budget.
+    """
+    def __init__(
+        self,
+        rag_service: RAGService,
+        token_budget: int = None,
+        top_k: int = None,
+        section_size: int = None
+    ):
+        self.rag_service = rag_service
+        self.token_budget = token_budget or settings.RETRIEVAL_PROMPT_TOKEN_BUDGET
+        self.top_k = top_k or settings.RETRIEVAL_TOP_K
+        self.section_size = section_size or settings.RETRIEVAL_SECTION_SIZE
+        self.template_tokens = estimate_tokens(GRADING_TEMPLATE)
+
+    async def build(self, assignment_id: str, teacher_text: str, student_text: str) -> TrimmedPrompt:
+        """
+        Index the teacher key once, retrieve its best chunks for every student
+        section and keep as many as fit in the budget, in their original order.
+        """
+        student_tokens = estimate_tokens(student_text)
+        full_tokens = self.template_tokens + estimate_tokens(teacher_text) + student_tokens
+
+        # The full prompt already fits, nothing to trim
+        if full_tokens <= self.token_budget:
+            return TrimmedPrompt(teacher_text, full_tokens, full_tokens)
+
+        document_id = teacher_document_id(assignment_id, teacher_text)
+        await self.rag_service.ensure_indexed(
+            document_id,
+            teacher_text,
+            assignment_id,
+            "teacher",
+            chunk_size=self.section_size,
+            overlap=0
+        )
+
+        sections = self.rag_service.split_text(student_text, chunk_size=self.section_size, overlap=0)
+        # All sections in one embedding batch and one vector store search
+        hits_per_section = await self.rag_service.search_similar_many(
+            sections,
+            limit=self.top_k,
+            assignment_id=assignment_id,
+            file_type="teacher",
+            document_id=document_id
+        )
+
+        # Best score of every teacher chunk over all student sections
+        candidates: Dict[int, Tuple[float, str]] = {}
+        for hits in hits_per_section:
+            for hit in hits:
+                chunk_index = hit["chunk_index"]
+                if chunk_index not in candidates or hit["score"] > candidates[chunk_index][0]:
+                    candidates[chunk_index] = (hit["score"], hit["text"])
+
+        allowance = self.token_budget - self.template_tokens - student_tokens
+        selected = []
+        used = 0
+        for chunk_index, (_, text) in sorted(candidates.items(), key=lambda item: item[1][0], reverse=True):
+            tokens = estimate_tokens(text)
+            # The most relevant chunk is always kept, even when the student text alone exceeds the budget
+            if selected and used + tokens > allowance:
+                continue
+            selected.append(chunk_index)
+            used += tokens
+
+        if not selected:
+            return TrimmedPrompt(teacher_text, full_tokens, full_tokens)
+
+        trimmed = "\n\n".join(candidates[i][1] for i in sorted(selected))
+        prompt_tokens = self.template_tokens + estimate_tokens(trimmed) + student_tokens
+        if prompt_tokens >= full_tokens:
+            return TrimmedPrompt(teacher_text, full_tokens, full_tokens)
+
+        return TrimmedPrompt(trimmed, full_tokens, prompt_tokens)
@@ -0,0 +1,96 @@
+# backend/app/infrastructure/database/bulk_writer.py
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BufferedTableWriter:
+    """
+    รวมแถวที่จะ insert ไว้ใน buffer แล้วเขียนลง Supabase ทีเดียวแบบ bulk insert
+
+    buffer จะถูก flush เมื่อมีแถวครบ max_rows หรือเมื่อแถวแรกใน buffer รอนานเกิน flush_interval วินาที
+    ต้องเรียก close() เมื่อเลิกใช้งานเพื่อเขียนแถวที่เหลือ
+    on_flush (ถ้ามี) จะถูกเรียกพร้อมแถวที่เขียนสำเร็จแล้วหลัง insert ทุกครั้ง
+    """
+
+    def __init__(
+        self,
+        db,
+        table_name: str,
+        max_rows: int = 50,
+        flush_interval: float = 2.0,
+        on_flush: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ):
+        self.db = db
+        self.table_name = table_name
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+
+        self.rows_written = 0
+        self.insert_calls = 0
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+    async def add(self, row: Dict[str, Any]):
+        """
+        เพิ่มแถวลงใน buffer ไม่ raise error ของการเขียน: แถวที่เขียนไม่สำเร็จอยู่ใน buffer ต่อ
+        และถูกลองใหม่ใน flush ครั้งถัดไป error ที่ยังเหลือจะถูก raise ครั้งเดียวจาก close()
+        """
+        self._buffer.append(row)
+        if len(self._buffer) >= self.max_rows:
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing rows to {self.table_name}, will retry: {str(e)}")
+        if self._buffer and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        """เขียนแถวทั้งหมดใน buffer ด้วย insert ครั้งเดียว"""
+        async with self._lock:
+            if self._timer is not None and self._timer is not asyncio.current_task():
+                self._timer.cancel()
+            self._timer = None
+
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+
+            # PostgREST ต้องการให้ทุกแถวใน bulk insert มี key ชุดเดียวกัน
+            columns = {}
+            for row in rows:
+                columns.update(dict.fromkeys(row))
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+
+            try:
+                await asyncio.to_thread(
+                    lambda: self.db.table(self.table_name).insert(rows).execute()
+                )
+            except Exception:
+                # เก็บแถวกลับเข้า buffer เพื่อให้ flush ครั้งถัดไปลองใหม่
+                self._buffer = rows + self._buffer
+                raise
+            self.insert_calls += 1
+            self.rows_written += len(rows)
+            logging.info(f"Flushed {len(rows)} rows to {self.table_name}")
+
+            if self.on_flush:
+                # แถวถูกเขียนแล้ว error ของ callback จึงไม่ทำให้ต้องเขียนซ้ำ
+                try:
+                    self.on_flush(rows)
+                except Exception as e:
+                    logging.error(f"Error in on_flush callback for {self.table_name}: {str(e)}")
+
+    async def close(self):
+        """flush แถวที่เหลืออยู่ใน buffer (raise ถ้ายังเขียนไม่ได้)"""
+        await self.flush()
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            logging.error(f"Error flushing rows to {self.table_name}: {str(e)}")
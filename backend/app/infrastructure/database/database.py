@@ -27,6 +27,12 @@ class Database:
     def __init__(self):
         self.client = supabase
     
+    def table(self, table_name: str):
+        """Return a Supabase query builder for a table"""
+        if not self.client:
+            raise ValueError("Supabase client not initialized")
+        return self.client.table(table_name)
+    
     async def execute(self, query: str, values: Dict[str, Any] = None) -> Any:
         """Execute query on Supabase"""
         try:
@@ -1,35 +1,225 @@
 from langchain.chains import LLMChain
-from app.infrastructure.llm.lmstudio import LMStudioClient
-from app.infrastructure.llm.prompts import grading_prompt
+from app.infrastructure.llm.endpoint_router import EndpointRouter, LLMEndpoint, get_endpoint_router
+from app.infrastructure.llm.local_llm import LocalGradingModel
+from app.infrastructure.llm.json_stream import IncrementalJSONParser
+from app.infrastructure.llm.output_parser import parse_grading_output
+from app.infrastructure.llm.prompts import (
+    GRADING_FIELDS,
+    GRADING_SCHEMA,
+    REPAIR_TEMPLATE,
+    grading_prompt,
+    grading_schema
+)
+from app.infrastructure.llm.grading_cache import GradingCache, get_grading_cache
+from app.core.config import settings
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 import json
+import logging
 
 class GradingChain:
-    def __init__(self):
-        lmstudio_client = LMStudioClient()
-        self.llm = lmstudio_client.get_chat_model()
-        self.chain = LLMChain(llm=self.llm, prompt=grading_prompt)
+    def __init__(
+        self,
+        cache: Optional[GradingCache] = None,
+        local_model: Optional[LocalGradingModel] = None,
+        router: Optional[EndpointRouter] = None
+    ):
+        # LLM_BACKEND=llamacpp grades in-process, so no LMStudio server is needed
+        if local_model is None and settings.LLM_BACKEND == "llamacpp":
+            local_model = LocalGradingModel()
+        self.local_model = local_model
+        
+        # Every LMStudio call goes to the least busy endpoint, one chain per endpoint
+        self.router = router or (get_endpoint_router() if self.local_model is None else None)
+        self._chains: Dict[str, LLMChain] = {}
+        
+        if cache is None and settings.GRADING_CACHE_ENABLED:
+            cache = get_grading_cache()
+        self.cache = cache
+        
+        # Output parsing counters
+        self.completions = 0
+        self.syntax_repairs = 0
+        self.incomplete_outputs = 0
+        self.repair_calls = 0
+        self.failed_outputs = 0
     
     async def grade_submission(self, teacher_text: str, student_text: str):
         """
         Grade a student submission using the LLM chain.
+        Identical inputs are served from the grading cache.
         """
+        cache_key = self.cache.key(teacher_text, student_text) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            result = await self.chain.arun(
-                teacher_text=teacher_text,
-                student_text=student_text
-            )
+            if self.local_model is not None:
+                result = await self.local_model.agrade(teacher_text, student_text)
+            else:
+                async with self.router.lease() as endpoint:
+                    result = await self._chain(endpoint).arun(
+                        teacher_text=teacher_text,
+                        student_text=student_text
+                    )
             
-            # Parse the JSON response
-            grading_result = json.loads(result)
+            # Parse the JSON response, repairing it instead of discarding the completion
+            grading_result = await self._finalize(result, teacher_text, student_text)
+            
+            # Only successful gradings are cached, errors are retried next time
+            if cache_key and "error" not in grading_result:
+                self.cache.set(cache_key, grading_result)
             
             return grading_result
         except Exception as e:
             print(f"Error in grading chain: {str(e)}")
             # Return a fallback result in case of error
-            return {
-                "score": 0,
-                "feedback": f"Error processing submission: {str(e)}",
-                "strengths": [],
-                "areas_for_improvement": ["Unable to process submission"],
-                "missed_concepts": []
-            }
\ No newline at end of file
+            return self._error_result(e)
+    
+    async def stream_submission(self, teacher_text: str, student_text: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Grade a submission while streaming the completion.
+        Yields ("token", text) for every delta, ("field", {"name", "value"}) as soon as
+        a top-level JSON field is complete, and finally ("result", grading_result).
+        """
+        cache_key = self.cache.key(teacher_text, student_text) if self.cache else None
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                for name, value in cached.items():
+                    yield "field", {"name": name, "value": value}
+                yield "result", cached
+                return
+        
+        parser = IncrementalJSONParser()
+        try:
+            async for delta in self._stream_completion(teacher_text, student_text):
+                if not delta:
+                    continue
+                yield "token", delta
+                for name, value in parser.feed(delta):
+                    yield "field", {"name": name, "value": value}
+            
+            grading_result = await self._finalize(parser.text, teacher_text, student_text)
+            
+            # Fields that only became available through the repair step
+            for name in GRADING_FIELDS:
+                if name in grading_result and name not in parser.fields:
+                    yield "field", {"name": name, "value": grading_result[name]}
+            
+            if cache_key and "error" not in grading_result:
+                self.cache.set(cache_key, grading_result)
+        except Exception as e:
+            print(f"Error in grading chain: {str(e)}")
+            grading_result = self._error_result(e)
+        
+        yield "result", grading_result
+    
+    async def _stream_completion(self, teacher_text: str, student_text: str) -> AsyncIterator[str]:
+        if self.local_model is not None:
+            async for delta in self.local_model.astream(teacher_text, student_text):
+                yield delta
+            return
+        
+        prompt = grading_prompt.format(teacher_text=teacher_text, student_text=student_text)
+        async with self.router.lease() as endpoint:
+            async for chunk in self._constrained(endpoint.chat_model, GRADING_SCHEMA).astream(prompt):
+                yield chunk.content
+    
+    async def _finalize(self, raw: str, teacher_text: str, student_text: str):
+        """
+        Parse a completion tolerantly. Fields that are still missing or invalid
+        are requested again on their own instead of re-grading everything.
+        """
+        self.completions += 1
+        result, missing, repaired = parse_grading_output(raw)
+        if repaired:
+            self.syntax_repairs += 1
+        
+        if missing:
+            self.incomplete_outputs += 1
+            logging.warning(f"Grading output missing fields {missing}, requesting only those")
+            result = await self._repair_fields(result, missing, teacher_text, student_text)
+        
+        # Empty lists are an acceptable answer, a score and feedback are not
+        for name in ("strengths", "areas_for_improvement", "missed_concepts"):
+            result.setdefault(name, [])
+        missing = [name for name in ("score", "feedback") if name not in result]
+        if missing:
+            self.failed_outputs += 1
+            return {**self._error_result(ValueError(f"Missing fields in grading output: {missing}")), **result}
+        
+        return result
+    
+    async def _repair_fields(self, result, missing, teacher_text: str, student_text: str):
+        for _ in range(settings.GRADING_REPAIR_ATTEMPTS):
+            prompt = REPAIR_TEMPLATE.format(
+                teacher_text=teacher_text,
+                student_text=student_text,
+                partial_result=json.dumps(result, ensure_ascii=False, indent=2),
+                missing_fields=", ".join(missing)
+            )
+            self.repair_calls += 1
+            try:
+                raw = await self._complete(prompt, grading_schema(missing))
+            except Exception as e:
+                logging.error(f"Grading repair call failed: {str(e)}")
+                break
+            
+            fields, _, _ = parse_grading_output(raw)
+            result.update({name: fields[name] for name in missing if name in fields})
+            missing = [name for name in missing if name not in result]
+            if not missing:
+                break
+        
+        return result
+    
+    async def _complete(self, prompt: str, schema) -> str:
+        if self.local_model is not None:
+            return await self.local_model.acomplete(prompt, schema)
+        
+        async with self.router.lease() as endpoint:
+            message = await self._constrained(endpoint.chat_model, schema).ainvoke(prompt)
+        return message.content
+    
+    def _chain(self, endpoint: LLMEndpoint) -> LLMChain:
+        chain = self._chains.get(endpoint.url)
+        if chain is None:
+            chain = self._chains[endpoint.url] = LLMChain(
+                llm=self._constrained(endpoint.chat_model, GRADING_SCHEMA),
+                prompt=grading_prompt
+            )
+        return chain
+    
+    @staticmethod
+    def _constrained(llm, schema):
+        """Ask the OpenAI-compatible backend for JSON matching the schema"""
+        if not settings.LLM_STRUCTURED_OUTPUT:
+            return llm
+        return llm.bind(response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "grading_result", "strict": True, "schema": schema}
+        })
+    
+    def stats(self):
+        return {
+            "completions": self.completions,
+            "syntax_repairs": self.syntax_repairs,
+            "incomplete_outputs": self.incomplete_outputs,
+            "repair_calls": self.repair_calls,
+            "failed_outputs": self.failed_outputs,
+            "parse_failure_rate": self.incomplete_outputs / self.completions if self.completions else 0.0,
+            "failure_rate": self.failed_outputs / self.completions if self.completions else 0.0,
+        }
+    
+    @staticmethod
+    def _error_result(e: Exception):
+        return {
+            "score": 0,
+            "feedback": f"Error processing submission: {str(e)}",
+            "strengths": [],
+            "areas_for_improvement": ["Unable to process submission"],
+            "missed_concepts": [],
+            "error": str(e)
+        }
\ No newline at end of file
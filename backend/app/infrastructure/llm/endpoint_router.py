@@ -0,0 +1,184 @@
+# backend/app/infrastructure/llm/endpoint_router.py
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.infrastructure.llm.lmstudio import LMStudioClient
+
+
+class LLMEndpoint:
+    """
+    OpenAI-compatible endpoint หนึ่งตัว พร้อมสถิติ (request ค้าง, latency, error) และ model ของ endpoint นั้น
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = LMStudioClient(api_base=url)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.avg_latency: Optional[float] = None
+        self.unhealthy_until = 0.0
+        self.draining = False
+        self.last_error: Optional[str] = None
+
+        self._chat_model = None
+        self._embedding_model = None
+
+    @property
+    def chat_model(self):
+        if self._chat_model is None:
+            self._chat_model = self.client.get_chat_model()
+        return self._chat_model
+
+    @property
+    def embedding_model(self):
+        if self._embedding_model is None:
+            self._embedding_model = self.client.get_embedding_model()
+        return self._embedding_model
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def status(self):
+        return {
+            "url": self.url,
+            "state": "draining" if self.draining else ("healthy" if self.healthy else "unhealthy"),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_latency": self.avg_latency,
+            "last_error": self.last_error,
+        }
+
+
+class EndpointRouter:
+    """
+    กระจาย request ของ LLM และ embedding ไปยังหลาย endpoint โดยเลือกตัวที่มี request ค้างน้อยที่สุด
+    (เท่ากันเลือกตัวที่ latency เฉลี่ยต่ำกว่า)
+
+    endpoint ที่ error ติดกันครบ failure_threshold ครั้งจะถูกพักไว้ cooldown วินาทีแล้วจึงลองใหม่
+    เพิ่มหรือ drain endpoint ได้ขณะระบบทำงาน endpoint ที่ drain จะไม่รับงานใหม่ และถูกลบเมื่องานค้างหมด
+    """
+
+    def __init__(self, urls: List[str] = None, failure_threshold: int = None, cooldown: float = None, smoothing: float = 0.3):
+        self.failure_threshold = failure_threshold or settings.LLM_ENDPOINT_FAILURE_THRESHOLD
+        self.cooldown = cooldown or settings.LLM_ENDPOINT_COOLDOWN_SECONDS
+        self.smoothing = smoothing
+
+        self._endpoints: Dict[str, LLMEndpoint] = {}
+        self._lock = threading.Lock()
+        for url in urls or settings.lmstudio_urls:
+            self.add(url)
+
+    def add(self, url: str) -> LLMEndpoint:
+        """เพิ่ม endpoint (ถ้ากำลัง drain อยู่จะกลับมารับงานใหม่)"""
+        url = url.rstrip("/")
+        with self._lock:
+            endpoint = self._endpoints.get(url)
+            if endpoint is None:
+                endpoint = self._endpoints[url] = LLMEndpoint(url)
+                logging.info(f"LLM endpoint added: {url}")
+            endpoint.draining = False
+            return endpoint
+
+    def drain(self, url: str) -> bool:
+        """หยุดส่งงานใหม่ไปที่ endpoint และลบออกเมื่องานค้างเสร็จ คืน False ถ้าไม่มี endpoint นี้"""
+        url = url.rstrip("/")
+        with self._lock:
+            endpoint = self._endpoints.get(url)
+            if endpoint is None:
+                return False
+            endpoint.draining = True
+            self._remove_if_drained(endpoint)
+            logging.info(f"LLM endpoint draining: {url}")
+            return True
+
+    def apply(self, changes: List[dict]):
+        """ใช้รายการ {"url", "draining"} ที่บันทึกไว้ (เช่นจากคิวงาน) กับ router ของ process นี้"""
+        for change in changes:
+            with self._lock:
+                endpoint = self._endpoints.get(change["url"].rstrip("/"))
+            # เปลี่ยนเฉพาะ endpoint ที่สถานะยังไม่ตรง จึงเรียกซ้ำทุก lease ได้
+            if change["draining"]:
+                if endpoint is not None and not endpoint.draining:
+                    self.drain(change["url"])
+            elif endpoint is None or endpoint.draining:
+                self.add(change["url"])
+
+    def select(self) -> LLMEndpoint:
+        with self._lock:
+            candidates = [endpoint for endpoint in self._endpoints.values() if not endpoint.draining]
+            if not candidates:
+                raise RuntimeError("No LLM endpoints available")
+
+            # ถ้าทุกตัวไม่ healthy ยังต้องลองสักตัว แทนที่จะปฏิเสธทุก request
+            healthy = [endpoint for endpoint in candidates if endpoint.healthy] or candidates
+            endpoint = min(
+                healthy,
+                key=lambda e: (e.outstanding, e.avg_latency if e.avg_latency is not None else 0.0)
+            )
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    @asynccontextmanager
+    async def lease(self):
+        """จอง endpoint สำหรับหนึ่ง call แล้วบันทึก latency และผลลัพธ์"""
+        endpoint = self.select()
+        started = time.monotonic()
+        error: Optional[Exception] = None
+        completed = False
+        try:
+            yield endpoint
+            completed = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # finally ครอบ CancelledError/GeneratorExit ด้วย (client ตัด stream) ไม่ให้ outstanding ค้าง
+            self._release(endpoint, time.monotonic() - started, error, cancelled=not completed and error is None)
+
+    def _release(self, endpoint: LLMEndpoint, latency: float, error: Optional[Exception], cancelled: bool = False):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if cancelled:
+                # call ถูกยกเลิกกลางทาง ไม่ใช่ทั้งความสำเร็จหรือความล้มเหลวของ endpoint
+                pass
+            elif error is None:
+                endpoint.consecutive_failures = 0
+                endpoint.unhealthy_until = 0.0
+                if endpoint.avg_latency is None:
+                    endpoint.avg_latency = latency
+                else:
+                    endpoint.avg_latency += self.smoothing * (latency - endpoint.avg_latency)
+            else:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                endpoint.last_error = str(error)
+                if endpoint.consecutive_failures >= self.failure_threshold:
+                    if endpoint.healthy:
+                        logging.warning(f"LLM endpoint {endpoint.url} marked unhealthy: {error}")
+                    endpoint.unhealthy_until = time.monotonic() + self.cooldown
+            self._remove_if_drained(endpoint)
+
+    def _remove_if_drained(self, endpoint: LLMEndpoint):
+        if endpoint.draining and endpoint.outstanding == 0 and self._endpoints.get(endpoint.url) is endpoint:
+            del self._endpoints[endpoint.url]
+            logging.info(f"LLM endpoint removed: {endpoint.url}")
+
+    def stats(self):
+        with self._lock:
+            return [endpoint.status() for endpoint in self._endpoints.values()]
+
+
+@lru_cache()
+def get_endpoint_router() -> EndpointRouter:
+    """router เดียวต่อ process ใช้ร่วมกันทั้งงานตรวจและ embedding"""
+    return EndpointRouter()
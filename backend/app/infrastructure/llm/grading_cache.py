@@ -0,0 +1,150 @@
+# backend/app/infrastructure/llm/grading_cache.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.infrastructure.llm.prompts import GRADING_TEMPLATE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS grading_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS grading_cache_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def grading_fingerprint(template: str = GRADING_TEMPLATE, model: str = None) -> str:
+    """hash ของ prompt template และชื่อ model ที่ใช้ตรวจ ถ้าอย่างใดเปลี่ยน cache เดิมจะใช้ไม่ได้"""
+    if model is None:
+        model = settings.LOCAL_MODEL_PATH if settings.LLM_BACKEND == "llamacpp" else settings.LMSTUDIO_MODEL
+    return hashlib.sha256(f"{template}\0{model}".encode("utf-8")).hexdigest()
+
+
+class GradingCache:
+    """
+    cache ผลการตรวจ โดยใช้ hash ของข้อความครู ข้อความนักเรียน prompt template และ model เป็น key
+
+    มีสองชั้น: LRU ในหน่วยความจำ (จำกัดจำนวน) และ SQLite บนดิสก์ที่อยู่รอดหลัง restart
+    เมื่อ template หรือ model เปลี่ยน ข้อมูลบนดิสก์ทั้งหมดจะถูกล้าง
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, fingerprint: str = None):
+        self.path = path or settings.GRADING_CACHE_PATH
+        self.max_entries = max_entries or settings.GRADING_CACHE_SIZE
+        self.fingerprint = fingerprint or grading_fingerprint()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            row = conn.execute(
+                "SELECT value FROM grading_cache_meta WHERE name = 'fingerprint'"
+            ).fetchone()
+            if row is None or row[0] != self.fingerprint:
+                if row is not None:
+                    logging.info("Grading template or model changed, invalidating grading cache")
+                conn.execute("DELETE FROM grading_cache")
+                conn.execute(
+                    "INSERT OR REPLACE INTO grading_cache_meta (name, value) VALUES ('fingerprint', ?)",
+                    (self.fingerprint,)
+                )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def key(self, teacher_text: str, student_text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.fingerprint, teacher_text, student_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(self._memory[key])
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM grading_cache WHERE key = ?", (key,)).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            value = json.loads(row[0])
+            self._remember(key, value)
+            return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO grading_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+        with self._lock:
+            self._remember(key, dict(value))
+
+    def _remember(self, key: str, value: Dict[str, Any]):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def invalidate(self):
+        """ล้าง cache ทั้งสองชั้น"""
+        with self._lock:
+            self._memory.clear()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM grading_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            disk_entries = conn.execute("SELECT COUNT(*) FROM grading_cache").fetchone()[0]
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+        }
+
+
+@lru_cache()
+def get_grading_cache() -> GradingCache:
+    """cache เดียวต่อ process"""
+    return GradingCache()
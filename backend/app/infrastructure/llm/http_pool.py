@@ -0,0 +1,178 @@
+# backend/app/infrastructure/llm/http_pool.py
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+import openai
+
+from app.core.config import settings
+
+
+class _CountingTransport(httpx.BaseTransport):
+    """ห่อ transport ของ httpx เพื่อนับ request ที่ค้างอยู่ ลดค่าใน finally จึงไม่รั่วเมื่อ connect error หรือ timeout"""
+
+    def __init__(self, transport: httpx.BaseTransport, pool: "HTTPConnectionPool"):
+        self._transport = transport
+        self._pool = pool
+
+    def handle_request(self, request):
+        self._pool._request_started()
+        response = None
+        try:
+            response = self._transport.handle_request(request)
+            return response
+        finally:
+            self._pool._request_finished(response)
+
+    def close(self):
+        self._transport.close()
+
+
+class _AsyncCountingTransport(httpx.AsyncBaseTransport):
+    """แบบ async ของ _CountingTransport"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, pool: "HTTPConnectionPool"):
+        self._transport = transport
+        self._pool = pool
+
+    async def handle_async_request(self, request):
+        self._pool._request_started()
+        response = None
+        try:
+            response = await self._transport.handle_async_request(request)
+            return response
+        finally:
+            self._pool._request_finished(response)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class HTTPConnectionPool:
+    """
+    HTTP client แบบ keep-alive ชุดเดียวต่อ process ใช้ร่วมกันทั้ง chat และ embedding ทุก endpoint
+
+    OpenAI client ของแต่ละ base URL ถูกสร้างครั้งเดียวบน httpx client ที่ใช้ร่วมกันนี้
+    connection จึงถูกใช้ซ้ำข้าม request แทนการเปิด TCP ใหม่ทุกครั้ง
+    """
+
+    def __init__(
+        self,
+        max_connections: int = None,
+        max_keepalive_connections: int = None,
+        keepalive_expiry: float = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        max_retries: int = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=keepalive_expiry or settings.HTTP_POOL_KEEPALIVE_EXPIRY
+        )
+        self.timeout = httpx.Timeout(
+            read_timeout or settings.HTTP_READ_TIMEOUT,
+            connect=connect_timeout or settings.HTTP_CONNECT_TIMEOUT
+        )
+        self.max_retries = settings.HTTP_MAX_RETRIES if max_retries is None else max_retries
+
+        self.requests = 0
+        self.errors = 0
+        self.transport_errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+        self.sync_client = httpx.Client(
+            transport=_CountingTransport(httpx.HTTPTransport(limits=self.limits), self),
+            timeout=self.timeout
+        )
+        self.async_client = httpx.AsyncClient(
+            transport=_AsyncCountingTransport(httpx.AsyncHTTPTransport(limits=self.limits), self),
+            timeout=self.timeout
+        )
+        self._openai_clients: Dict[str, Tuple[openai.OpenAI, openai.AsyncOpenAI]] = {}
+
+    def openai_clients(self, base_url: str) -> Tuple[openai.OpenAI, openai.AsyncOpenAI]:
+        """OpenAI client (sync, async) ของ base URL นี้ บน connection pool ที่ใช้ร่วมกัน"""
+        with self._lock:
+            clients = self._openai_clients.get(base_url)
+            if clients is None:
+                options = {
+                    "api_key": "not-needed",  # LMStudio ไม่ต้องใช้ API key
+                    "base_url": base_url,
+                    "timeout": self.timeout,
+                    "max_retries": self.max_retries,
+                }
+                clients = self._openai_clients[base_url] = (
+                    openai.OpenAI(http_client=self.sync_client, **options),
+                    openai.AsyncOpenAI(http_client=self.async_client, **options)
+                )
+            return clients
+
+    # ---- request counters (นับจนได้ response header หรือ error) ----
+
+    def _request_started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _request_finished(self, response):
+        with self._lock:
+            self.in_flight -= 1
+            if response is None:
+                self.transport_errors += 1
+            elif response.status_code >= 500:
+                self.errors += 1
+
+    def stats(self):
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "requests": self.requests,
+            "server_errors": self.errors,
+            "transport_errors": self.transport_errors,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "sync_connections": self._connection_stats(self.sync_client),
+            "async_connections": self._connection_stats(self.async_client),
+            "base_urls": list(self._openai_clients),
+        }
+
+    @staticmethod
+    def _connection_stats(client):
+        # httpx ไม่มี API สาธารณะสำหรับสถานะ pool จึงอ่านจาก httpcore โดยตรง (ผ่าน transport ที่นับ request)
+        transport = getattr(getattr(client, "_transport", None), "_transport", None)
+        pool = getattr(transport, "_pool", None)
+        if pool is None:
+            return None
+        connections = list(pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+    async def aclose(self):
+        self.sync_client.close()
+        await self.async_client.aclose()
+
+
+_pool: Optional[HTTPConnectionPool] = None
+
+def get_http_pool() -> HTTPConnectionPool:
+    global _pool
+    if _pool is None:
+        _pool = HTTPConnectionPool()
+    return _pool
+
+async def close_http_pool():
+    global _pool
+    # router เก็บ model ที่ผูกกับ client ของ pool นี้ ต้องล้างด้วย ไม่อย่างนั้นการเริ่มระบบครั้งถัดไปจะได้ client ที่ปิดแล้ว
+    from app.infrastructure.llm.endpoint_router import get_endpoint_router
+    get_endpoint_router.cache_clear()
+    if _pool is not None:
+        try:
+            await _pool.aclose()
+        except Exception as e:
+            logging.error(f"Error closing HTTP connection pool: {str(e)}")
+        _pool = None
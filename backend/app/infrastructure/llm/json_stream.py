@@ -0,0 +1,93 @@
+# backend/app/infrastructure/llm/json_stream.py
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    อ่าน JSON object ที่ LLM ส่งมาทีละส่วน และคืน field ระดับบนสุดทันทีที่ค่าของ field นั้นครบ
+
+    ข้อความก่อน '{' แรก (เช่น ```json) จะถูกข้าม ค่าที่ parse ไม่ได้จะถูกข้ามเช่นกัน
+    ผลลัพธ์ทั้งก้อนยังหาได้จาก text หลังจาก stream จบ
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "start"  # start -> key -> colon -> value -> (comma) -> key ... -> done
+        self._token_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self.fields = {}
+
+    @property
+    def done(self) -> bool:
+        return self._expect == "done"
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        """เพิ่มข้อความใหม่ แล้วคืนรายการ (ชื่อ field, ค่า) ที่เพิ่งครบ"""
+        self.text += delta
+        completed = []
+
+        while self._pos < len(self.text) and not self.done:
+            i = self._pos
+            char = self.text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key":
+                        self._key = json.loads(self.text[self._token_start:i + 1])
+                        self._expect = "colon"
+                continue
+
+            if self._expect == "start":
+                if char == "{":
+                    self._depth = 1
+                    self._expect = "key"
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == "key":
+                    self._token_start = i
+                continue
+
+            if self._depth == 1 and self._expect == "colon":
+                if char == ":":
+                    self._expect = "value"
+                    self._token_start = self._pos
+                continue
+
+            if char in "{[":
+                self._depth += 1
+            elif char in "}]" and self._depth > 1:
+                self._depth -= 1
+            elif self._depth == 1 and char in ",}":
+                if self._expect == "value":
+                    field = self._complete_value(i)
+                    if field is not None:
+                        completed.append(field)
+                if char == "}":
+                    self._depth = 0
+                    self._expect = "done"
+                else:
+                    self._expect = "key"
+
+        return completed
+
+    def _complete_value(self, end: int) -> Optional[Tuple[str, Any]]:
+        raw = self.text[self._token_start:end].strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return None
+        self.fields[self._key] = value
+        return self._key, value
@@ -1,23 +1,42 @@
 from langchain_community.llms import LlamaCpp
 from langchain_community.chat_models import ChatOpenAI
+from langchain_community.embeddings import OpenAIEmbeddings
 from app.core.config import settings
+from app.infrastructure.llm.http_pool import get_http_pool
 import os
 
 class LMStudioClient:
-    def __init__(self):
-        self.api_base = settings.LMSTUDIO_URL
+    def __init__(self, api_base: str = None):
+        self.api_base = api_base or settings.LMSTUDIO_URL
         self.model_name = settings.LMSTUDIO_MODEL
     
     def get_chat_model(self):
         """
         Get a Langchain chat model that connects to LMStudio.
         """
-        # Using OpenAI compatible API offered by LMStudio
+        # Using OpenAI compatible API offered by LMStudio, over the shared connection pool
+        client, async_client = get_http_pool().openai_clients(self.api_base)
         return ChatOpenAI(
             model=self.model_name,
             temperature=0.2,
             api_key="not-needed", # LMStudio typically doesn't need an API key
-            base_url=self.api_base
+            base_url=self.api_base,
+            client=client.chat.completions,
+            async_client=async_client.chat.completions
+        )
+    
+    def get_embedding_model(self):
+        """
+        Get a Langchain embeddings model that connects to LMStudio.
+        """
+        client, async_client = get_http_pool().openai_clients(self.api_base)
+        return OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            openai_api_base=self.api_base,
+            openai_api_key="not-needed",
+            dimensions=settings.EMBEDDING_DIMENSION,
+            client=client.embeddings,
+            async_client=async_client.embeddings
         )
     
     def get_local_model(self, model_path):
@@ -33,4 +52,26 @@ class LMStudioClient:
             max_tokens=2000,
             top_p=0.95,
             verbose=True
+        )
+    
+    def get_llama_model(self, model_path):
+        """
+        Load a local GGUF model with llama.cpp on the CPU.
+        Unlike get_local_model this returns the raw llama_cpp.Llama, which
+        gives access to the evaluated prompt state (save_state / load_state).
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise ImportError("llama-cpp-python is required for LLM_BACKEND=llamacpp: pip install llama-cpp-python")
+        
+        return Llama(
+            model_path=model_path,
+            n_ctx=settings.LOCAL_MODEL_CONTEXT,
+            n_threads=settings.LOCAL_MODEL_THREADS,
+            n_gpu_layers=0,
+            verbose=False
         )
\ No newline at end of file
@@ -0,0 +1,174 @@
+# backend/app/infrastructure/llm/local_llm.py
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import AsyncIterator, Iterator
+
+from app.core.config import settings
+from app.infrastructure.llm.lmstudio import LMStudioClient
+from app.infrastructure.llm.prompts import GRADING_PREFIX_TEMPLATE, GRADING_SCHEMA, GRADING_SUFFIX_TEMPLATE
+
+
+class LocalGradingModel:
+    """
+    ตรวจงานด้วย llama.cpp ใน process เดียวกัน (CPU) โดยไม่ต้องมี LMStudio server
+
+    ส่วนต้นของ prompt (คำสั่ง + เฉลย) ถูก evaluate ครั้งเดียวต่องาน แล้วเก็บ KV state ไว้ใน LRU
+    นักเรียนแต่ละคนจะ restore state นั้นแล้ว evaluate เฉพาะคำตอบของนักเรียน
+    model มี context เดียว จึงตรวจได้ทีละคน
+
+    ไฟล์ GGUF ถูกโหลดเมื่อตรวจงานครั้งแรก process ที่แค่สร้าง GradingChain (เช่น API ที่ส่งงาน batch ให้ worker)
+    จึงไม่ต้องถือ model ไว้ในหน่วยความจำ
+    """
+
+    def __init__(self, llama=None, max_states: int = None, max_tokens: int = None):
+        self._llama = llama
+        self._load_lock = threading.Lock()
+        self.max_states = max_states or settings.LOCAL_PROMPT_STATE_CACHE_SIZE
+        self.max_tokens = max_tokens or settings.LOCAL_MODEL_MAX_TOKENS
+
+        self._states = OrderedDict()
+        self._grammars = {}
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+        self.prefix_hits = 0
+        self.prefix_misses = 0
+        self.prefix_tokens_reused = 0
+
+    @property
+    def llama(self):
+        if self._llama is None:
+            with self._load_lock:
+                if self._llama is None:
+                    logging.info(f"Loading local model {settings.LOCAL_MODEL_PATH}")
+                    self._llama = LMStudioClient().get_llama_model(settings.LOCAL_MODEL_PATH)
+        return self._llama
+
+    async def agrade(self, teacher_text: str, student_text: str) -> str:
+        """ตรวจงานโดยไม่ block event loop ผู้เรียกพร้อมกันจะรอคิวกันที่นี่แทนการจอง thread"""
+        async with self._async_lock:
+            return await asyncio.to_thread(self.grade, teacher_text, student_text)
+
+    async def astream(self, teacher_text: str, student_text: str) -> AsyncIterator[str]:
+        """ส่งข้อความคำตอบทีละส่วนระหว่างที่ model generate ใน thread แยก"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def produce():
+            try:
+                for delta in self.grade_stream(teacher_text, student_text):
+                    loop.call_soon_threadsafe(queue.put_nowait, delta)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        async with self._async_lock:
+            producer = asyncio.ensure_future(asyncio.to_thread(produce))
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            await producer
+
+    async def acomplete(self, prompt: str, schema=None) -> str:
+        """generate จาก prompt อิสระ (ไม่ใช้ state ของ prefix) เช่นตอนขอ field ที่ขาด"""
+        async with self._async_lock:
+            return await asyncio.to_thread(self.complete, prompt, schema)
+
+    def complete(self, prompt: str, schema=None) -> str:
+        with self._lock:
+            completion = self.llama.create_completion(prompt=prompt, **self._sampling(schema))
+            return completion["choices"][0]["text"]
+
+    def grade(self, teacher_text: str, student_text: str) -> str:
+        """คืนข้อความคำตอบดิบของ model (ควรเป็น JSON ตาม prompt)"""
+        with self._prompt(teacher_text, student_text) as prompt:
+            completion = self.llama.create_completion(prompt=prompt, **self._sampling())
+            return completion["choices"][0]["text"]
+
+    def grade_stream(self, teacher_text: str, student_text: str) -> Iterator[str]:
+        """เหมือน grade แต่คืนข้อความทีละส่วน (ถือ lock ไว้จนกว่าผู้เรียกจะอ่านครบ)"""
+        with self._prompt(teacher_text, student_text) as prompt:
+            for chunk in self.llama.create_completion(prompt=prompt, stream=True, **self._sampling()):
+                yield chunk["choices"][0]["text"]
+
+    @contextmanager
+    def _prompt(self, teacher_text: str, student_text: str):
+        """
+        จอง model, restore state ของ prefix แล้วคืน token ของ prompt ทั้งหมด
+        state ที่ restore แล้วตรงกับ prefix ทุกตัว llama.cpp จึง evaluate เฉพาะ suffix
+        """
+        prefix = GRADING_PREFIX_TEMPLATE.format(teacher_text=teacher_text)
+        suffix = GRADING_SUFFIX_TEMPLATE.format(student_text=student_text)
+
+        with self._lock:
+            started = time.perf_counter()
+            prefix_tokens = self._restore_prefix(prefix)
+            suffix_tokens = self.llama.tokenize(suffix.encode("utf-8"), add_bos=False)
+            yield prefix_tokens + suffix_tokens
+            logging.debug(
+                f"Local grading took {time.perf_counter() - started:.2f}s "
+                f"({len(prefix_tokens)} cached prefix tokens, {len(suffix_tokens)} new)"
+            )
+
+    def _sampling(self, schema=None):
+        sampling = {"max_tokens": self.max_tokens, "temperature": 0.2, "top_p": 0.95}
+        grammar = self._grammar(schema or GRADING_SCHEMA)
+        if grammar is not None:
+            sampling["grammar"] = grammar
+        return sampling
+
+    def _grammar(self, schema):
+        """grammar ของ llama.cpp ที่บังคับให้ output ตรงกับ JSON schema (สร้างครั้งเดียวต่อ schema)"""
+        if not settings.LLM_STRUCTURED_OUTPUT:
+            return None
+        key = json.dumps(schema, sort_keys=True)
+        if key not in self._grammars:
+            try:
+                from llama_cpp import LlamaGrammar
+            except ImportError:
+                return None
+            self._grammars[key] = LlamaGrammar.from_json_schema(key, verbose=False)
+        return self._grammars[key]
+
+    def _restore_prefix(self, prefix: str):
+        """load KV state ของ prefix ถ้าเคย evaluate แล้ว ไม่เช่นนั้น evaluate และเก็บ state ไว้"""
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        cached = self._states.get(key)
+        if cached is not None:
+            self._states.move_to_end(key)
+            tokens, state = cached
+            self.llama.load_state(state)
+            self.prefix_hits += 1
+            self.prefix_tokens_reused += len(tokens)
+            return tokens
+
+        tokens = self.llama.tokenize(prefix.encode("utf-8"), add_bos=True)
+        self.llama.reset()
+        self.llama.eval(tokens)
+        self._states[key] = (tokens, self.llama.save_state())
+        self.prefix_misses += 1
+
+        # state ของแต่ละงานใหญ่ตามความยาวเฉลย จึงเก็บไว้เพียงไม่กี่งาน
+        while len(self._states) > self.max_states:
+            self._states.popitem(last=False)
+        return tokens
+
+    def stats(self):
+        return {
+            "loaded": self._llama is not None,
+            "cached_prefixes": len(self._states),
+            "prefix_hits": self.prefix_hits,
+            "prefix_misses": self.prefix_misses,
+            "prefix_tokens_reused": self.prefix_tokens_reused,
+        }
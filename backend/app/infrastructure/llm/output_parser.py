@@ -0,0 +1,101 @@
+# backend/app/infrastructure/llm/output_parser.py
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.infrastructure.llm.json_stream import IncrementalJSONParser
+from app.infrastructure.llm.prompts import GRADING_FIELDS
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PYTHON_LITERAL = re.compile(r"\b(?:True|False|None)\b")
+# string ของ JSON (รวม string สุดท้ายที่ถูกตัดก่อนปิด quote)
+_JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*(?:"|$)', re.DOTALL)
+
+
+def parse_grading_output(text: str) -> Tuple[Dict[str, Any], List[str], bool]:
+    """
+    parse ผลการตรวจจากข้อความของ LLM แบบยืดหยุ่น
+
+    คืน (field ที่ใช้ได้, ชื่อ field ที่ขาดหรือไม่ถูกต้อง, ต้องซ่อม JSON หรือไม่)
+    ลำดับการลอง: json.loads ตรงๆ -> ซ่อมข้อผิดพลาดที่พบบ่อย -> เก็บเฉพาะ field ที่ครบจาก JSON ที่ถูกตัดกลางทาง
+    """
+    raw = _FENCE.sub("", text or "").strip()
+
+    data = _loads_object(raw)
+    repaired = False
+    if data is None:
+        repaired = True
+        data = _loads_object(_repair(raw))
+    if data is None:
+        # JSON ไม่สมบูรณ์ (เช่น ถูกตัดเพราะ max_tokens) เก็บเฉพาะ field ที่ปิดครบแล้ว
+        parser = IncrementalJSONParser()
+        parser.feed(raw)
+        # ค่าสุดท้ายที่ครบแล้วแต่ไม่มี '}' ปิดท้าย
+        parser.feed("}")
+        data = parser.fields
+
+    result = {}
+    for name in GRADING_FIELDS:
+        value = _validate(name, data.get(name))
+        if value is not None:
+            result[name] = value
+
+    missing = [name for name in GRADING_FIELDS if name not in result]
+    return result, missing, repaired
+
+
+def _loads_object(text: str) -> Optional[Dict[str, Any]]:
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _repair(text: str) -> str:
+    """แก้ข้อผิดพลาดที่ model มักทำ: comma เกินท้าย, ค่าแบบ Python, quote เดี่ยว"""
+    if '"' not in text:
+        text = text.replace("'", '"')
+    return _outside_strings(text, lambda part: _PYTHON_LITERAL.sub(
+        lambda m: _PYTHON_LITERALS[m.group(0)], _TRAILING_COMMA.sub(r"\1", part)
+    ))
+
+
+def _outside_strings(text: str, fix) -> str:
+    """ใช้ fix กับส่วนที่อยู่นอก string เท่านั้น ข้อความอย่าง "None of the steps" จึงไม่ถูกแก้"""
+    parts = []
+    position = 0
+    for match in _JSON_STRING.finditer(text):
+        parts.append(fix(text[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(fix(text[position:]))
+    return "".join(parts)
+
+
+def _validate(name: str, value: Any) -> Any:
+    """แปลงค่าให้ตรงกับ schema ถ้าแปลงไม่ได้คืน None (ถือว่า field นั้นขาด)"""
+    if value is None:
+        return None
+
+    if name == "score":
+        try:
+            score = float(str(value).strip().split("/")[0])
+        except ValueError:
+            return None
+        return int(round(min(max(score, 0), 100)))
+
+    if name == "feedback":
+        return value.strip() if isinstance(value, str) and value.strip() else None
+
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    return [str(item) for item in value if item is not None and str(item).strip()]
@@ -1,18 +1,14 @@
 from langchain.prompts import PromptTemplate
 
-GRADING_TEMPLATE = """
+# ส่วนต้นของ prompt มีแต่คำสั่งและเฉลย จึงเหมือนกันทุกนักเรียนในงานเดียวกัน
+# backend ที่ทำงานใน process (llama.cpp) เก็บ KV state ของส่วนนี้ไว้ใช้ซ้ำได้
+GRADING_PREFIX_TEMPLATE = """
 You are an expert grader for educational assignments. You will be given:
 1. A teacher's answer key
 2. A student's submission
 
 Your task is to grade the student's work fairly and provide constructive feedback.
 
-Teacher's Answer Key:
-{teacher_text}
-
-Student's Submission:
-{student_text}
-
 Please analyze the student's work and provide:
 1. A numerical score out of 100
 2. Detailed feedback explaining the score
@@ -27,9 +23,66 @@ Your response should be in the following JSON format:
     "areas_for_improvement": ["<area1>", "<area2>", ...],
     "missed_concepts": ["<concept1>", "<concept2>", ...]
 }}
+
+Teacher's Answer Key:
+{teacher_text}
 """
 
+GRADING_SUFFIX_TEMPLATE = """
+Student's Submission:
+{student_text}
+
+JSON response:
+"""
+
+GRADING_TEMPLATE = GRADING_PREFIX_TEMPLATE + GRADING_SUFFIX_TEMPLATE
+
 grading_prompt = PromptTemplate(
     input_variables=["teacher_text", "student_text"],
     template=GRADING_TEMPLATE
-)
\ No newline at end of file
+)
+
+GRADING_FIELDS = ["score", "feedback", "strengths", "areas_for_improvement", "missed_concepts"]
+
+_STRING_LIST = {"type": "array", "items": {"type": "string"}}
+
+# JSON schema ของผลการตรวจ ใช้บังคับรูปแบบ output ของ backend (response_format / grammar)
+GRADING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "feedback": {"type": "string"},
+        "strengths": _STRING_LIST,
+        "areas_for_improvement": _STRING_LIST,
+        "missed_concepts": _STRING_LIST
+    },
+    "required": GRADING_FIELDS,
+    "additionalProperties": False
+}
+
+def grading_schema(fields=None):
+    """schema ที่มีเฉพาะ field ที่ระบุ ใช้ตอนขอให้ model ตอบเฉพาะส่วนที่ขาด"""
+    fields = fields or GRADING_FIELDS
+    return {
+        **GRADING_SCHEMA,
+        "properties": {name: GRADING_SCHEMA["properties"][name] for name in fields},
+        "required": list(fields)
+    }
+
+# ใช้เมื่อคำตอบแรกขาดบาง field: ขอเฉพาะ field ที่ขาด โดยให้ผลที่ได้แล้วเป็นบริบท
+REPAIR_TEMPLATE = """
+You are an expert grader for educational assignments. You already graded the
+student's submission below against the teacher's answer key, but some fields of
+your JSON response were missing or invalid.
+
+Teacher's Answer Key:
+{teacher_text}
+
+Student's Submission:
+{student_text}
+
+Fields you already returned:
+{partial_result}
+
+Respond with a JSON object containing only these fields: {missing_fields}
+"""
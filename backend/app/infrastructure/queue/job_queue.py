@@ -0,0 +1,321 @@
+# backend/app/infrastructure/queue/job_queue.py
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+BATCH_GRADING_JOB = "batch_grading"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_idx ON jobs (status, created_at);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    batch_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch_id, item_id)
+);
+
+CREATE TABLE IF NOT EXISTS batch_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS batch_events_batch_idx ON batch_events (batch_id, id);
+
+CREATE TABLE IF NOT EXISTS llm_endpoints (
+    url TEXT PRIMARY KEY,
+    draining INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    pid INTEGER,
+    busy_since REAL,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
+"""
+
+
+class JobQueue:
+    """
+    คิวงานแบบถาวรบน SQLite สำหรับงาน batch grading
+
+    งานจะถูก worker process ดึงไปทำโดยใช้ lease ถ้า worker ตายระหว่างทำงาน
+    lease จะหมดอายุและ worker ตัวอื่นจะดึงงานนั้นกลับไปทำต่อ
+    ความคืบหน้าของแต่ละนักเรียนถูกบันทึกเป็น checkpoint เพื่อข้ามคนที่ตรวจแล้ว
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.JOB_QUEUE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # เปิด connection ใหม่ทุกครั้ง เพราะคิวถูกใช้ร่วมกันหลาย process
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ---- jobs ----
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        """เพิ่มงานใหม่เข้าคิว"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ดึงงานถัดไปที่รออยู่ หรืองานที่ lease หมดอายุ (worker เดิมตาย) มาทำ
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker_id = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + settings.JOB_LEASE_SECONDS, now, row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def extend_lease(self, job_id: str, worker_id: str):
+        """ต่ออายุ lease ของงานที่ worker กำลังทำอยู่"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (now + settings.JOB_LEASE_SECONDS, now, job_id, worker_id)
+            )
+
+    def complete(self, job_id: str):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str) -> bool:
+        """
+        บันทึกว่างานล้มเหลว ถ้ายังไม่เกินจำนวนครั้งที่กำหนดจะนำกลับเข้าคิว
+        คืนค่า True ถ้างานล้มเหลวถาวร
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            exhausted = row is None or row["attempts"] >= settings.JOB_MAX_ATTEMPTS
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                ("failed" if exhausted else "queued", error, time.time(), job_id)
+            )
+        return exhausted
+
+    def batch_state(self, batch_id: str) -> Optional[str]:
+        """สถานะของงานล่าสุดของ batch (queued / running / done / failed) หรือ None ถ้าไม่มีงาน"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status FROM jobs WHERE json_extract(payload, '$.batch_id') = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (batch_id,)
+            ).fetchone()
+        return row["status"] if row else None
+
+    # ---- checkpoints ----
+
+    def record_checkpoints(self, batch_id: str, items: Iterable[tuple]):
+        """บันทึก checkpoint ของนักเรียนแต่ละคน items เป็น (student_file_id, status)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO checkpoints (batch_id, item_id, status, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(batch_id, item_id, status, now) for item_id, status in items]
+            )
+
+    def completed_items(self, batch_id: str) -> Set[str]:
+        """รายการ student_file_id ที่ตรวจเสร็จและบันทึกผลแล้ว"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT item_id FROM checkpoints WHERE batch_id = ? AND status = 'completed'", (batch_id,)
+            ).fetchall()
+        return {row["item_id"] for row in rows}
+
+    # ---- LLM endpoints added or drained at runtime ----
+
+    def set_llm_endpoint(self, url: str, draining: bool):
+        """บันทึกการเพิ่ม/drain endpoint ให้ worker ทุก process เห็น"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_endpoints (url, draining, updated_at) VALUES (?, ?, ?)",
+                (url.rstrip("/"), int(draining), time.time())
+            )
+
+    def llm_endpoints(self) -> List[Dict[str, Any]]:
+        """endpoint ที่เปลี่ยนขณะระบบทำงาน ตามลำดับที่เปลี่ยน"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT url, draining FROM llm_endpoints ORDER BY updated_at"
+            ).fetchall()
+        return [{"url": row["url"], "draining": bool(row["draining"])} for row in rows]
+
+    # ---- progress events ----
+
+    def publish_event(self, batch_id: str, event: str, data: Dict[str, Any]):
+        """บันทึก progress event ของ batch ให้ stream endpoint ส่งต่อไปยัง client"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO batch_events (batch_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                (batch_id, event, json.dumps(data), time.time())
+            )
+
+    def events_since(self, batch_id: str, last_event_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """ดึง event ของ batch ที่ใหม่กว่า last_event_id"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, event, data FROM batch_events WHERE batch_id = ? AND id > ? "
+                "ORDER BY id LIMIT ?",
+                (batch_id, last_event_id, limit)
+            ).fetchall()
+        return [
+            {"id": row["id"], "event": row["event"], "data": json.loads(row["data"])}
+            for row in rows
+        ]
+
+    def prune_events(self, retention_seconds: float = None) -> int:
+        """ลบ event ของ batch ที่จบ (completed / failed) มานานกว่า retention_seconds คืนจำนวนแถวที่ลบ"""
+        retention = settings.BATCH_EVENTS_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM batch_events WHERE batch_id IN ("
+                "SELECT batch_id FROM batch_events WHERE event IN ('completed', 'failed') AND created_at < ?)",
+                (time.time() - retention,)
+            )
+            return cursor.rowcount
+
+    # ---- workers ----
+
+    def register_worker(self, worker_id: str, pid: int):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, pid, busy_since, busy_seconds, started_at, heartbeat_at) "
+                "VALUES (?, ?, NULL, 0, ?, ?)",
+                (worker_id, pid, now, now)
+            )
+
+    def worker_heartbeat(self, worker_id: str, busy: Optional[bool] = None):
+        """
+        อัปเดต heartbeat ของ worker และสถานะว่าง/ไม่ว่าง เพื่อใช้คำนวณ utilization
+        """
+        now = time.time()
+        with self._connect() as conn:
+            if busy is True:
+                conn.execute(
+                    "UPDATE workers SET busy_since = COALESCE(busy_since, ?), heartbeat_at = ? WHERE worker_id = ?",
+                    (now, now, worker_id)
+                )
+            elif busy is False:
+                conn.execute(
+                    "UPDATE workers SET busy_seconds = busy_seconds + COALESCE(? - busy_since, 0), "
+                    "busy_since = NULL, heartbeat_at = ? WHERE worker_id = ?",
+                    (now, now, worker_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE workers SET heartbeat_at = ? WHERE worker_id = ?",
+                    (now, worker_id)
+                )
+
+    def unregister_worker(self, worker_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def stats(self) -> Dict[str, Any]:
+        """ความลึกของคิวและ utilization ของ worker ที่ยังทำงานอยู่"""
+        now = time.time()
+        alive_after = now - settings.JOB_LEASE_SECONDS
+        with self._connect() as conn:
+            counts = {
+                row["status"]: row["count"]
+                for row in conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")
+            }
+            workers = conn.execute(
+                "SELECT * FROM workers WHERE heartbeat_at >= ?", (alive_after,)
+            ).fetchall()
+
+        busy = 0
+        busy_seconds = 0.0
+        uptime = 0.0
+        for worker in workers:
+            busy_seconds += worker["busy_seconds"]
+            if worker["busy_since"] is not None:
+                busy += 1
+                busy_seconds += now - worker["busy_since"]
+            uptime += now - worker["started_at"]
+
+        return {
+            "depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "workers": len(workers),
+            "busy_workers": busy,
+            "utilization": busy_seconds / uptime if uptime > 0 else 0.0,
+        }
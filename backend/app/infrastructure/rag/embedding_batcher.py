@@ -0,0 +1,101 @@
+# backend/app/infrastructure/rag/embedding_batcher.py
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.utils.tokens import estimate_tokens
+
+
+class EmbeddingBatcher:
+    """
+    รวม request embedding ย่อยๆ ที่เข้ามาพร้อมกันให้เป็น batch ใหญ่ก่อนส่งไปที่ backend
+
+    ข้อความจะรอใน buffer ไม่เกิน max_wait วินาที หรือจนกว่า batch จะเต็ม
+    (max_batch_size ข้อความ หรือ max_batch_tokens token) แล้วจึงส่งรวดเดียว
+    ผู้เรียกแต่ละคนได้ future ของข้อความตัวเองคืนไป
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 64,
+        max_batch_tokens: int = 8000,
+        max_wait: float = 0.01
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait = max_wait
+
+        self.batches_sent = 0
+        self.texts_embedded = 0
+
+        self._pending = deque()
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight = set()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """สร้าง embeddings ของข้อความ โดยรวม batch กับผู้เรียกคนอื่น"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            tokens = estimate_tokens(text)
+            self._pending.append((text, tokens, future))
+            self._pending_tokens += tokens
+            futures.append(future)
+
+        if len(self._pending) >= self.max_batch_size or self._pending_tokens >= self.max_batch_tokens:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+
+        return list(await asyncio.gather(*futures))
+
+    def _dispatch(self):
+        """แบ่งข้อความที่รออยู่เป็น batch ตามขนาดและงบ token แล้วส่งทุก batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = []
+            tokens = 0
+            while self._pending and len(batch) < self.max_batch_size:
+                item = self._pending[0]
+                # ข้อความเดียวที่ยาวเกินงบ token ก็ยังต้องส่ง แต่ส่งแยกเป็น batch ของตัวเอง
+                if batch and tokens + item[1] > self.max_batch_tokens:
+                    break
+                batch.append(self._pending.popleft())
+                tokens += item[1]
+            self._pending_tokens -= tokens
+            task = asyncio.ensure_future(self._send(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[Tuple[str, int, asyncio.Future]]):
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = await self.embed_fn(texts)
+        except Exception as e:
+            logging.warning(f"Embedding batch of {len(texts)} texts failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_sent += 1
+        self.texts_embedded += len(texts)
+        for (_, _, future), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+
+    def stats(self):
+        return {
+            "batches_sent": self.batches_sent,
+            "texts_embedded": self.texts_embedded,
+            "avg_batch_size": self.texts_embedded / self.batches_sent if self.batches_sent else 0.0,
+            "pending": len(self._pending),
+        }
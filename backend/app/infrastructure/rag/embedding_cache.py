@@ -0,0 +1,210 @@
+# backend/app/infrastructure/rag/embedding_cache.py
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    key TEXT PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS slots_last_used_idx ON slots (last_used);
+"""
+
+
+class EmbeddingCache:
+    """
+    cache ของ embedding ราย chunk โดยใช้ hash ของข้อความเป็น key
+
+    vector ถูกเก็บใน float32 array แบบ memory-mapped (vectors.f32) ส่วน index ของ slot เก็บใน SQLite
+    หลาย worker process จึงเปิด cache เดียวกันได้
+    แต่ละ slot มี tag (64 bit แรกของ hash ของ key) เก็บคู่กันใน tags.u64 ผู้อ่านตรวจ tag ก่อนและหลัง copy vector
+    ถ้า process อื่น evict แล้วเขียน slot นั้นใหม่ระหว่างอ่าน tag จะไม่ตรงและนับเป็น miss
+    cache แยกโฟลเดอร์ตาม EMBEDDING_MODEL และ EMBEDDING_DIMENSION
+    เมื่อเต็ม max_entries จะนำ slot ที่ไม่ได้ใช้นานที่สุดกลับมาใช้ใหม่
+    """
+
+    def __init__(self, directory: str = None, model: str = None, dimension: int = None, max_entries: int = None):
+        self.model = model or settings.EMBEDDING_MODEL
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        self.max_entries = max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES
+
+        scope = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model)
+        self.directory = os.path.join(directory or settings.EMBEDDING_CACHE_DIR, f"{scope}-{self.dimension}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, "index.sqlite3")
+        vectors_path = os.path.join(self.directory, "vectors.f32")
+        tags_path = os.path.join(self.directory, "tags.u64")
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+            # ไฟล์ถูกสร้างเป็น sparse file ขนาดเต็ม capacity ตั้งแต่แรก จึงไม่ต้องขยายภายหลัง
+            # สร้างภายใต้ write lock ของ SQLite เพื่อไม่ให้หลาย process สร้างซ้อนกัน
+            # ถ้าไฟล์มีอยู่แล้วแต่ขนาดไม่ตรง จะไม่ truncate เพราะ process อื่นอาจ map ไฟล์นั้นอยู่
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                files = [(vectors_path, self.max_entries * self.dimension * 4), (tags_path, self.max_entries * 8)]
+                if not all(os.path.exists(path) for path, _ in files):
+                    for path, size in files:
+                        with open(path, "wb") as f:
+                            f.truncate(size)
+                    conn.execute("DELETE FROM slots")
+                for path, size in files:
+                    if os.path.getsize(path) != size:
+                        raise RuntimeError(
+                            f"ขนาดของ {path} ไม่ตรงกับ EMBEDDING_CACHE_MAX_ENTRIES/EMBEDDING_DIMENSION "
+                            f"ให้หยุด worker ทั้งหมดแล้วลบ {self.directory} ก่อนเปิดใหม่"
+                        )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        self.vectors = np.memmap(vectors_path, dtype=np.float32, mode="r+", shape=(self.max_entries, self.dimension))
+        self.tags = np.memmap(tags_path, dtype=np.uint64, mode="r+", shape=(self.max_entries,))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _tag(key: str) -> int:
+        # 0 หมายถึง slot ที่กำลังถูกเขียน จึงไม่ใช้เป็น tag
+        return int(key[:16], 16) or 1
+
+    def _read(self, slot: int, key: str) -> Optional[np.ndarray]:
+        """copy vector ของ slot ออกมา คืน None ถ้า slot ไม่ได้เป็นของ key นี้แล้ว"""
+        tag = self._tag(key)
+        if int(self.tags[slot]) != tag:
+            return None
+        vector = np.array(self.vectors[slot])
+        if int(self.tags[slot]) != tag:
+            return None
+        return vector
+
+    @staticmethod
+    def _lookup(conn, keys: List[str]):
+        """หา slot ของ key ทีละไม่เกิน 500 ตัว เพื่อไม่ให้เกินจำนวน parameter ของ SQLite"""
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, slot FROM slots WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        คืน vector ของแต่ละข้อความ (copy จาก memmap) หรือ None ถ้าไม่มีใน cache
+        """
+        keys = [self.key(text) for text in texts]
+        with self._connect() as conn:
+            found = self._lookup(conn, keys)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE slots SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+
+        vectors = [self._read(found[key], key) if key in found else None for key in keys]
+        hits = sum(1 for vector in vectors if vector is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        return vectors
+
+    def put_many(self, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """
+        เก็บ vector ลง cache ข้าม vector ที่มิติไม่ตรง (เช่นจาก backend สำรอง)
+        """
+        items = {}
+        for text, embedding in zip(texts, embeddings):
+            if len(embedding) == self.dimension:
+                items[self.key(text)] = embedding
+        if not items:
+            return
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._lookup(conn, list(items))
+                new_keys = [key for key in items if key not in existing]
+
+                # slot ถูกใช้เรียงจาก 0 เสมอ (slot ที่ถูก evict จะถูกใช้ซ้ำทันที) slot ว่างถัดไปจึงเท่ากับจำนวนที่ใช้อยู่
+                used = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+                slots = list(range(used, min(used + len(new_keys), self.max_entries)))
+
+                # cache เต็ม: นำ slot ที่ไม่ได้ใช้นานที่สุดกลับมาใช้
+                shortfall = len(new_keys) - len(slots)
+                if shortfall > 0:
+                    evicted = conn.execute(
+                        "SELECT key, slot FROM slots ORDER BY last_used LIMIT ?", (shortfall,)
+                    ).fetchall()
+                    conn.executemany("DELETE FROM slots WHERE key = ?", [(key,) for key, _ in evicted])
+                    slots.extend(slot for _, slot in evicted)
+
+                # ล้าง tag ก่อนเขียน vector แล้วจึงตั้ง tag ใหม่ ผู้อ่านที่อ่าน slot นี้ค้างอยู่จะเห็น tag ไม่ตรง
+                assignments = list(zip(new_keys, slots))
+                for key, slot in assignments:
+                    self.tags[slot] = 0
+                    self.vectors[slot] = np.asarray(items[key], dtype=np.float32)
+                    self.tags[slot] = self._tag(key)
+                self.vectors.flush()
+                self.tags.flush()
+
+                conn.executemany(
+                    "INSERT INTO slots (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slot, now) for key, slot in assignments]
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "capacity": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache()
+def get_embedding_cache() -> EmbeddingCache:
+    """cache เดียวต่อ process"""
+    return EmbeddingCache()
@@ -0,0 +1,168 @@
+# backend/app/infrastructure/rag/embedding_router.py
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.infrastructure.rag.embeddings import EmbeddingService
+
+
+class CircuitBreaker:
+    """
+    circuit breaker แบบง่าย: closed -> open เมื่อ error หรือช้าติดกันครบ failure_threshold ครั้ง
+    เมื่อ open ครบ reset_timeout วินาทีจะยอมให้ลองหนึ่งครั้ง (half-open) ถ้าสำเร็จจะกลับเป็น closed
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, slow_call_threshold: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            return True
+        # half-open ให้ลองได้ทีละหนึ่งครั้ง
+        return False
+
+    def record_success(self, latency: float):
+        if latency > self.slow_call_threshold:
+            self.record_failure()
+            return
+        if self.state != self.CLOSED:
+            logging.info("Embedding circuit closed, primary backend recovered")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logging.warning("Embedding circuit opened, failing fast until the backend recovers")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class EmbeddingUnavailableError(RuntimeError):
+    """LMStudio embedding backend ใช้งานไม่ได้ (circuit เปิดอยู่)"""
+
+
+class EmbeddingRouter:
+    """
+    ส่ง embedding ไปที่ LMStudio ผ่าน circuit breaker
+
+    backend ถูกสร้างเมื่อใช้งานครั้งแรกเท่านั้น การสร้าง object นี้จึงไม่เรียก network
+    ถ้า LMStudio error หรือช้าติดกัน circuit จะเปิดและทุก call จะ fail fast ด้วย EmbeddingUnavailableError
+    แทนการรอ timeout ซ้ำ health probe ที่ทำงานเบื้องหลังจะปิด circuit เมื่อ LMStudio กลับมา
+
+    ไม่สลับไปใช้ model สำรอง: embedding ทุกตัวถูกเก็บหรือเทียบกับ vector ใน index เดียวกัน
+    model อื่นให้ vector คนละมิติและคนละ space จึงทำให้ insert ล้มหรือผลค้นหาผิด
+    """
+
+    def __init__(self, primary_factory: Callable = None):
+        self._primary_factory = primary_factory or EmbeddingService
+        self._primary = None
+
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.EMBEDDING_BREAKER_FAILURES,
+            reset_timeout=settings.EMBEDDING_BREAKER_RESET_SECONDS,
+            slow_call_threshold=settings.EMBEDDING_SLOW_CALL_SECONDS
+        )
+        self._probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def primary(self):
+        if self._primary is None:
+            self._primary = self._primary_factory()
+        return self._primary
+
+    @property
+    def using_lmstudio(self) -> bool:
+        return self.breaker.state == CircuitBreaker.CLOSED
+
+    async def get_embeddings(self, texts):
+        """
+        สร้าง embeddings สำหรับรายการข้อความ
+        """
+        return await self._call("get_embeddings", texts)
+
+    async def get_query_embedding(self, query):
+        """
+        สร้าง embedding สำหรับคำถาม
+        """
+        return await self._call("get_query_embedding", query)
+
+    async def get_query_embeddings(self, queries):
+        """
+        สร้าง embedding สำหรับหลายคำถามในครั้งเดียว
+        """
+        return await self._call("get_query_embeddings", list(queries))
+
+    async def _call(self, method: str, argument):
+        if not self.breaker.allow_request():
+            raise EmbeddingUnavailableError("LMStudio embedding backend is unavailable")
+
+        started = time.monotonic()
+        try:
+            result = await getattr(self.primary, method)(argument)
+        except Exception as e:
+            logging.warning(f"Embedding backend failed: {e}")
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success(time.monotonic() - started)
+        return result
+
+    # ---- background health probe ----
+
+    def start_health_probe(self):
+        """เริ่ม health probe เบื้องหลัง (ต้องเรียกจากใน event loop)"""
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop_health_probe(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def probe(self) -> bool:
+        """ทดสอบ LMStudio หนึ่งครั้ง และอัปเดต circuit breaker ตามผล"""
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                self.primary.get_query_embedding("health check"),
+                timeout=settings.EMBEDDING_SLOW_CALL_SECONDS
+            )
+        except Exception as e:
+            logging.debug(f"Embedding health probe failed: {e}")
+            self.breaker.record_failure()
+            return False
+
+        self.breaker.record_success(time.monotonic() - started)
+        return self.breaker.state == CircuitBreaker.CLOSED
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(settings.EMBEDDING_PROBE_INTERVAL_SECONDS)
+            await self.probe()
+
+    def status(self):
+        return {
+            "backend": "lmstudio" if self.using_lmstudio else "unavailable",
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+        }
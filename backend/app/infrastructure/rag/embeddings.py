@@ -1,16 +1,24 @@
-from langchain_community.embeddings import OpenAIEmbeddings
 from app.core.config import settings
+from app.infrastructure.llm.endpoint_router import EndpointRouter, get_endpoint_router
+from app.infrastructure.rag.embedding_batcher import EmbeddingBatcher
+from typing import Optional
 
 class EmbeddingService:
-    def __init__(self):
-        # ใช้ OpenAIEmbeddings แต่เปลี่ยน base URL ไปที่ LMStudio
-        self.model = OpenAIEmbeddings(
-            model=settings.EMBEDDING_MODEL,
-            openai_api_base=settings.LMSTUDIO_URL,
-            openai_api_key="not-needed",  # LMStudio มักไม่ต้องการ API key
-            dimensions=settings.EMBEDDING_DIMENSION,
+    def __init__(self, router: Optional[EndpointRouter] = None):
+        # ใช้ OpenAIEmbeddings ของ LMStudio endpoint ที่ว่างที่สุดในแต่ละ batch
+        self.router = router or get_endpoint_router()
+        # รวม request ที่เข้ามาพร้อมกันเป็น batch เดียว และเรียก API แบบ async ไม่บล็อก event loop
+        self.batcher = EmbeddingBatcher(
+            self._embed_batch,
+            max_batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_wait=settings.EMBEDDING_BATCH_WAIT_MS / 1000
         )
     
+    async def _embed_batch(self, texts):
+        async with self.router.lease() as endpoint:
+            return await endpoint.embedding_model.aembed_documents(texts)
+    
     async def get_embeddings(self, texts):
         """
         สร้าง embeddings สำหรับรายการข้อความ
@@ -18,11 +26,18 @@ class EmbeddingService:
         if isinstance(texts, str):
             texts = [texts]
             
-        embeddings = self.model.embed_documents(texts)
+        embeddings = await self.batcher.embed(texts)
         return embeddings
     
     async def get_query_embedding(self, query):
         """
         สร้าง embedding สำหรับคำถาม
         """
-        return self.model.embed_query(query)
\ No newline at end of file
+        embeddings = await self.batcher.embed([query])
+        return embeddings[0]
+    
+    async def get_query_embeddings(self, queries):
+        """
+        สร้าง embedding สำหรับหลายคำถามในครั้งเดียว
+        """
+        return await self.batcher.embed(list(queries))
@@ -0,0 +1,158 @@
+# backend/app/infrastructure/rag/ingestion_buffer.py
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class VectorIngestionBuffer:
+    """
+    รวม chunk ที่จะเขียนลง vector store จากหลายเอกสารไว้ใน buffer แล้วเขียนเป็น batch ใหญ่
+
+    buffer จะถูกเขียนเมื่อมีครบ max_rows แถว เมื่อแถวแรกรอนานเกิน max_age วินาที หรือเมื่อเรียก flush()/drain()
+    ถ้ามีแถวที่ยังไม่ถูกเขียน (รวมที่กำลังเขียนอยู่) เกิน max_pending_rows ผู้เรียก add() จะต้องรอ (back-pressure)
+    drain() เขียนทุกแถวที่เหลือแล้ว flush ที่ vector store หนึ่งครั้ง ต้องเรียกก่อนปิดระบบ
+
+    แถวของ add() หนึ่งครั้งอยู่ใน batch เดียวกันเสมอ add() คืน future ที่ได้ id เมื่อแถวถูกเขียนแล้ว
+    ถ้าเขียนไม่สำเร็จ แถวของ batch นั้นจะถูกทิ้งและ future ได้ exception ผู้เรียกจึงลองใหม่ได้โดยไม่เกิดแถวซ้ำ
+    """
+
+    def __init__(self, store, max_rows: int = 1000, max_age: float = 2.0, max_pending_rows: int = 10000):
+        self.store = store
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.max_pending_rows = max(max_pending_rows, max_rows)
+
+        self.rows_ingested = 0
+        self.rows_failed = 0
+        self.write_calls = 0
+        self.write_seconds = 0.0
+        self.backpressure_waits = 0
+        self._first_row_at: Optional[float] = None
+        self._last_write_at: Optional[float] = None
+
+        # แต่ละรายการคือแถวของ add() หนึ่งครั้ง: (ids, texts, embeddings, metadatas, future)
+        self._buffer: List[tuple] = []
+        self._buffered_rows = 0
+        self._pending_rows = 0
+        self._lock = asyncio.Lock()
+        self._space = asyncio.Condition()
+        self._timer = None
+
+    async def add(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None
+    ) -> "asyncio.Future[List[str]]":
+        """
+        เพิ่มแถวลง buffer แล้วคืนทันที แถวจะถูกเขียนภายหลัง
+        await future ที่คืนมาเพื่อรอจนแถวถูกเขียน (ได้ id) หรือได้ exception ถ้าเขียนไม่สำเร็จ
+        """
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [str(uuid.uuid4()) for _ in texts]
+        written = asyncio.get_running_loop().create_future()
+        if not ids:
+            written.set_result(ids)
+            return written
+
+        async with self._space:
+            if self._pending_rows + len(ids) > self.max_pending_rows and self._pending_rows > 0:
+                self.backpressure_waits += 1
+                await self._space.wait_for(
+                    lambda: self._pending_rows == 0 or self._pending_rows + len(ids) <= self.max_pending_rows
+                )
+            self._pending_rows += len(ids)
+
+        if self._first_row_at is None:
+            self._first_row_at = time.monotonic()
+        self._buffer.append((ids, list(texts), list(embeddings), list(metadatas), written))
+        self._buffered_rows += len(ids)
+
+        if self._buffered_rows >= self.max_rows:
+            # เขียนเฉพาะ batch ที่เต็ม ส่วนที่เหลือรอรวมกับแถวถัดไปหรือรอ timer
+            await self.flush(full_batches_only=True)
+        if self._buffer and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return written
+
+    def _take_batch(self) -> List[tuple]:
+        """ดึงรายการจากหัว buffer จนเกือบครบ max_rows แถว (รายการเดียวที่ใหญ่กว่า max_rows เป็น batch เดี่ยว)"""
+        batch, rows = [], 0
+        while self._buffer and (not batch or rows + len(self._buffer[0][0]) <= self.max_rows):
+            entry = self._buffer.pop(0)
+            batch.append(entry)
+            rows += len(entry[0])
+        self._buffered_rows -= rows
+        return batch
+
+    async def flush(self, full_batches_only: bool = False):
+        """
+        เขียนแถวใน buffer เป็น batch ละไม่เกิน max_rows
+        error ของการเขียนไม่ถูก raise ที่นี่ แต่ส่งไปที่ future ของ add() ที่แถวอยู่ใน batch นั้น
+        """
+        async with self._lock:
+            if not full_batches_only:
+                if self._timer is not None and self._timer is not asyncio.current_task():
+                    self._timer.cancel()
+                self._timer = None
+
+            while self._buffer and (not full_batches_only or self._buffered_rows >= self.max_rows):
+                batch = self._take_batch()
+                ids, texts, embeddings, metadatas = [], [], [], []
+                for entry_ids, entry_texts, entry_embeddings, entry_metadatas, _ in batch:
+                    ids.extend(entry_ids)
+                    texts.extend(entry_texts)
+                    embeddings.extend(entry_embeddings)
+                    metadatas.extend(entry_metadatas)
+
+                started = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.store.insert, texts, embeddings, metadatas, ids)
+                except Exception as e:
+                    logging.error(f"Error writing {len(ids)} buffered vectors: {str(e)}")
+                    self.rows_failed += len(ids)
+                    for *_, written in batch:
+                        if not written.done():
+                            written.set_exception(e)
+                else:
+                    self.write_seconds += time.monotonic() - started
+                    self._last_write_at = time.monotonic()
+                    self.write_calls += 1
+                    self.rows_ingested += len(ids)
+                    for entry_ids, *_, written in batch:
+                        if not written.done():
+                            written.set_result(entry_ids)
+
+                # แถวที่เขียนแล้วหรือถูกทิ้งไม่ค้างอยู่อีกต่อไป ผู้ที่รอ back-pressure จึงไม่ค้าง
+                async with self._space:
+                    self._pending_rows -= len(ids)
+                    self._space.notify_all()
+
+    async def drain(self):
+        """เขียนแถวที่เหลือทั้งหมด แล้ว flush ที่ vector store ครั้งเดียว"""
+        await self.flush()
+        if self.rows_ingested:
+            await asyncio.to_thread(self.store.flush)
+        logging.info(f"Vector ingestion drained: {self.stats()}")
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_age)
+        await self.flush()
+
+    def stats(self):
+        elapsed = (
+            self._last_write_at - self._first_row_at
+            if self._first_row_at is not None and self._last_write_at is not None else 0.0
+        )
+        return {
+            "rows_ingested": self.rows_ingested,
+            "rows_failed": self.rows_failed,
+            "write_calls": self.write_calls,
+            "pending_rows": self._pending_rows,
+            "backpressure_waits": self.backpressure_waits,
+            # rows ต่อวินาทีของการเขียน และตั้งแต่แถวแรกเข้ามาจนเขียนครั้งล่าสุด
+            "write_rows_per_second": self.rows_ingested / self.write_seconds if self.write_seconds else 0.0,
+            "ingest_rows_per_second": self.rows_ingested / elapsed if elapsed else 0.0,
+        }
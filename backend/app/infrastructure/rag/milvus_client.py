@@ -1,12 +1,45 @@
 from pymilvus import Collection, connections, utility
 from app.core.config import settings
+from typing import Any, Dict, List, Optional
+import json
+import logging
+
+# field ที่แยกออกจาก metadata เป็น scalar field เพื่อใช้กรองตอนค้นหา
+SCALAR_FIELDS = ("assignment_id", "document_id", "file_type", "chunk_index")
+
+def filter_expr(
+    assignment_id: Optional[str] = None,
+    file_type: Optional[str] = None,
+    document_id: Optional[str] = None
+) -> Optional[str]:
+    """แปลงเงื่อนไขเป็น boolean expression ของ Milvus (assignment_id ทำให้ค้นเฉพาะ partition ของงานนั้น)"""
+    conditions = [
+        f"{field} == {json.dumps(value)}"
+        for field, value in (("assignment_id", assignment_id), ("file_type", file_type), ("document_id", document_id))
+        if value is not None
+    ]
+    return " and ".join(conditions) or None
 
 class MilvusClient:
-    def __init__(self):
+    """
+    Vector store บน Milvus หนึ่ง collection แบ่ง partition ตาม assignment_id (partition key)
+    แต่ละแถวคือ chunk หนึ่งของเอกสาร พร้อม assignment_id, document_id, file_type และ chunk_index
+    """
+    def __init__(
+        self,
+        collection_name: Optional[str] = None,
+        index_type: Optional[str] = None,
+        index_params: Optional[Dict[str, Any]] = None,
+        search_params: Optional[Dict[str, Any]] = None
+    ):
         """Initialize connection to Milvus Vector DB"""
         self.host = settings.MILVUS_HOST
         self.port = settings.MILVUS_PORT
-        self.collection_name = settings.MILVUS_COLLECTION
+        self.collection_name = collection_name or settings.MILVUS_COLLECTION
+        self.metric_type = settings.MILVUS_METRIC_TYPE
+        self.index_type = index_type or settings.MILVUS_INDEX_TYPE
+        self.index_params = index_params if index_params is not None else settings.MILVUS_INDEX_PARAMS
+        self.search_params = search_params if search_params is not None else settings.MILVUS_SEARCH_PARAMS
         
         # Connect to Milvus
         connections.connect(
@@ -17,59 +50,162 @@ class MilvusClient:
         
         # Check if collection exists, if not create it
         self._ensure_collection_exists()
+        
+        # Keep one loaded handle instead of loading the collection on every query
+        self.collection = Collection(self.collection_name)
+        self._ensure_index()
+        self.collection.load()
+    
+    def close(self):
+        """Close the connection to Milvus"""
+        connections.disconnect("default")
     
     def _ensure_collection_exists(self):
         """Ensure that the collection exists, create if not"""
-        if not utility.has_collection(self.collection_name):
-            from pymilvus import CollectionSchema, FieldSchema, DataType
-            
-            # Define fields for the collection
-            fields = [
-                FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
-                FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
-                FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.EMBEDDING_DIMENSION),
-                FieldSchema(name="metadata", dtype=DataType.JSON)
-            ]
-            
-            schema = CollectionSchema(fields=fields)
-            Collection(name=self.collection_name, schema=schema)
+        if utility.has_collection(self.collection_name):
+            fields = {field.name for field in Collection(self.collection_name).schema.fields}
+            if not set(SCALAR_FIELDS) <= fields:
+                raise RuntimeError(
+                    f"Milvus collection {self.collection_name} has no assignment partition fields; "
+                    "set MILVUS_COLLECTION to a new collection and re-index the documents"
+                )
+            return
+        
+        from pymilvus import CollectionSchema, FieldSchema, DataType
+        
+        # Define fields for the collection
+        fields = [
+            FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
+            # partition key: Milvus hash แถวของแต่ละงานลง partition และค้นเฉพาะ partition นั้นเมื่อกรองด้วย assignment_id
+            FieldSchema(name="assignment_id", dtype=DataType.VARCHAR, max_length=100, is_partition_key=True),
+            FieldSchema(name="document_id", dtype=DataType.VARCHAR, max_length=200),
+            FieldSchema(name="file_type", dtype=DataType.VARCHAR, max_length=20),
+            FieldSchema(name="chunk_index", dtype=DataType.INT64),
+            FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=65535),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=settings.EMBEDDING_DIMENSION),
+            FieldSchema(name="metadata", dtype=DataType.JSON)
+        ]
+        
+        schema = CollectionSchema(fields=fields)
+        Collection(name=self.collection_name, schema=schema, num_partitions=settings.MILVUS_NUM_PARTITIONS)
     
-    def search(self, query_embedding, limit=5):
-        """Search for similar vectors in Milvus"""
-        collection = Collection(self.collection_name)
-        collection.load()
+    def _ensure_index(self):
+        """Build the configured ANN index, rebuilding it when the index type or parameters changed"""
+        wanted = {
+            "index_type": self.index_type,
+            "metric_type": self.metric_type,
+            "params": self.index_params
+        }
         
-        search_params = {"metric_type": "COSINE", "params": {"nprobe": 10}}
-        results = collection.search(
-            data=[query_embedding], 
+        if self.collection.has_index():
+            current = self.collection.index().params
+            # Milvus may return parameter values as strings
+            same_params = (
+                {key: str(value) for key, value in (current.get("params") or {}).items()}
+                == {key: str(value) for key, value in wanted["params"].items()}
+            )
+            if (
+                current.get("index_type") == wanted["index_type"]
+                and current.get("metric_type") == wanted["metric_type"]
+                and same_params
+            ):
+                return
+            logging.info(f"Rebuilding Milvus index on {self.collection_name}: {current} -> {wanted}")
+            self.collection.release()
+            self.collection.drop_index()
+        
+        self.collection.create_index(field_name="embedding", index_params=wanted)
+        utility.wait_for_index_building_complete(self.collection_name)
+    
+    def search(
+        self,
+        query_embedding,
+        limit: int = 5,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar chunks, scoped to one assignment / file type / document when given"""
+        return self.search_many([query_embedding], limit, assignment_id, file_type, document_id)[0]
+    
+    def search_many(
+        self,
+        query_embeddings,
+        limit: int = 5,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search many query vectors in one request, returning the top-k hits of every query in order"""
+        if len(query_embeddings) == 0:
+            return []
+        search_params = {"metric_type": self.metric_type, "params": self.search_params}
+        results = self.collection.search(
+            data=list(query_embeddings), 
             anns_field="embedding", 
             param=search_params,
             limit=limit,
-            output_fields=["content", "metadata"]
+            expr=filter_expr(assignment_id, file_type, document_id),
+            output_fields=["content", "metadata", *SCALAR_FIELDS],
+            # Session consistency: rows this client inserted are visible without a flush
+            consistency_level=settings.MILVUS_CONSISTENCY_LEVEL
         )
         
-        return results
+        return [[self._format_hit(hit) for hit in hits] for hits in results]
     
-    def insert(self, texts, embeddings, metadatas=None):
-        """Insert vectors into Milvus"""
-        if not metadatas:
-            metadatas = [{}] * len(texts)
-            
-        collection = Collection(self.collection_name)
-        
+    @staticmethod
+    def _format_hit(hit) -> Dict[str, Any]:
+        fields = {name: hit.entity.get(name) for name in SCALAR_FIELDS}
+        return {
+            "id": hit.id,
+            **fields,
+            "text": hit.entity.get("content"),
+            "metadata": {**(hit.entity.get("metadata") or {}), **fields},
+            "score": hit.distance
+        }
+    
+    def exists(
+        self,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> bool:
+        """Check whether any chunk matches the given assignment / file type / document"""
+        return bool(self.collection.query(
+            expr=filter_expr(assignment_id, file_type, document_id) or 'id != ""',
+            output_fields=["id"],
+            limit=1,
+            consistency_level=settings.MILVUS_CONSISTENCY_LEVEL
+        ))
+    
+    def insert(self, texts, embeddings, metadatas, ids=None):
+        """
+        Insert chunks into Milvus. Every metadata must carry assignment_id, document_id,
+        file_type and chunk_index; other keys are kept in the metadata JSON field.
+        Rows are not flushed here: sealing a segment per insert is slow, call flush()
+        once after a bulk load instead.
+        """
         # Generate IDs
-        import uuid
-        ids = [str(uuid.uuid4()) for _ in range(len(texts))]
+        if ids is None:
+            import uuid
+            ids = [str(uuid.uuid4()) for _ in range(len(texts))]
         
-        # Insert data
+        # Insert data (ลำดับ column ตาม schema)
         entities = [
             ids,
+            [metadata["assignment_id"] for metadata in metadatas],
+            [metadata["document_id"] for metadata in metadatas],
+            [metadata["file_type"] for metadata in metadatas],
+            [int(metadata.get("chunk_index", 0)) for metadata in metadatas],
             texts,
             embeddings,
-            metadatas
+            [{key: value for key, value in metadata.items() if key not in SCALAR_FIELDS} for metadata in metadatas]
         ]
         
-        collection.insert(entities)
-        collection.flush()
+        self.collection.insert(entities)
         
-        return ids
\ No newline at end of file
+        return ids
+    
+    def flush(self):
+        """Seal growing segments so inserted rows are persisted and indexed"""
+        self.collection.flush()
@@ -0,0 +1,275 @@
+# backend/app/infrastructure/rag/numpy_store.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.infrastructure.rag.milvus_client import SCALAR_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    assignment_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    file_type TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+"""
+
+
+class NumpyVectorStore:
+    """
+    vector store ใน process ใช้แทน MilvusClient ได้ (insert / search / search_many / exists / flush / close แบบเดียวกัน)
+    สำหรับเครื่องเล็กหรือ CI ที่ไม่มี Milvus
+
+    vector เก็บใน float32 matrix แบบ memory-mapped (vectors.f32) ส่วนข้อความและ field สำหรับกรองเก็บใน SQLite
+    ค้นหาแบบ exact ด้วย dot product ของทั้ง matrix (หรือเฉพาะแถวของงานที่ระบุ) แล้วเลือก top-k ด้วย argpartition
+    metric COSINE จะ normalize vector ตอน insert จึงใช้ dot product ได้เลย
+
+    API และ batch worker หลาย process ใช้ directory เดียวกันได้: insert จองแถวด้วย BEGIN IMMEDIATE ของ SQLite
+    (lock ข้าม process) และทุก search / exists โหลดแถวที่ process อื่นเพิ่มเข้ามาก่อน
+    """
+
+    def __init__(self, directory: str = None, dimension: int = None, metric_type: str = None, initial_capacity: int = None):
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+        self.metric_type = (metric_type or settings.MILVUS_METRIC_TYPE).upper()
+        if self.metric_type not in ("COSINE", "IP"):
+            raise ValueError(f"NumpyVectorStore supports COSINE and IP metrics, not {self.metric_type}")
+
+        self.directory = os.path.join(directory or settings.NUMPY_STORE_DIR, f"{self.metric_type.lower()}-{self.dimension}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, "chunks.sqlite3")
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+
+        self.searches = 0
+        self._lock = threading.Lock()
+
+        self._chunks: List[Dict[str, Any]] = []
+        self._assignment_rows: Dict[str, List[int]] = {}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # แถวใน SQLite ถูก commit หลังเขียน vector แล้ว จึงเชื่อถือจำนวนแถวจาก SQLite ได้เสมอ
+            self._load_new_rows(conn)
+
+        capacity = max(initial_capacity or settings.NUMPY_STORE_INITIAL_CAPACITY, len(self._chunks), 1)
+        if os.path.exists(self.vectors_path):
+            capacity = max(capacity, os.path.getsize(self.vectors_path) // (self.dimension * 4))
+        self._open_vectors(capacity)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _open_vectors(self, capacity: int):
+        """เปิด (หรือขยาย) ไฟล์ vector ให้มีขนาด capacity แถว"""
+        size = capacity * self.dimension * 4
+        if not os.path.exists(self.vectors_path) or os.path.getsize(self.vectors_path) < size:
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(size)
+        self.capacity = capacity
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _load_new_rows(self, conn):
+        """โหลดแถวที่ยังไม่อยู่ในหน่วยความจำ (ที่ process อื่นเพิ่ม) แถวถูกจองต่อกันเสมอจึงอ่านต่อจากแถวสุดท้ายได้"""
+        rows = conn.execute(
+            "SELECT row, id, assignment_id, document_id, file_type, chunk_index, content, metadata "
+            "FROM chunks WHERE row >= ? ORDER BY row",
+            (len(self._chunks),)
+        ).fetchall()
+        for row, *values in rows:
+            self._remember(row, *values)
+
+    def _sync(self):
+        """ตามแถวที่ process อื่นเพิ่ม และเปิด matrix ใหม่ถ้าไฟล์ถูกขยายจนเกิน mapping ปัจจุบัน"""
+        with self._connect() as conn:
+            self._load_new_rows(conn)
+        if len(self._chunks) > self.capacity:
+            self._open_vectors(max(len(self._chunks), os.path.getsize(self.vectors_path) // (self.dimension * 4)))
+
+    def _remember(self, row, id, assignment_id, document_id, file_type, chunk_index, content, metadata):
+        self._chunks.append({
+            "id": id,
+            "assignment_id": assignment_id,
+            "document_id": document_id,
+            "file_type": file_type,
+            "chunk_index": chunk_index,
+            "text": content,
+            "metadata": json.loads(metadata) if isinstance(metadata, str) else metadata,
+        })
+        self._assignment_rows.setdefault(assignment_id, []).append(row)
+
+    def insert(self, texts, embeddings, metadatas, ids=None):
+        """
+        เพิ่ม chunk ลง store metadata แต่ละแถวต้องมี assignment_id, document_id, file_type และ chunk_index
+        เหมือน MilvusClient.insert
+        """
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in range(len(texts))]
+        if not texts:
+            return ids
+
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), self.dimension)
+        if self.metric_type == "COSINE":
+            matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+        with self._lock, self._connect() as conn:
+            # BEGIN IMMEDIATE ถือ write lock ของ SQLite ข้าม process ไว้ตั้งแต่จองแถวจน commit
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._load_new_rows(conn)
+                start = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM chunks").fetchone()[0]
+                end = start + len(texts)
+                # process อื่นอาจขยายไฟล์ไปแล้ว ใช้ขนาดไฟล์ปัจจุบันเป็นฐาน
+                capacity = max(self.capacity, os.path.getsize(self.vectors_path) // (self.dimension * 4))
+                if end > capacity:
+                    capacity = max(capacity * 2, end)
+                if capacity != self.capacity:
+                    self.vectors.flush()
+                    self._open_vectors(capacity)
+                self.vectors[start:end] = matrix
+                self.vectors.flush()
+
+                records = [
+                    (
+                        start + i,
+                        ids[i],
+                        metadata["assignment_id"],
+                        metadata["document_id"],
+                        metadata["file_type"],
+                        int(metadata.get("chunk_index", 0)),
+                        text,
+                        json.dumps({key: value for key, value in metadata.items() if key not in SCALAR_FIELDS}),
+                    )
+                    for i, (text, metadata) in enumerate(zip(texts, metadatas))
+                ]
+                conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            for record in records:
+                self._remember(*record)
+
+        return ids
+
+    def _candidate_rows(self, assignment_id, file_type, document_id) -> Optional[np.ndarray]:
+        """แถวที่ผ่านเงื่อนไข (None = ทุกแถว)"""
+        if assignment_id is None and file_type is None and document_id is None:
+            return None
+        rows = self._assignment_rows.get(assignment_id, []) if assignment_id is not None else range(len(self._chunks))
+        if file_type is not None or document_id is not None:
+            rows = [
+                row for row in rows
+                if (file_type is None or self._chunks[row]["file_type"] == file_type)
+                and (document_id is None or self._chunks[row]["document_id"] == document_id)
+            ]
+        return np.asarray(rows, dtype=np.int64)
+
+    def search(
+        self,
+        query_embedding,
+        limit: int = 5,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """ค้นหา chunk ที่คล้ายที่สุด คืนผลรูปแบบเดียวกับ MilvusClient.search"""
+        return self.search_many([query_embedding], limit, assignment_id, file_type, document_id)[0]
+
+    def search_many(
+        self,
+        query_embeddings,
+        limit: int = 5,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """ค้นหาหลาย query ในครั้งเดียวด้วย matrix product เดียว คืน top-k ของแต่ละ query ตามลำดับ"""
+        if len(query_embeddings) == 0:
+            return []
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if self.metric_type == "COSINE":
+            queries = queries / np.linalg.norm(queries, axis=1, keepdims=True).clip(min=1e-12)
+
+        with self._lock:
+            self._sync()
+            self.searches += len(queries)
+            rows = self._candidate_rows(assignment_id, file_type, document_id)
+            if rows is None:
+                scores = queries @ self.vectors[:len(self._chunks)].T
+            else:
+                scores = queries @ self.vectors[rows].T
+            if scores.shape[1] == 0 or limit <= 0:
+                return [[] for _ in range(len(queries))]
+
+            # top-k ของทุก query ด้วย partial sort แล้วเรียงเฉพาะ k ตัวนั้น
+            if scores.shape[1] > limit:
+                top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+            else:
+                top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            top = np.take_along_axis(top, np.argsort(-top_scores, axis=1, kind="stable"), axis=1)
+
+            results = []
+            for query_scores, positions in zip(scores, top):
+                hits = []
+                for position in positions:
+                    row = int(rows[position]) if rows is not None else int(position)
+                    chunk = self._chunks[row]
+                    fields = {name: chunk[name] for name in SCALAR_FIELDS}
+                    hits.append({
+                        "id": chunk["id"],
+                        **fields,
+                        "text": chunk["text"],
+                        "metadata": {**chunk["metadata"], **fields},
+                        "score": float(query_scores[position]),
+                    })
+                results.append(hits)
+            return results
+
+    def exists(
+        self,
+        assignment_id: Optional[str] = None,
+        file_type: Optional[str] = None,
+        document_id: Optional[str] = None
+    ) -> bool:
+        with self._lock:
+            self._sync()
+            rows = self._candidate_rows(assignment_id, file_type, document_id)
+            return len(self._chunks) > 0 if rows is None else len(rows) > 0
+
+    def flush(self):
+        """เขียน vector ที่ค้างใน page cache ลงดิสก์"""
+        with self._lock:
+            self.vectors.flush()
+
+    def close(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"Error flushing NumPy vector store: {str(e)}")
+
+    def stats(self):
+        return {
+            "rows": len(self._chunks),
+            "capacity": self.capacity,
+            "assignments": len(self._assignment_rows),
+            "searches": self.searches,
+            "directory": self.directory,
+        }
@@ -0,0 +1,17 @@
+# backend/app/infrastructure/rag/vector_store.py
+from app.core.config import settings
+
+
+def create_vector_store():
+    """
+    สร้าง vector store ตาม VECTOR_STORE: "milvus" (ค่าเริ่มต้น) หรือ "numpy" (ใน process ไม่ต้องมี Milvus)
+    ทั้งสองแบบมี insert / search / search_many / exists / flush / close เหมือนกัน
+    """
+    backend = settings.VECTOR_STORE.lower()
+    if backend == "numpy":
+        from app.infrastructure.rag.numpy_store import NumpyVectorStore
+        return NumpyVectorStore()
+    if backend == "milvus":
+        from app.infrastructure.rag.milvus_client import MilvusClient
+        return MilvusClient()
+    raise ValueError(f"Unknown VECTOR_STORE: {settings.VECTOR_STORE}")
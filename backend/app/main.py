@@ -1,9 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import logging
 
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.infrastructure.llm.endpoint_router import get_endpoint_router
+from app.infrastructure.queue.job_queue import JobQueue
 from app.setup import setup_app
 
 # ตั้งค่า logging
@@ -15,10 +19,40 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    สร้าง service ที่ใช้ร่วมกันตอนเริ่มระบบ และปิดเมื่อระบบหยุดทำงาน
+    """
+    logger.info("Starting up application...")
+    milvus_client = None
+    try:
+        # ตั้งค่าระบบ
+        milvus_client = setup_app()
+    except Exception as e:
+        logger.error(f"Error during startup: {e}")
+        # ไม่หยุดการทำงานของระบบ แต่บันทึกข้อผิดพลาด
+    
+    container = ServiceContainer()
+    await container.startup(milvus_client=milvus_client)
+    app.state.container = container
+    
+    # LLM endpoint ที่ถูกเพิ่ม/drain ผ่าน API ก่อน restart
+    try:
+        get_endpoint_router().apply(JobQueue().llm_endpoints())
+    except Exception as e:
+        logger.error(f"Error restoring LLM endpoints: {e}")
+    try:
+        yield
+    finally:
+        logger.info("Shutting down application...")
+        await container.shutdown()
+
 app = FastAPI(
     title="Grading LLM API",
     description="API for automated grading with LLM",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 origins = settings.cors_origins
@@ -40,16 +74,3 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.get("/")
 async def root():
     return {"message": "Welcome to Grading LLM API"}
-
-@app.on_event("startup")
-async def startup_event():
-    """
-    ทำงานเมื่อเริ่มต้นระบบ
-    """
-    logger.info("Starting up application...")
-    try:
-        # ตั้งค่าระบบ
-        setup_app()
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
-        # ไม่หยุดการทำงานของระบบ แต่บันทึกข้อผิดพลาด
\ No newline at end of file
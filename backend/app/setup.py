@@ -1,6 +1,6 @@
 from langsmith import expect
 from pymilvus import MilvusClient
-from app.infrastructure.rag.milvus_client import MilvusClient
+from app.infrastructure.rag.vector_store import create_vector_store
 from app.core.config import settings
 import os
 
@@ -13,9 +13,10 @@ def setup_app():
     # สร้างโฟลเดอร์สำหรับเก็บไฟล์อัปโหลด
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     
-    # ตั้งค่า Milvus
+    # ตั้งค่า vector store (Milvus หรือ NumPy ตาม VECTOR_STORE)
+    client = None
     try:
-        client = MilvusClient()
+        client = create_vector_store()
     except Exception as e:
-        print(f"Warning: Could not setup Milvus collection: {str(e)}")
-        return client
\ No newline at end of file
+        print(f"Warning: Could not setup {settings.VECTOR_STORE} vector store: {str(e)}")
+    return client
\ No newline at end of file
@@ -0,0 +1,149 @@
+# backend/app/utils/concurrency.py
+import asyncio
+import logging
+import time
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    จำกัดจำนวนงานที่ทำพร้อมกัน และปรับขนาด limit ตาม latency / error rate ของ backend
+
+    ใช้หลัก AIMD: ถ้า backend ตอบเร็วและไม่มี error จะเพิ่ม limit ทีละ 1
+    ถ้าช้ากว่า target_latency หรือ error rate สูงเกิน error_threshold จะลด limit ลงครึ่งหนึ่ง
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        target_latency: float = 30.0,
+        error_threshold: float = 0.2,
+        smoothing: float = 0.3,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.target_latency = target_latency
+        self.error_threshold = error_threshold
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self.avg_latency = None
+        self.error_rate = 0.0
+        self.completed = 0
+        self.failed = 0
+
+        # ปรับ limit ได้ครั้งเดียวต่อจำนวนงานที่เสร็จเท่ากับ limit ปัจจุบัน เพื่อไม่ให้แกว่ง
+        self._samples_since_adjust = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        """รอจนกว่าจะมีช่องว่างให้เริ่มงานใหม่"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, latency: float, success: bool):
+        """คืนช่อง พร้อมบันทึก latency และผลลัพธ์ของงานที่เพิ่งเสร็จ"""
+        async with self._condition:
+            self.in_flight -= 1
+            self._record(latency, success)
+            self._condition.notify_all()
+
+    def slot(self):
+        """Context manager สำหรับครอบงานหนึ่งงาน"""
+        return _LimiterSlot(self)
+
+    def _record(self, latency: float, success: bool):
+        if success:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+        alpha = self.smoothing
+        self.avg_latency = latency if self.avg_latency is None else (
+            alpha * latency + (1 - alpha) * self.avg_latency
+        )
+        self.error_rate = alpha * (0.0 if success else 1.0) + (1 - alpha) * self.error_rate
+
+        self._samples_since_adjust += 1
+        if self._samples_since_adjust < self.limit:
+            return
+        self._samples_since_adjust = 0
+
+        previous = self.limit
+        if self.error_rate > self.error_threshold or self.avg_latency > self.target_latency:
+            self.limit = max(self.min_limit, self.limit // 2)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+        if self.limit != previous:
+            logging.info(
+                f"Concurrency limit {previous} -> {self.limit} "
+                f"(avg latency {self.avg_latency:.2f}s, error rate {self.error_rate:.2f})"
+            )
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_latency": self.avg_latency,
+            "error_rate": self.error_rate,
+        }
+
+
+class _LimiterSlot:
+    def __init__(self, limiter: AdaptiveConcurrencyLimiter):
+        self.limiter = limiter
+        self.success = True
+        self._started = None
+
+    def mark_failed(self):
+        self.success = False
+
+    async def __aenter__(self):
+        await self.limiter.acquire()
+        self._started = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self._started
+        await self.limiter.release(latency, self.success and exc_type is None)
+        return False
+
+
+class SingleFlight:
+    """
+    รวม call ที่มี key เดียวกันและทำงานซ้อนกันอยู่ ให้ใช้ผลลัพธ์จากการทำงานครั้งเดียว
+
+    ผู้เรียกที่ยกเลิก (เช่น client ตัดการเชื่อมต่อ) จะไม่ยกเลิกงานที่ผู้เรียกคนอื่นรออยู่
+    เมื่องานเสร็จ key จะถูกลบ call ถัดไปจึงเริ่มงานใหม่
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """เรียก fn() (coroutine function) หรือรอผลของ call ที่มี key เดียวกันซึ่งกำลังทำงานอยู่"""
+        self.calls += 1
+        task = self._flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.coalesced += 1
+            logging.info(f"Coalesced duplicate in-flight request {key}")
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
@@ -1,22 +1,299 @@
 # backend/app/utils/pdf_processor.py
+import pypdf
 from pypdf import PdfReader
+from typing import List, NamedTuple, Optional, Tuple
+from app.core.config import settings
+import asyncio
+import gzip
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import uuid
 
-def extract_text_from_pdf(file_path):
+EXTRACTION_ERROR_TEXT = "Error extracting text from PDF"
+
+# เปลี่ยนค่านี้เมื่อวิธีแยกข้อความเปลี่ยน เพื่อไม่ให้ใช้ผลลัพธ์เก่าจาก cache
+PARSER_VERSION = f"pypdf-{pypdf.__version__}-1"
+
+class ExtractedText(NamedTuple):
+    text: str
+    # ตำแหน่งตัวอักษรเริ่มต้นของแต่ละหน้าใน text
+    page_offsets: List[int]
+
+def assemble_pages(pages: List[str]) -> ExtractedText:
+    """
+    Join page texts in linear time, keeping the offset where each page starts.
+    """
+    offsets = []
+    position = 0
+    for page_text in pages:
+        offsets.append(position)
+        position += len(page_text)
+    return ExtractedText("".join(pages), offsets)
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    เก็บข้อความที่แยกจาก PDF แล้วเป็นไฟล์ sidecar แบบ gzip โดยใช้ hash ของไฟล์และ PARSER_VERSION เป็น key
+    การอัปโหลดไฟล์เดิมซ้ำจึงไม่ต้อง parse PDF ใหม่
     """
-    Extract text content from a PDF file.
+    def __init__(self, directory: str = None, parser_version: str = PARSER_VERSION):
+        self.directory = directory or settings.EXTRACTION_CACHE_DIR
+        self.parser_version = parser_version
+    
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], f"{sha256}.{self.parser_version}.json.gz")
+    
+    def get(self, sha256: str) -> Optional[ExtractedText]:
+        path = self._path(sha256)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable extraction cache entry {path}: {e}")
+            return None
+        return ExtractedText(data["text"], data["page_offsets"])
+    
+    def set(self, sha256: str, extracted: ExtractedText):
+        path = self._path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"text": extracted.text, "page_offsets": extracted.page_offsets}, f)
+        os.replace(tmp_path, path)
+
+def _init_extraction_worker(memory_limit_mb: int):
+    """
+    จำกัดหน่วยความจำของ worker process เพื่อไม่ให้ PDF ที่เสียหายกินหน่วยความจำทั้งเครื่อง
     """
     try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logging.warning(f"Could not set PDF worker memory limit: {e}")
+
+def _extract_page_range(file_path: str, start: int, end: int) -> Tuple[int, List[str]]:
+    """
+    Extract text of pages [start, end) in a worker process.
+    Returns the total page count with the page texts.
+    """
+    reader = PdfReader(file_path)
+    page_count = len(reader.pages)
+    return page_count, [
+        reader.pages[i].extract_text() or ""
+        for i in range(start, min(end, page_count))
+    ]
+
+def _extraction_worker_main(conn, memory_limit_mb: int):
+    """
+    วนรับงาน (file_path, start, end) ทาง pipe แล้วส่ง ("ok", ผลลัพธ์) หรือ ("error", exception) กลับ จนได้ None
+    """
+    _init_extraction_worker(memory_limit_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            reply = ("ok", _extract_page_range(*job))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # exception บางชนิด pickle ไม่ได้
+            conn.send(("error", RuntimeError(str(e) if reply[0] == "ok" else str(reply[1]))))
+
+class _ExtractionWorker:
+    """worker process หนึ่งตัวกับ pipe ของมัน ใช้ทำทีละหนึ่งงาน"""
+    def __init__(self, memory_limit_mb: int):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_extraction_worker_main, args=(child_conn, memory_limit_mb), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+    
+    def call(self, job: Tuple[str, int, int]):
+        """ส่งงานแล้วรอผล (blocking) คืน EOFError ถ้า worker ตายระหว่างทำ"""
+        try:
+            self.conn.send(job)
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.conn.close()
+            raise EOFError(f"PDF extraction worker {self.process.pid} exited")
+    
+    def kill(self):
+        # recv ที่ค้างอยู่ใน thread จะได้ EOF และปิด pipe เองเมื่อ process ตาย
+        self.process.terminate()
+        self.process.join(timeout=5)
+    
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (EOFError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+class PdfExtractionPool:
+    """
+    แยกข้อความจาก PDF ใน worker process เพื่อไม่ให้บล็อก event loop
+
+    เอกสารยาวจะถูกแบ่งเป็นช่วงหน้าละ pages_per_job หน้าให้หลาย worker ทำพร้อมกัน แล้วต่อกลับตามลำดับ
+    timeout นับแยกต่อช่วงหน้า งานที่เกิน timeout หรือ worker ที่ตายจาก memory limit
+    จะปิดทิ้งเฉพาะ worker ตัวนั้น งานของเอกสารอื่นที่ทำพร้อมกันไม่ได้รับผลกระทบ
+    """
+    def __init__(
+        self,
+        max_workers: int = None,
+        pages_per_job: int = None,
+        timeout: float = None,
+        memory_limit_mb: int = None
+    ):
+        self.max_workers = max_workers or settings.PDF_WORKERS
+        self.pages_per_job = pages_per_job or settings.PDF_PAGES_PER_JOB
+        self.timeout = timeout or settings.PDF_EXTRACTION_TIMEOUT_SECONDS
+        self.memory_limit_mb = memory_limit_mb or settings.PDF_WORKER_MEMORY_LIMIT_MB
+        self.cache = ExtractionCache() if settings.EXTRACTION_CACHE_ENABLED else None
+        self.workers_replaced = 0
+        self._idle: List[_ExtractionWorker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop = None
+    
+    def _get_slots(self) -> asyncio.Semaphore:
+        # semaphore ผูกกับ event loop จึงสร้างใหม่เมื่อถูกเรียกจาก loop อื่น
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+    
+    async def _run_job(self, file_path: str, start: int, end: int) -> Tuple[int, List[str]]:
+        """
+        Run one page-range job on an idle worker with its own timeout.
+        """
+        async with self._get_slots():
+            worker = self._idle.pop() if self._idle else None
+            if worker is None or not worker.process.is_alive():
+                worker = await asyncio.to_thread(_ExtractionWorker, self.memory_limit_mb)
+            try:
+                status, payload = await asyncio.wait_for(
+                    asyncio.to_thread(worker.call, (file_path, start, end)), timeout=self.timeout
+                )
+            except BaseException:
+                # worker ค้าง ตาย หรือถูกยกเลิกกลางงาน: ปิดทิ้งเฉพาะตัวนี้ งานถัดไปจะสร้างตัวใหม่
+                self.workers_replaced += 1
+                await asyncio.to_thread(worker.kill)
+                raise
+            self._idle.append(worker)
+        if status == "error":
+            raise payload
+        return payload
+    
+    async def extract_pages(self, file_path: str) -> List[str]:
+        """
+        Extract the text of every page, in page order.
+        """
+        # งานแรกทำหน้าแรกๆ และบอกจำนวนหน้าทั้งหมด งานที่เหลือแบ่งตามช่วงหน้า
+        page_count, first_pages = await self._run_job(file_path, 0, self.pages_per_job)
+        ranges = range(self.pages_per_job, page_count, self.pages_per_job)
+        rest = await asyncio.gather(*[
+            self._run_job(file_path, start, start + self.pages_per_job)
+            for start in ranges
+        ])
+        pages = list(first_pages)
+        for _, range_pages in rest:
+            pages.extend(range_pages)
+        return pages
+    
+    async def extract_document(self, file_path: str, sha256: Optional[str] = None) -> ExtractedText:
+        """
+        Extract text and page offsets, served from the sidecar cache when the
+        same file content was extracted before.
+        """
+        if self.cache:
+            if sha256 is None:
+                sha256 = await asyncio.to_thread(file_sha256, file_path)
+            cached = await asyncio.to_thread(self.cache.get, sha256)
+            if cached is not None:
+                logging.info(f"Using cached extracted text for {file_path}")
+                return cached
+        
         logging.info(f"Extracting text from PDF: {file_path}")
-        text = ""
-        reader = PdfReader(file_path)
+        extracted = assemble_pages(await self.extract_pages(file_path))
         
-        for page in reader.pages:
-            page_text = page.extract_text() or ""
-            text += page_text
-            
-        return text
-    except Exception as e:
-        logging.error(f"Error extracting text from PDF: {str(e)}")
+        if self.cache:
+            try:
+                await asyncio.to_thread(self.cache.set, sha256, extracted)
+            except Exception as e:
+                logging.warning(f"Could not write extraction cache for {file_path}: {e}")
+        return extracted
+    
+    async def extract(self, file_path: str, sha256: Optional[str] = None) -> ExtractedText:
+        """
+        Extract text and page offsets without blocking the event loop,
+        returning the error text with no offsets if extraction fails.
+        """
+        try:
+            return await self.extract_document(file_path, sha256)
+        except asyncio.TimeoutError:
+            logging.error(f"Timed out extracting a page range of PDF after {self.timeout}s: {file_path}")
+        except Exception as e:
+            logging.error(f"Error extracting text from PDF: {str(e)}")
         # ส่งคืนข้อความว่างแทนที่จะทำให้เกิดข้อผิดพลาด
-        return "Error extracting text from PDF"
\ No newline at end of file
+        return ExtractedText(EXTRACTION_ERROR_TEXT, [])
+    
+    async def extract_text(self, file_path: str, sha256: Optional[str] = None) -> str:
+        """
+        Extract text content from a PDF file without blocking the event loop.
+        """
+        return (await self.extract(file_path, sha256)).text
+    
+    def shutdown(self):
+        workers, self._idle = self._idle, []
+        for worker in workers:
+            worker.stop()
+
+_pool: Optional[PdfExtractionPool] = None
+
+def get_pdf_extraction_pool() -> PdfExtractionPool:
+    global _pool
+    if _pool is None:
+        _pool = PdfExtractionPool()
+    return _pool
+
+async def extract_text_from_pdf_async(file_path, sha256: Optional[str] = None):
+    """
+    Extract text content from a PDF file in the shared process pool.
+    Pass the file's SHA-256 when known to skip re-hashing it for the cache lookup.
+    """
+    return await get_pdf_extraction_pool().extract_text(file_path, sha256)
+
+async def extract_document_from_pdf_async(file_path, sha256: Optional[str] = None) -> ExtractedText:
+    """
+    Like extract_text_from_pdf_async, but also returns where each page starts in the text.
+    """
+    return await get_pdf_extraction_pool().extract(file_path, sha256)
+
+def shutdown_pdf_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -0,0 +1,13 @@
+# backend/app/utils/tokens.py
+
+# ประมาณ 4 ตัวอักษรต่อ 1 token สำหรับข้อความภาษาอังกฤษ ใช้สำหรับจัดงบ token คร่าวๆ เท่านั้น
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    ประมาณจำนวน token ของข้อความโดยไม่ต้องโหลด tokenizer
+    """
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
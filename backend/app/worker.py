@@ -0,0 +1,187 @@
+# backend/app/worker.py
+"""
+Worker process สำหรับงาน batch grading
+
+รันแยกจาก web server:
+    python -m app.worker --workers 2
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.infrastructure.llm.endpoint_router import get_endpoint_router
+from app.infrastructure.queue.job_queue import JobQueue, BATCH_GRADING_JOB
+
+
+async def _run_job(queue: JobQueue, job, worker_id: str, container: ServiceContainer):
+    """ทำงาน batch grading หนึ่งงาน พร้อมต่ออายุ lease ระหว่างทำ"""
+    from app.domain.services.batch_grading_service import BatchGradingService
+    from app.domain.services.grading_service import GradingService
+    from app.infrastructure.database.database import Database
+
+    batch_id = job["payload"]["batch_id"]
+
+    async def keep_lease():
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            queue.extend_lease(job["id"], worker_id)
+            queue.worker_heartbeat(worker_id)
+
+    # ไม่สร้าง service ใหม่ต่องาน ถ้า container สร้างไม่สำเร็จให้งานล้มเหลวและถูกลองใหม่ตาม JOB_MAX_ATTEMPTS
+    if container.grading_chain is None or container.embedding_service is None:
+        raise RuntimeError("Grading services unavailable in this worker")
+
+    lease_task = asyncio.create_task(keep_lease())
+    try:
+        db = Database()
+        grading_service = GradingService(
+            db,
+            grading_chain=container.grading_chain,
+            embedding_service=container.embedding_service,
+            milvus_client=container.milvus_client,
+            rag_service=container.rag_service
+        )
+        service = BatchGradingService(db, grading_service=grading_service)
+        await service.process_batch(
+            batch_id=batch_id,
+            student_file_ids=job["payload"]["student_file_ids"],
+            skip_student_file_ids=queue.completed_items(batch_id),
+            # เฉพาะคนที่ตรวจสำเร็จ คนที่ error ต้องถูกตรวจใหม่เมื่องานถูก lease ซ้ำ
+            checkpoint=lambda items: queue.record_checkpoints(
+                batch_id, [(item_id, status) for item_id, status in items if status == "completed"]
+            ),
+            progress=lambda event, data: queue.publish_event(batch_id, event, data)
+        )
+    finally:
+        lease_task.cancel()
+
+
+def _mark_batch_failed(batch_id: str):
+    from app.infrastructure.database.database import Database
+
+    # batch_grading has no error column, the error is kept in the job queue and the "failed" event
+    try:
+        Database().table("batch_grading")\
+            .update({"status": "failed"})\
+            .eq("id", batch_id)\
+            .execute()
+    except Exception as e:
+        logging.error(f"Could not mark batch {batch_id} as failed: {str(e)}")
+
+
+def _setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+
+async def _worker_loop(queue: JobQueue, worker_id: str):
+    """วนดึงงานจากคิวไปทำจนกว่าจะได้รับ SIGTERM"""
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    loop.add_signal_handler(signal.SIGINT, stopping.set)
+
+    # service ถูกสร้างครั้งเดียวต่อ worker process และใช้ซ้ำทุกงาน
+    container = ServiceContainer()
+    await container.startup()
+    last_prune = 0.0
+    try:
+        while not stopping.is_set():
+            job = queue.claim(worker_id)
+            if job is None:
+                queue.worker_heartbeat(worker_id)
+                # ลบ event ของ batch ที่จบไปนานแล้วระหว่างที่ว่าง
+                if time.monotonic() - last_prune >= 60:
+                    last_prune = time.monotonic()
+                    queue.prune_events()
+                try:
+                    await asyncio.wait_for(stopping.wait(), timeout=settings.JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logging.info(f"Worker {worker_id} picked up job {job['id']} (attempt {job['attempts']})")
+            # endpoint ที่ถูกเพิ่ม/drain ผ่าน API ระหว่างที่ worker ทำงาน
+            get_endpoint_router().apply(queue.llm_endpoints())
+            queue.worker_heartbeat(worker_id, busy=True)
+            try:
+                if job["kind"] != BATCH_GRADING_JOB:
+                    raise ValueError(f"Unknown job kind: {job['kind']}")
+                await _run_job(queue, job, worker_id, container)
+                queue.complete(job["id"])
+            except Exception as e:
+                logging.error(f"Job {job['id']} failed: {str(e)}")
+                if queue.fail(job["id"], str(e)):
+                    batch_id = job["payload"].get("batch_id")
+                    _mark_batch_failed(batch_id)
+                    queue.publish_event(batch_id, "failed", {"error": str(e)})
+            finally:
+                queue.worker_heartbeat(worker_id, busy=False)
+    finally:
+        await container.shutdown()
+
+
+def run_worker(worker_id: str):
+    """จุดเริ่มของ worker process แต่ละตัว"""
+    _setup_logging()
+    queue = JobQueue()
+    queue.register_worker(worker_id, os.getpid())
+    logging.info(f"Worker {worker_id} started (pid {os.getpid()})")
+
+    try:
+        asyncio.run(_worker_loop(queue, worker_id))
+    finally:
+        queue.unregister_worker(worker_id)
+        logging.info(f"Worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch grading worker")
+    parser.add_argument("--workers", type=int, default=settings.BATCH_WORKERS)
+    args = parser.parse_args()
+
+    _setup_logging()
+
+    # สร้างตารางของคิวก่อนเริ่ม worker
+    JobQueue()
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # เริ่ม worker ใหม่แทนตัวที่ตายไป จนกว่าจะได้รับสัญญาณให้หยุด
+    while not stopping:
+        for slot in range(args.workers):
+            process = processes.get(slot)
+            if process is None or not process.is_alive():
+                worker_id = f"{os.uname().nodename}-{slot}-{uuid.uuid4().hex[:8]}"
+                process = ctx.Process(target=run_worker, args=(worker_id,), daemon=False)
+                process.start()
+                processes[slot] = process
+        time.sleep(1)
+
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+วัด recall / latency ของ ANN index ใน Milvus เทียบกับการค้นหาแบบ exact
+
+ตัวอย่าง (รันจากโฟลเดอร์ backend และต้องมี Milvus ทำงานอยู่):
+
+    python -m benchmarks.milvus_ann --vectors 20000 --index-type HNSW --sweep 16,32,64,128
+    python -m benchmarks.milvus_ann --index-type IVF_FLAT --index-params '{"nlist": 256}' --sweep 4,8,16,32
+    python -m benchmarks.milvus_ann --from-embedding-cache
+
+ข้อมูลเป็น vector สังเคราะห์แบบกลุ่ม (ใกล้เคียง chunk ของงานเดียวกัน) หรือ vector จริงจาก embedding cache
+ผลถูกเขียนลง collection ชั่วคราว ซึ่งจะถูกลบเมื่อจบ (ยกเว้นใช้ --keep)
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from pymilvus import connections, utility
+
+from app.core.config import settings
+from app.infrastructure.rag.milvus_client import MilvusClient
+
+SEARCH_PARAM = {"HNSW": "ef", "IVF_FLAT": "nprobe", "IVF_SQ8": "nprobe", "IVF_PQ": "nprobe"}
+
+
+def synthetic_vectors(count: int, dim: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size=count)]
+    vectors += 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors
+
+
+def cached_vectors(limit: int) -> np.ndarray:
+    from app.infrastructure.rag.embedding_cache import get_embedding_cache
+    cache = get_embedding_cache()
+    entries = min(cache.stats()["entries"], limit)
+    if entries == 0:
+        raise SystemExit("Embedding cache is empty")
+    # slot ถูกใช้ต่อเนื่องจาก 0 จึงอ่านช่วงแรกได้ทันที
+    return np.array(cache.vectors[:entries])
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--index-type", default=settings.MILVUS_INDEX_TYPE)
+    parser.add_argument("--index-params", type=json.loads, default=None,
+                        help="JSON, default MILVUS_INDEX_PARAMS when the index type matches")
+    parser.add_argument("--sweep", default="16,32,64,128", help="values of ef (HNSW) or nprobe (IVF)")
+    parser.add_argument("--from-embedding-cache", action="store_true")
+    parser.add_argument("--collection", default=f"{settings.MILVUS_COLLECTION}_bench")
+    parser.add_argument("--keep", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.from_embedding_cache:
+        data = cached_vectors(args.vectors)
+    else:
+        data = synthetic_vectors(args.vectors, settings.EMBEDDING_DIMENSION, args.clusters, rng)
+    data = normalize(data)
+    queries = normalize(data[rng.integers(0, len(data), size=args.queries)]
+                        + 0.1 * rng.normal(size=(args.queries, data.shape[1])).astype(np.float32))
+
+    # ground truth จากการค้นหาแบบ exact (cosine = dot product ของ vector ที่ normalize แล้ว)
+    started = time.perf_counter()
+    exact = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+    exact_ms = (time.perf_counter() - started) / args.queries * 1000
+
+    index_params = args.index_params
+    if index_params is None:
+        index_params = settings.MILVUS_INDEX_PARAMS if args.index_type == settings.MILVUS_INDEX_TYPE else {}
+
+    # เริ่มจาก collection ว่างทุกครั้ง
+    connections.connect(alias="default", host=settings.MILVUS_HOST, port=settings.MILVUS_PORT)
+    if utility.has_collection(args.collection):
+        utility.drop_collection(args.collection)
+    client = MilvusClient(collection_name=args.collection, index_type=args.index_type, index_params=index_params)
+
+    try:
+        started = time.perf_counter()
+        for start in range(0, len(data), 1000):
+            batch = data[start:start + 1000]
+            client.insert(
+                [str(i) for i in range(start, start + len(batch))],
+                batch.tolist(),
+                [
+                    {"assignment_id": "bench", "document_id": "bench", "file_type": "teacher", "chunk_index": i}
+                    for i in range(start, start + len(batch))
+                ],
+                ids=[str(i) for i in range(start, start + len(batch))]
+            )
+        client.collection.flush()
+        utility.wait_for_index_building_complete(args.collection)
+        client.collection.load()
+        print(f"Inserted and indexed {len(data)} vectors ({data.shape[1]}d) in {time.perf_counter() - started:.1f}s")
+        print(f"Index {args.index_type} {index_params}, exact numpy search {exact_ms:.2f} ms/query\n")
+
+        param = SEARCH_PARAM.get(args.index_type)
+        sweep = [int(value) for value in args.sweep.split(",")] if param else [None]
+        print(f"{param or 'params':>8} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8} {'batch ms/q':>11}")
+        for value in sweep:
+            client.search_params = {param: max(value, args.k) if param == "ef" else value} if param else {}
+            latencies, hits = [], 0
+            for query, truth in zip(queries, exact):
+                started = time.perf_counter()
+                results = client.search(query.tolist(), limit=args.k, assignment_id="bench")
+                latencies.append(time.perf_counter() - started)
+                found = {int(hit["id"]) for hit in results}
+                hits += len(found & set(truth.tolist()))
+            recall = hits / (args.k * len(queries))
+
+            # ทุก query ใน search request เดียว
+            started = time.perf_counter()
+            client.search_many(queries.tolist(), limit=args.k, assignment_id="bench")
+            batch_ms = (time.perf_counter() - started) / len(queries) * 1000
+            print(f"{str(value):>8} {recall:>10.3f} {percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} {batch_ms:>11.3f}")
+    finally:
+        if not args.keep:
+            client.collection.release()
+            utility.drop_collection(args.collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import pytest
+
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dirs(tmp_path, monkeypatch):
+    """
+    ให้ cache, vector store และ job queue ที่สร้างจากค่า default เขียนลง tmp_path แทน data/ ใน repo
+    """
+    monkeypatch.setattr(settings, "GRADING_CACHE_PATH", str(tmp_path / "grading_cache.sqlite3"))
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_DIR", str(tmp_path / "embedding_cache"))
+    monkeypatch.setattr(settings, "NUMPY_STORE_DIR", str(tmp_path / "vector_store"))
+    monkeypatch.setattr(settings, "EXTRACTION_CACHE_DIR", str(tmp_path / "extracted_text"))
+    monkeypatch.setattr(settings, "JOB_QUEUE_PATH", str(tmp_path / "jobs.sqlite3"))
@@ -0,0 +1,92 @@
+import asyncio
+import io
+import zipfile
+
+from fastapi import UploadFile
+
+from app.core.config import settings
+from app.domain.services import bulk_upload_service
+from app.domain.services.bulk_upload_service import BulkUploadService
+from app.utils.pdf_processor import ExtractedText
+
+
+class FakeDB:
+    """บันทึกทุกครั้งที่ insert ลงตาราง files"""
+    def __init__(self):
+        self.inserts = []
+
+    def table(self, name):
+        return self
+
+    def insert(self, rows):
+        self.inserts.append(rows)
+        return self
+
+    def execute(self):
+        rows = self.inserts[-1]
+        return type("Result", (), {"data": [{**row, "id": f"id-{i}"} for i, row in enumerate(rows)]})()
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_zip_upload_stores_pdfs_with_one_bulk_insert(tmp_path, monkeypatch):
+    """
+    ทดสอบว่า PDF ใน ZIP และ PDF ที่ส่งแยกถูกเก็บทั้งหมดด้วย insert ครั้งเดียว
+    ไฟล์ที่ไม่ใช่ PDF (ทั้งใน ZIP และที่ส่งแยก) ถูกข้ามพร้อมเหตุผลใน manifest
+    """
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+
+    async def fake_extract(file_path, sha256=None):
+        return ExtractedText(f"text of {sha256[:8]}", [0])
+
+    monkeypatch.setattr(bulk_upload_service, "extract_document_from_pdf_async", fake_extract)
+
+    archive = _zip({
+        "class/s1_quiz.pdf": b"%PDF-1 first",
+        "class/s2_quiz.pdf": b"%PDF-1 second",
+        "class/notes.txt": b"not a pdf",
+        "__MACOSX/class/._s1_quiz.pdf": b"resource fork",
+    })
+    uploads = [
+        UploadFile(file=archive, filename="class.zip"),
+        UploadFile(file=io.BytesIO(b"%PDF-1 third"), filename="s3_quiz.pdf"),
+        UploadFile(file=io.BytesIO(b"MZ"), filename="run.exe"),
+    ]
+    db = FakeDB()
+
+    manifest = asyncio.run(BulkUploadService(db).upload(uploads, "student", "a1"))
+
+    assert len(db.inserts) == 1
+    assert [row["file_name"] for row in db.inserts[0]] == ["s1_quiz.pdf", "s2_quiz.pdf", "s3_quiz.pdf"]
+    assert [row["student_id"] for row in db.inserts[0]] == ["s1", "s2", "s3"]
+
+    by_name = {entry["file_name"]: entry for entry in manifest}
+    assert set(by_name) == {"s1_quiz.pdf", "s2_quiz.pdf", "notes.txt", "s3_quiz.pdf", "run.exe"}
+    assert by_name["notes.txt"]["status"] == "skipped"
+    assert by_name["run.exe"]["status"] == "skipped"
+    stored = [entry for entry in manifest if entry["status"] == "stored"]
+    assert len(stored) == 3
+    assert all(entry["id"] and entry["page_offsets"] == [0] for entry in stored)
+    assert db.inserts[0][0]["text_content"] == f"text of {by_name['s1_quiz.pdf']['sha256'][:8]}"
+
+
+def test_invalid_zip_is_reported_without_insert(tmp_path, monkeypatch):
+    """
+    ทดสอบว่า ZIP ที่เสียถูกรายงานเป็น error และไม่มีการ insert เมื่อไม่มีไฟล์ที่เก็บได้
+    """
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    db = FakeDB()
+
+    manifest = asyncio.run(BulkUploadService(db).upload(
+        [UploadFile(file=io.BytesIO(b"not a zip"), filename="broken.zip")], "student", "a1"
+    ))
+
+    assert manifest[0]["status"] == "error" and "Invalid ZIP" in manifest[0]["error"]
+    assert db.inserts == []
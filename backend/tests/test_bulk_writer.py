@@ -0,0 +1,47 @@
+import asyncio
+
+from app.infrastructure.database.bulk_writer import BufferedTableWriter
+
+
+class FakeTable:
+    def __init__(self, db):
+        self.db = db
+        self.rows = None
+
+    def insert(self, rows):
+        self.rows = rows
+        return self
+
+    def execute(self):
+        if self.db.failures:
+            self.db.failures -= 1
+            raise ConnectionError("PostgREST unavailable")
+        self.db.inserts.append(self.rows)
+
+
+class FakeDB:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.inserts = []
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+def test_failed_flush_does_not_raise_from_add_and_is_retried_once():
+    """
+    ทดสอบว่า insert ที่ล้มเหลวไม่ถูก raise ให้ผู้เรียก add() (ซึ่งจะถูกนับเป็น error ของนักเรียนคนนั้น)
+    แถวถูกเขียนครั้งเดียวเมื่อลองใหม่ และ callback ได้แถวครบ
+    """
+    db = FakeDB(failures=1)
+    flushed = []
+    writer = BufferedTableWriter(db, "batch_results", max_rows=2, flush_interval=60, on_flush=flushed.extend)
+
+    async def scenario():
+        await writer.add({"student_file_id": "s1", "status": "completed"})
+        await writer.add({"student_file_id": "s2", "status": "completed"})
+        await writer.close()
+
+    asyncio.run(scenario())
+    assert [row["student_file_id"] for batch in db.inserts for row in batch] == ["s1", "s2"]
+    assert [row["student_file_id"] for row in flushed] == ["s1", "s2"]
@@ -0,0 +1,63 @@
+import asyncio
+
+from app.utils.concurrency import AdaptiveConcurrencyLimiter, SingleFlight
+
+
+def test_limiter_bounds_in_flight_tasks():
+    """
+    ทดสอบว่าจำนวนงานที่ทำพร้อมกันไม่เกิน limit
+    """
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=3, min_limit=1, max_limit=3)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(*[job() for _ in range(12)])
+
+    asyncio.run(run())
+    assert peak == 3
+    assert limiter.in_flight == 0
+    assert limiter.completed == 12
+
+
+def test_limiter_backs_off_on_errors_and_recovers():
+    """
+    ทดสอบว่า limit ลดลงเมื่อ backend error และเพิ่มขึ้นอีกครั้งเมื่อกลับมาปกติ
+    """
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=1, max_limit=8, target_latency=1.0)
+    for _ in range(8):
+        limiter._record(0.1, success=False)
+    assert limiter.limit == 4
+
+    for _ in range(200):
+        limiter._record(0.1, success=True)
+    assert limiter.limit == 8
+
+
+def test_single_flight_shares_one_call_between_concurrent_duplicates():
+    """
+    ทดสอบว่า request ที่มี key เดียวกันและเข้ามาพร้อมกันใช้ผลจากการเรียกครั้งเดียว
+    """
+    flights = SingleFlight()
+    calls = []
+
+    async def grade():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"score": 80}
+
+    async def scenario():
+        results = await asyncio.gather(*[flights.do("a1:s1:hash", grade) for _ in range(3)])
+        await flights.do("a1:s1:hash", grade)
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results == [{"score": 80}] * 3
+    assert len(calls) == 2
+    assert flights.stats() == {"in_flight": 0, "calls": 4, "coalesced": 2}
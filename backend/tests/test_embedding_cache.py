@@ -0,0 +1,35 @@
+import pytest
+
+from app.infrastructure.rag.embedding_cache import EmbeddingCache
+
+
+def test_slot_reused_by_another_process_reads_as_miss(tmp_path):
+    """
+    ทดสอบว่าเมื่อ process อื่น evict slot แล้วเขียน key ใหม่ลงไประหว่าง lookup กับการอ่าน vector
+    ผู้อ่านได้ None แทน vector ของข้อความอื่น
+    """
+    reader = EmbeddingCache(directory=str(tmp_path), model="m", dimension=2, max_entries=1)
+    writer = EmbeddingCache(directory=str(tmp_path), model="m", dimension=2, max_entries=1)
+
+    reader.put_many(["a"], [[1.0, 0.0]])
+    assert reader.get_many(["a"])[0].tolist() == [1.0, 0.0]
+
+    # จำลองว่า lookup ได้ slot ของ "a" ไปแล้ว แล้วอีก process เขียน "b" ทับ slot เดียวกัน
+    key = reader.key("a")
+    writer.put_many(["b"], [[0.0, 1.0]])
+    assert reader._read(0, key) is None
+    assert reader.get_many(["a", "b"])[0] is None
+    assert reader.get_many(["b"])[0].tolist() == [0.0, 1.0]
+
+
+def test_size_mismatch_refuses_to_open(tmp_path):
+    """
+    ทดสอบว่าเปิด cache ด้วย capacity ที่ไม่ตรงกับไฟล์เดิมแล้ว error โดยไม่ truncate ไฟล์ที่ process อื่นอาจ map อยู่
+    """
+    cache = EmbeddingCache(directory=str(tmp_path), model="m", dimension=2, max_entries=4)
+    cache.put_many(["a"], [[1.0, 2.0]])
+
+    with pytest.raises(RuntimeError):
+        EmbeddingCache(directory=str(tmp_path), model="m", dimension=2, max_entries=8)
+
+    assert cache.get_many(["a"])[0].tolist() == [1.0, 2.0]
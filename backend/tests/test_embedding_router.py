@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.rag.embedding_router import EmbeddingRouter, EmbeddingUnavailableError
+
+
+class FailingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_embeddings(self, texts):
+        self.calls += 1
+        raise ConnectionError("LMStudio down")
+
+
+def test_open_circuit_fails_fast_instead_of_switching_models():
+    """
+    ทดสอบว่าเมื่อ LMStudio ล้มเหลวติดกัน router ไม่ส่งงานไป model อื่น แต่ fail fast โดยไม่เรียก backend ซ้ำ
+    """
+    backend = FailingEmbeddings()
+    router = EmbeddingRouter(primary_factory=lambda: backend)
+    router.breaker.failure_threshold = 2
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await router.get_embeddings(["text"])
+        with pytest.raises(EmbeddingUnavailableError):
+            await router.get_embeddings(["text"])
+
+    asyncio.run(scenario())
+    assert backend.calls == 2
+    assert router.status()["backend"] == "unavailable"
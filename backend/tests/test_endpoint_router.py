@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.llm.endpoint_router import EndpointRouter
+from app.infrastructure.queue.job_queue import JobQueue
+
+
+def test_least_outstanding_selection_health_and_drain():
+    """
+    ทดสอบว่าเลือก endpoint ที่มีงานค้างน้อยที่สุด ข้าม endpoint ที่ error ติดกัน และลบ endpoint ที่ drain เมื่องานหมด
+    """
+    router = EndpointRouter(urls=["http://a/v1", "http://b/v1"], failure_threshold=2, cooldown=60)
+
+    async def scenario():
+        async with router.lease() as first:
+            async with router.lease() as second:
+                assert first.url != second.url
+
+        # b ล้มเหลวติดกันสองครั้งจึงถูกพักไว้
+        b = next(e for e in router._endpoints.values() if e.url == "http://b/v1")
+        for _ in range(2):
+            b.outstanding += 1
+            router._release(b, 0.1, RuntimeError("down"))
+        for _ in range(3):
+            async with router.lease() as endpoint:
+                assert endpoint.url == "http://a/v1"
+
+        async with router.lease() as endpoint:
+            router.drain(endpoint.url)
+            assert endpoint.url in [e["url"] for e in router.stats()]
+        assert [e["url"] for e in router.stats()] == ["http://b/v1"]
+
+        with pytest.raises(RuntimeError):
+            async with router.lease():
+                raise RuntimeError("call failed")
+
+    asyncio.run(scenario())
+
+
+def test_lease_released_on_cancellation():
+    """
+    ทดสอบว่า task ที่ถูก cancel ระหว่างถือ lease คืน outstanding และไม่นับเป็น error
+    """
+    router = EndpointRouter(urls=["http://a/v1"], failure_threshold=1, cooldown=60)
+    endpoint = next(iter(router._endpoints.values()))
+
+    async def hold():
+        async with router.lease():
+            await asyncio.sleep(10)
+
+    async def scenario():
+        task = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert endpoint.outstanding == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert endpoint.outstanding == 0
+    assert endpoint.failures == 0
+    assert endpoint.avg_latency is None
+
+
+def test_runtime_changes_reach_routers_in_other_processes(tmp_path):
+    """
+    ทดสอบว่า endpoint ที่เพิ่ม/drain ผ่าน API ถูกบันทึกในคิวงาน และ router ของ worker ใช้ตามได้ (เรียกซ้ำได้)
+    """
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"))
+    queue.set_llm_endpoint("http://b/v1/", draining=False)
+    queue.set_llm_endpoint("http://a/v1", draining=True)
+
+    worker_router = EndpointRouter(urls=["http://a/v1"])
+    for _ in range(2):
+        worker_router.apply(queue.llm_endpoints())
+    assert [e["url"] for e in worker_router.stats()] == ["http://b/v1"]
+
+    queue.set_llm_endpoint("http://a/v1", draining=False)
+    worker_router.apply(queue.llm_endpoints())
+    assert sorted(e["url"] for e in worker_router.stats()) == ["http://a/v1", "http://b/v1"]
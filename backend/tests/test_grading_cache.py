@@ -0,0 +1,68 @@
+import asyncio
+
+from app.api.v1.endpoints.grading import get_grading_cache_stats, invalidate_grading_cache
+from app.core.container import ServiceContainer
+from app.infrastructure.llm.chains import GradingChain
+from app.infrastructure.llm.grading_cache import GradingCache, grading_fingerprint
+
+
+def test_cache_survives_restart_and_counts_hits(tmp_path):
+    """
+    ทดสอบว่าผลการตรวจถูกเก็บบนดิสก์ และนับ hit / miss ได้ถูกต้อง
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    cache = GradingCache(path=path, max_entries=2, fingerprint="v1")
+    key = cache.key("teacher", "student")
+
+    assert cache.get(key) is None
+    cache.set(key, {"score": 90, "feedback": "good"})
+    assert cache.get(key)["score"] == 90
+
+    restarted = GradingCache(path=path, max_entries=2, fingerprint="v1")
+    assert restarted.get(key)["score"] == 90
+    assert restarted.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_is_invalidated_when_template_or_model_changes(tmp_path):
+    """
+    ทดสอบว่า cache บนดิสก์ถูกล้างเมื่อ prompt template หรือ model เปลี่ยน
+    """
+    path = str(tmp_path / "cache.sqlite3")
+    cache = GradingCache(path=path, fingerprint=grading_fingerprint("template", "model-a"))
+    cache.set(cache.key("t", "s"), {"score": 50})
+
+    changed = GradingCache(path=path, fingerprint=grading_fingerprint("template", "model-b"))
+    assert changed.stats()["disk_entries"] == 0
+    assert changed.get(changed.key("t", "s")) is None
+
+
+class FakeLocalModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def agrade(self, teacher_text, student_text):
+        self.calls += 1
+        return '{"score": 75, "feedback": "ok", "strengths": [], "areas_for_improvement": [], "missed_concepts": []}'
+
+
+def test_cache_routes_use_the_cache_grading_reads(tmp_path):
+    """
+    ทดสอบว่า route สถิติและล้าง cache ใช้ cache ตัวเดียวกับที่ GradingChain ของ container ใช้ตรวจ
+    """
+    container = ServiceContainer()
+    container.grading_cache = GradingCache(path=str(tmp_path / "cache.sqlite3"))
+    model = FakeLocalModel()
+    container.grading_chain = GradingChain(cache=container.grading_cache, local_model=model)
+
+    async def scenario():
+        await container.grading_chain.grade_submission("teacher", "student")
+        await container.grading_chain.grade_submission("teacher", "student")
+        stats = await get_grading_cache_stats(container)
+        await invalidate_grading_cache(container)
+        await container.grading_chain.grade_submission("teacher", "student")
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert model.calls == 2
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.infrastructure.llm.endpoint_router import get_endpoint_router
+from app.infrastructure.llm.http_pool import HTTPConnectionPool, _AsyncCountingTransport, close_http_pool, get_http_pool
+
+
+def test_in_flight_is_released_on_transport_errors():
+    """
+    ทดสอบว่า request ที่ล้มเหลวก่อนได้ response (connect error / timeout) ไม่ทำให้ in_flight ค้าง
+    """
+    pool = HTTPConnectionPool()
+
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return httpx.Response(503)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=_AsyncCountingTransport(httpx.MockTransport(handler), pool)) as client:
+            with pytest.raises(httpx.ConnectTimeout):
+                await client.get("http://lmstudio/down")
+            await client.get("http://lmstudio/busy")
+        await pool.aclose()
+
+    asyncio.run(scenario())
+    stats = pool.stats()
+    assert stats["in_flight"] == 0
+    assert stats["requests"] == 2
+    assert stats["transport_errors"] == 1
+    assert stats["server_errors"] == 1
+
+
+def test_closing_the_pool_drops_routers_bound_to_it():
+    """
+    ทดสอบว่าหลังปิด pool router ตัวใหม่ถูกสร้าง จึงไม่ใช้ client ที่ปิดไปแล้ว
+    """
+    router = get_endpoint_router()
+    get_http_pool()
+    asyncio.run(close_http_pool())
+    assert get_endpoint_router() is not router
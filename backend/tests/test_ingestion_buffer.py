@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.rag.ingestion_buffer import VectorIngestionBuffer
+
+
+class FakeStore:
+    def __init__(self):
+        self.batches = []
+        self.flushes = 0
+
+    def insert(self, texts, embeddings, metadatas=None, ids=None):
+        self.batches.append(list(ids))
+        return ids
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_rows_are_written_in_batches_and_flushed_once_on_drain():
+    """
+    ทดสอบว่าแถวจากหลายเอกสารถูกรวมเขียนเป็น batch ตามขนาด/อายุ และ drain flush ที่ store ครั้งเดียว
+    """
+    store = FakeStore()
+    buffer = VectorIngestionBuffer(store, max_rows=4, max_age=0.01, max_pending_rows=8)
+
+    async def scenario():
+        for document in range(3):
+            await buffer.add([f"{document}-{i}" for i in range(3)], [[0.0]] * 3)
+        # 9 แถว: แถวของเอกสารเดียวกันไม่ถูกแยก batch จึงเขียนไปแล้วสอง batch (3 + 3) อีก 3 แถวรอ timer
+        assert [len(batch) for batch in store.batches] == [3, 3]
+        await asyncio.sleep(0.05)
+        assert [len(batch) for batch in store.batches] == [3, 3, 3]
+
+        await buffer.add(["last"], [[0.0]])
+        await buffer.drain()
+
+    asyncio.run(scenario())
+
+    assert sum(len(batch) for batch in store.batches) == 10
+    assert store.flushes == 1
+    assert buffer.stats()["pending_rows"] == 0
+    assert buffer.stats()["rows_ingested"] == 10
+
+
+class FailingOnceStore(FakeStore):
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    def insert(self, texts, embeddings, metadatas=None, ids=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("vector store down")
+        return super().insert(texts, embeddings, metadatas, ids)
+
+
+def test_failed_write_is_reported_to_its_callers_and_not_retried():
+    """
+    ทดสอบว่า batch ที่เขียนไม่สำเร็จส่ง error ไปที่ future ของผู้เรียก add() และไม่ถูกเขียนซ้ำภายหลัง
+    ผู้เรียกจึงลองใหม่ได้โดยไม่เกิดแถวซ้ำ
+    """
+    store = FailingOnceStore()
+    buffer = VectorIngestionBuffer(store, max_rows=2, max_age=0.01)
+
+    async def scenario():
+        written = await buffer.add(["a", "b"], [[0.0]] * 2)
+        with pytest.raises(ConnectionError):
+            await written
+
+        retried = await buffer.add(["a", "b"], [[0.0]] * 2)
+        assert await retried == store.batches[0]
+        await asyncio.sleep(0.05)
+        await buffer.drain()
+
+    asyncio.run(scenario())
+
+    assert len(store.batches) == 1
+    assert buffer.stats()["rows_failed"] == 2
+    assert buffer.stats()["pending_rows"] == 0
@@ -0,0 +1,33 @@
+from app.infrastructure.queue.job_queue import JobQueue
+
+
+def test_only_completed_students_are_skipped_on_resume(tmp_path):
+    """
+    ทดสอบว่านักเรียนที่ตรวจแล้ว error ไม่ถูกนับเป็นตรวจเสร็จ งานที่ถูก lease ซ้ำจึงตรวจคนนั้นใหม่
+    """
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"))
+    queue.record_checkpoints("b1", [("s1", "completed"), ("s2", "error")])
+
+    assert queue.completed_items("b1") == {"s1"}
+    assert queue.completed_items("b2") == set()
+
+
+def test_batch_state_and_event_pruning(tmp_path):
+    """
+    ทดสอบว่าหา state ของงานจาก batch_id ได้ (None ถ้าไม่มีงาน) และลบ event เฉพาะ batch ที่จบนานแล้ว
+    """
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"))
+    assert queue.batch_state("b1") is None
+
+    job_id = queue.enqueue("batch_grading", {"batch_id": "b1", "student_file_ids": []})
+    assert queue.batch_state("b1") == "queued"
+    queue.publish_event("b1", "started", {})
+    queue.publish_event("b1", "completed", {})
+    queue.publish_event("b2", "started", {})
+    queue.complete(job_id)
+    assert queue.batch_state("b1") == "done"
+
+    assert queue.prune_events(retention_seconds=3600) == 0
+    assert queue.prune_events(retention_seconds=-1) == 2
+    assert queue.events_since("b1") == []
+    assert len(queue.events_since("b2")) == 1
@@ -0,0 +1,26 @@
+from app.infrastructure.llm.json_stream import IncrementalJSONParser
+
+
+def test_fields_are_emitted_as_soon_as_they_complete():
+    """
+    ทดสอบว่า field ถูกส่งออกทันทีที่ค่าครบ แม้ข้อความจะมาทีละตัวอักษรและมีเครื่องหมายพิเศษใน string
+    """
+    text = '```json\n{"score": 85, "feedback": "uses \\"x\\", {not} json", "strengths": ["a, b", "c]"], "missed_concepts": []}\n```'
+    parser = IncrementalJSONParser()
+
+    emitted = []
+    score_emitted_at = None
+    for i, char in enumerate(text):
+        for field in parser.feed(char):
+            emitted.append(field)
+            if field[0] == "score":
+                score_emitted_at = i
+
+    assert emitted == [
+        ("score", 85),
+        ("feedback", 'uses "x", {not} json'),
+        ("strengths", ["a, b", "c]"]),
+        ("missed_concepts", []),
+    ]
+    assert score_emitted_at == text.index(", \"feedback\"")
+    assert parser.done
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.infrastructure.llm.lmstudio import LMStudioClient
+from app.infrastructure.llm.local_llm import LocalGradingModel
+
+
+class FakeLlama:
+    """นับจำนวน token ที่ถูก evaluate แทน llama_cpp.Llama จริง"""
+
+    def __init__(self):
+        self.evaluated = 0
+        self.n_tokens = 0
+
+    def tokenize(self, text, add_bos=True):
+        return list(range(len(text.split()) + (1 if add_bos else 0)))
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens):
+        self.evaluated += len(tokens)
+        self.n_tokens += len(tokens)
+
+    def save_state(self):
+        return self.n_tokens
+
+    def load_state(self, state):
+        self.n_tokens = state
+
+    def create_completion(self, prompt, **kwargs):
+        # llama.cpp evaluate เฉพาะ token ที่เกินจาก state ปัจจุบัน
+        self.eval(prompt[self.n_tokens:])
+        return {"choices": [{"text": '{"score": 80}'}]}
+
+
+def test_teacher_prefix_is_evaluated_once_per_assignment():
+    """
+    ทดสอบว่า prefix ของเฉลยถูก evaluate ครั้งเดียว นักเรียนคนถัดไปใช้ state เดิม
+    """
+    llama = FakeLlama()
+    model = LocalGradingModel(llama=llama, max_states=2, max_tokens=16)
+    teacher = "answer " * 500
+
+    assert asyncio.run(model.agrade(teacher, "student one")) == '{"score": 80}'
+    first = llama.evaluated
+    model.grade(teacher, "student two")
+
+    assert llama.evaluated - first < 50
+    assert model.stats()["prefix_hits"] == 1
+    assert model.stats()["prefix_misses"] == 1
+
+
+def test_model_is_loaded_on_first_use(monkeypatch):
+    """
+    ทดสอบว่าสร้าง LocalGradingModel ได้โดยไม่โหลดไฟล์ GGUF จนกว่าจะตรวจงานจริง
+    """
+    loads = []
+
+    def load(self, model_path):
+        loads.append(model_path)
+        return FakeLlama()
+
+    monkeypatch.setattr(LMStudioClient, "get_llama_model", load)
+    model = LocalGradingModel(max_states=2, max_tokens=16)
+    assert loads == [] and not model.stats()["loaded"]
+
+    model.grade("answer", "student")
+    model.grade("answer", "student")
+    assert len(loads) == 1 and model.stats()["loaded"]
@@ -0,0 +1,66 @@
+import numpy as np
+
+from app.infrastructure.rag.numpy_store import NumpyVectorStore
+
+
+def _metadata(assignment_id, file_type, chunk_index):
+    return {"assignment_id": assignment_id, "document_id": f"{assignment_id}-{file_type}", "file_type": file_type, "chunk_index": chunk_index}
+
+
+def test_store_filters_persists_and_grows(tmp_path):
+    """
+    ทดสอบว่าค้นหาได้ top-k เรียงตาม cosine กรองตาม assignment / file type ได้
+    ขยาย matrix เกิน capacity เริ่มต้นได้ และเปิดใหม่แล้วข้อมูลยังอยู่
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(40, 3)).astype(np.float32)
+    metadatas = [_metadata(f"a{i % 2}", "teacher" if i % 4 < 2 else "student", i) for i in range(40)]
+
+    store = NumpyVectorStore(directory=str(tmp_path), dimension=3, initial_capacity=8)
+    for start in range(0, 40, 10):
+        store.insert(
+            [f"chunk {i}" for i in range(start, start + 10)],
+            vectors[start:start + 10].tolist(),
+            metadatas[start:start + 10]
+        )
+    assert store.capacity >= 40
+
+    query = vectors[5]
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = [
+        i for i in np.argsort(-(normalized @ (query / np.linalg.norm(query))))
+        if metadatas[i]["assignment_id"] == "a1" and metadatas[i]["file_type"] == "teacher"
+    ][:3]
+
+    hits = store.search(query.tolist(), limit=3, assignment_id="a1", file_type="teacher")
+    assert [hit["chunk_index"] for hit in hits] == expected
+    assert hits[0]["chunk_index"] == 5 and abs(hits[0]["score"] - 1.0) < 1e-5
+    assert all(hit["assignment_id"] == "a1" and hit["file_type"] == "teacher" for hit in hits)
+    # batched search returns the same hits per query as single searches
+    batched = store.search_many([query.tolist(), vectors[7].tolist()], limit=3, assignment_id="a1", file_type="teacher")
+    assert batched == [hits, store.search(vectors[7].tolist(), limit=3, assignment_id="a1", file_type="teacher")]
+    assert store.exists(assignment_id="a0", document_id="a0-student")
+    assert not store.exists(assignment_id="a2")
+    store.close()
+
+    reopened = NumpyVectorStore(directory=str(tmp_path), dimension=3)
+    assert reopened.stats()["rows"] == 40
+    assert reopened.search(query.tolist(), limit=3, assignment_id="a1", file_type="teacher") == hits
+
+
+def test_stores_sharing_a_directory_do_not_overwrite_rows(tmp_path):
+    """
+    ทดสอบว่าสอง store (เหมือน API กับ worker คนละ process) ที่ใช้ directory เดียวกันจองแถวไม่ชนกัน
+    และเห็นแถวที่อีกฝั่งเพิ่มเข้ามา
+    """
+    first = NumpyVectorStore(directory=str(tmp_path), dimension=3, initial_capacity=2)
+    second = NumpyVectorStore(directory=str(tmp_path), dimension=3, initial_capacity=2)
+
+    first.insert(["x"], [[1.0, 0.0, 0.0]], [_metadata("a1", "teacher", 0)])
+    second.insert(["y", "z"], [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], [_metadata("a1", "teacher", 1), _metadata("a1", "teacher", 2)])
+    first.insert(["w"], [[1.0, 1.0, 0.0]], [_metadata("a1", "teacher", 3)])
+
+    for store in (first, second):
+        for index, vector in enumerate([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]):
+            assert store.search(vector, limit=1, assignment_id="a1")[0]["chunk_index"] == index
+        assert store.stats()["rows"] == 4
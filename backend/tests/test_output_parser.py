@@ -0,0 +1,65 @@
+import asyncio
+
+from app.infrastructure.llm.chains import GradingChain
+from app.infrastructure.llm.grading_cache import GradingCache
+from app.infrastructure.llm.output_parser import parse_grading_output
+
+
+def test_tolerant_parser_repairs_common_mistakes():
+    """
+    ทดสอบว่า JSON ที่มี comma เกิน ค่าแบบ Python หรือถูกตัดกลางทาง ยังใช้ส่วนที่ถูกต้องได้
+    """
+    result, missing, repaired = parse_grading_output(
+        '```json\n{"score": "85/100", "feedback": "Good", "strengths": ["clear",], '
+        '"areas_for_improvement": [], "missed_concepts": None,}\n```'
+    )
+    assert repaired
+    assert result["score"] == 85
+    assert result["strengths"] == ["clear"]
+    assert missing == ["missed_concepts"]
+
+    # ซ่อมเฉพาะนอก string ข้อความใน feedback ต้องไม่ถูกแก้
+    result, _, repaired = parse_grading_output(
+        '{"score": 40, "feedback": "None of the steps are True, ]", "strengths": [], '
+        '"areas_for_improvement": ["False start"], "missed_concepts": [None, "x",],}'
+    )
+    assert repaired
+    assert result["feedback"] == "None of the steps are True, ]"
+    assert result["areas_for_improvement"] == ["False start"]
+    assert result["missed_concepts"] == ["x"]
+
+    result, missing, _ = parse_grading_output('{"score": 70, "feedback": "Partly correct", "strengths": ["a", "b')
+    assert result == {"score": 70, "feedback": "Partly correct"}
+    assert missing == ["strengths", "areas_for_improvement", "missed_concepts"]
+
+
+class FakeLocalModel:
+    """คำตอบแรกขาด feedback การซ่อมจึงต้องขอเฉพาะ feedback"""
+
+    def __init__(self):
+        self.repair_prompts = []
+
+    async def agrade(self, teacher_text, student_text):
+        return '{"score": 90, "strengths": ["complete"], "areas_for_improvement": [], "missed_concepts": []'
+
+    async def acomplete(self, prompt, schema):
+        self.repair_prompts.append((prompt, schema))
+        return '{"feedback": "Well done"}'
+
+
+def test_chain_retries_only_missing_fields(tmp_path):
+    """
+    ทดสอบว่า chain ไม่ทิ้งผลเดิม แต่ขอให้ model ตอบเฉพาะ field ที่ขาด และนับสถิติการ parse
+    """
+    local_model = FakeLocalModel()
+    chain = GradingChain(cache=GradingCache(path=str(tmp_path / "cache.sqlite3")), local_model=local_model)
+
+    result = asyncio.run(chain.grade_submission("teacher", "student"))
+
+    assert result["score"] == 90
+    assert result["feedback"] == "Well done"
+    assert "error" not in result
+    assert len(local_model.repair_prompts) == 1
+    assert local_model.repair_prompts[0][1]["required"] == ["feedback"]
+    assert chain.stats()["parse_failure_rate"] == 1.0
+    assert chain.stats()["failed_outputs"] == 0
@@ -0,0 +1,66 @@
+import asyncio
+import os
+
+import pytest
+from pypdf import PdfWriter
+
+from app.core.config import settings
+from app.utils.pdf_processor import ExtractedText, ExtractionCache, PdfExtractionPool, file_sha256
+
+
+def test_stuck_job_times_out_without_failing_other_documents(tmp_path):
+    """
+    ทดสอบว่างานที่ค้าง (อ่านจาก FIFO ที่ไม่มีใครเขียน) timeout เฉพาะงานของมัน
+    เอกสารอื่นที่แยกพร้อมกันยังสำเร็จ และ pool ยังใช้งานต่อได้
+    """
+    pdf_path = str(tmp_path / "doc.pdf")
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=200, height=200)
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+    stuck_path = str(tmp_path / "stuck.pdf")
+    os.mkfifo(stuck_path)
+
+    pool = PdfExtractionPool(max_workers=2, pages_per_job=1, timeout=5)
+
+    async def scenario():
+        stuck = asyncio.create_task(pool.extract_pages(stuck_path))
+        await asyncio.sleep(0)
+        pages = await pool.extract_pages(pdf_path)
+        with pytest.raises(asyncio.TimeoutError):
+            await stuck
+        return pages, await pool.extract_pages(pdf_path)
+
+    try:
+        pages, again = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert len(pages) == 3 and len(again) == 3
+    assert pool.workers_replaced == 1
+
+
+def test_cached_extraction_returns_page_offsets(tmp_path, monkeypatch):
+    """
+    ทดสอบว่า offset ของแต่ละหน้าถูกเก็บพร้อมข้อความใน sidecar cache และคืนให้ผู้เรียก
+    """
+    monkeypatch.setattr(settings, "EXTRACTION_CACHE_ENABLED", True)
+    pdf_path = str(tmp_path / "doc.pdf")
+    writer = PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+
+    pool = PdfExtractionPool(max_workers=1)
+    try:
+        extracted = asyncio.run(pool.extract(pdf_path))
+        assert extracted == ExtractedText("", [0])
+        assert ExtractionCache().get(file_sha256(pdf_path)) == extracted
+
+        # ผลจาก cache ต้องมี offset เหมือนกับตอนแยกจริง
+        ExtractionCache().set(file_sha256(pdf_path), ExtractedText("page one\npage two", [0, 9]))
+        extracted = asyncio.run(pool.extract(pdf_path))
+    finally:
+        pool.shutdown()
+    assert extracted.page_offsets == [0, 9]
+    assert extracted.text[extracted.page_offsets[1]:] == "page two"
@@ -0,0 +1,46 @@
+import asyncio
+
+from app.domain.services.rag_service import RAGService
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.query_batches = []
+
+    async def get_embeddings(self, texts):
+        raise AssertionError("queries must not use document embeddings")
+
+    async def get_query_embeddings(self, queries):
+        self.query_batches.append(list(queries))
+        return [[float(len(query))] for query in queries]
+
+
+class FakeStore:
+    def search_many(self, query_embeddings, limit, **filters):
+        return [[{"score": embedding[0]}] for embedding in query_embeddings]
+
+
+class RecordingCache:
+    def __init__(self):
+        self.puts = 0
+
+    def get_many(self, texts):
+        return [None] * len(texts)
+
+    def put_many(self, texts, embeddings):
+        self.puts += 1
+
+
+def test_batched_search_uses_query_embeddings_without_caching_them():
+    """
+    ทดสอบว่า search_similar_many embed ทุกคำถามแบบ query ใน call เดียว และไม่เก็บคำถามลง embedding cache
+    """
+    embeddings = FakeEmbeddings()
+    cache = RecordingCache()
+    rag = RAGService(embedding_service=embeddings, milvus_client=FakeStore(), embedding_cache=cache)
+
+    results = asyncio.run(rag.search_similar_many(["a", "bbb"], limit=1, assignment_id="a1"))
+
+    assert results == [[{"score": 1.0}], [{"score": 3.0}]]
+    assert embeddings.query_batches == [["a", "bbb"]]
+    assert cache.puts == 0
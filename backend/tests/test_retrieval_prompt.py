@@ -0,0 +1,48 @@
+import asyncio
+
+from app.domain.services.rag_service import RAGService
+from app.domain.services.retrieval_prompt import RetrievalPromptBuilder
+
+
+class FakeRAGService(RAGService):
+    """แทน Milvus ด้วยการจับคู่คำ: chunk ของเฉลยที่มีคำแรกของ section ได้คะแนนสูง"""
+
+    def __init__(self):
+        self.indexed = []
+        self.chunks = []
+
+    async def ensure_indexed(self, document_id, text, assignment_id, file_type, metadata=None, **split_options):
+        self.indexed.append((assignment_id, file_type, document_id))
+        self.chunks = self.split_text(text, **split_options)
+        return True
+
+    async def search_similar_many(self, queries, limit=5, assignment_id=None, file_type=None, document_id=None):
+        results = []
+        for query in queries:
+            keyword = query.split()[0]
+            hits = [
+                {"text": chunk, "chunk_index": i, "score": 1.0 if keyword in chunk else 0.1}
+                for i, chunk in enumerate(self.chunks)
+            ]
+            results.append(sorted(hits, key=lambda hit: hit["score"], reverse=True)[:limit])
+        return results
+
+
+def test_prompt_keeps_relevant_chunks_within_budget():
+    """
+    ทดสอบว่าเหลือเฉพาะส่วนของเฉลยที่เกี่ยวข้อง ไม่เกินงบ token และรายงานจำนวน token ที่ประหยัดได้
+    """
+    topics = ["alpha", "beta", "gamma", "delta"]
+    teacher_text = "\n\n".join(f"{topic} " + "answer " * 150 for topic in topics)
+    student_text = "beta my answer"
+
+    rag = FakeRAGService()
+    builder = RetrievalPromptBuilder(rag, token_budget=600, top_k=1, section_size=1000)
+    prompt = asyncio.run(builder.build("a1", teacher_text, student_text))
+
+    assert len(rag.indexed) == 1
+    assert rag.indexed[0][:2] == ("a1", "teacher")
+    assert prompt.teacher_text.startswith("beta")
+    assert "alpha" not in prompt.teacher_text
+    assert prompt.prompt_tokens <= 600
+    assert prompt.tokens_saved > 0